@@ -10,8 +10,17 @@ from firebase_mongo_auth_routes import firebase_mongo_auth_bp
 from meal_routes import meal_bp
 from error_handlers import error_bp
 from routine_routes import routine_bp
-from firebase_config import get_firebase_service
-from mongodb_config import get_mongodb
+from export_routes import export_bp
+from user_routes import user_bp
+from batch_routes import batch_bp
+from dashboard_routes import dashboard_bp
+from firebase_config import get_firebase_service, get_token_cache, prefetch_signing_certs, start_cert_refresher
+from mongodb_config import get_mongodb, get_pool_metrics
+from indexes import ensure_indexes, verify_query_plans
+from user_cache import get_user_cache
+from json_provider import MongoJSONProvider
+from compression import init_compression, get_compression_metrics
+from response_cache import get_response_cache
 
 def create_app(config_name=None):
     # create our flask app
@@ -21,10 +30,13 @@ def create_app(config_name=None):
     config_name = config_name or os.environ.get('FLASK_ENV', 'development')
     app.config.from_object(config[config_name])
     
-    # setup cors for frontend
-    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
+    # jsonify mongo documents as-is (ObjectId, datetime, Decimal128)
+    app.json = MongoJSONProvider(app)
     
-    # setup firebase
+    # setup cors for frontend (the frontend reads ETags to send If-None-Match)
+    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True, expose_headers=['ETag'])
+    
+    # setup firebase (and warm up the worker before it takes traffic)
     initialize_firebase(app)
     
     # register our routes
@@ -33,6 +45,9 @@ def create_app(config_name=None):
     # add health check
     add_health_check(app)
     
+    # gzip/br/zstd for every blueprint
+    init_compression(app)
+    
     return app
 
 def initialize_firebase(app):
@@ -41,25 +56,48 @@ def initialize_firebase(app):
         try:
             firebase_service = get_firebase_service()
             print("firebase connected! :)")
+            if app.config.get('WARMUP_ENABLED', True) and app.config.get('TOKEN_VERIFIER', 'firebase') == 'firebase':
+                warm_up_token_verification(app)
         except Exception as e:
             print(f"firebase error: {str(e)}")
             if app.config.get('DEBUG', False):
                 print("continuing without firebase in dev mode")
         
         try:
+            # connecting runs a ping, so the first request finds an open connection
             mongodb = get_mongodb()
             print("mongodb connected! :)")
+            if app.config.get('MONGODB_ENSURE_INDEXES', True):
+                ensure_indexes()
         except Exception as e:
             print(f"mongodb error: {str(e)}")
             if app.config.get('DEBUG', False):
                 print("continuing without mongodb in dev mode")
 
+        # unindexed query shapes should stop the deploy, not just print
+        if app.config.get('MONGODB_VERIFY_INDEXES', False):
+            verify_query_plans()
+            print("query plans verified! :)")
+
+def warm_up_token_verification(app):
+    # fetch the signing certs now and keep them fresh so requests never wait on them
+    try:
+        prefetch_signing_certs()
+        print("firebase signing certs cached! :)")
+    except Exception as e:
+        print(f"cert warmup error: {str(e)}")
+    start_cert_refresher(app.config.get('CERT_REFRESH_INTERVAL', 3600))
+
 def register_blueprints(app):
     # register our route blueprints
     app.register_blueprint(firebase_mongo_auth_bp)  # Firebase + MongoDB auth routes
     app.register_blueprint(meal_bp)
     app.register_blueprint(error_bp)
     app.register_blueprint(routine_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(user_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(dashboard_bp)
     print("routes registered! :)")
 
 def add_health_check(app):
@@ -83,11 +121,26 @@ def add_health_check(app):
                 'auth': '/api/v1/auth',
                 'meals': '/api/v1/meals',
                 'users': '/api/v1/users',
-                'routine': '/api/v1/routine'
+                'routine': '/api/v1/routine',
+                'export': '/api/v1/export',
+                'batch': '/api/v1/batch',
+                'dashboard': '/api/v1/dashboard'
             },
             'timestamp': datetime.utcnow().isoformat()
         }), 200
 
+    @app.route('/metrics')
+    def metrics():
+        # per-process cache counters
+        return jsonify({
+            'token_cache': get_token_cache().stats(),
+            'user_cache': get_user_cache().stats(),
+            'response_cache': get_response_cache().stats() if get_response_cache() else None,
+            'mongodb_pool': get_pool_metrics(),
+            'compression': get_compression_metrics(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+
 # Create the application instance
 app = create_app()
 
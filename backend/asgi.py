@@ -0,0 +1,142 @@
+# macromatch async (ASGI) app :)
+# the auth, meal and routine routes of app.py on quart + motor (README lists what it doesn't serve),
+# run it with: uvicorn asgi:app --workers 4
+import os
+from datetime import datetime
+from flask import Flask
+from quart import Quart, jsonify
+from quart.json.provider import DefaultJSONProvider
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+
+from config import config
+from firebase_config import get_firebase_service, get_token_cache, prefetch_signing_certs, start_cert_refresher
+from token_verifiers import get_token_verifier
+from user_cache import get_user_cache
+from response_cache import get_response_cache
+from mongodb_config import get_pool_metrics
+from async_mongodb_config import get_async_mongodb
+from async_auth_routes import firebase_mongo_auth_bp
+from async_meal_routes import meal_bp
+from async_routine_routes import routine_bp
+from json_provider import bson_default
+
+class AsyncMongoJSONProvider(DefaultJSONProvider):
+    """quart's json provider with the sync app's bson handling, so routes return documents as they come back"""
+    default = staticmethod(bson_default)
+
+def create_async_app(config_name=None):
+    # create our quart app
+    app = Quart(__name__)
+    app.json = AsyncMongoJSONProvider(app)
+
+    # load config
+    config_name = config_name or os.environ.get('FLASK_ENV', 'development')
+    app.config.from_object(config[config_name])
+
+    # the async meal routes read and write the meals collection directly
+    if app.config.get('MEAL_STORAGE_MODE', 'document') != 'document':
+        raise RuntimeError("the async app only supports MEAL_STORAGE_MODE=document, run app.py for bucket storage")
+
+    # setup cors for frontend
+    app = cors(app, allow_origin=app.config['CORS_ORIGINS'], allow_credentials=True)
+
+    # firebase, token verifier and caches are shared with the sync app
+    initialize_shared_services(config[config_name])
+
+    register_lifecycle(app)
+    register_blueprints(app)
+    register_error_handlers(app)
+    add_health_check(app)
+
+    return app
+
+def initialize_shared_services(config_object):
+    # the firebase/cache singletons read flask's current_app once when created,
+    # so build them inside a throwaway flask app context with the same config
+    flask_app = Flask(__name__)
+    flask_app.config.from_object(config_object)
+    with flask_app.app_context():
+        try:
+            verifier = get_token_verifier()
+            if verifier.name == 'firebase':
+                get_firebase_service()
+                print("firebase connected! :)")
+                if flask_app.config.get('WARMUP_ENABLED', True):
+                    prefetch_signing_certs()
+                    start_cert_refresher(flask_app.config.get('CERT_REFRESH_INTERVAL', 3600))
+        except Exception as e:
+            print(f"firebase error: {str(e)}")
+        get_token_cache()
+        get_user_cache()
+        # writes here invalidate the sync app's cached responses (shared with the redis backend)
+        get_response_cache()
+
+def register_lifecycle(app):
+    # motor binds to the worker's event loop, so connect once it is running
+    @app.before_serving
+    async def connect_mongodb():
+        await get_async_mongodb().connect()
+
+    @app.after_serving
+    async def close_mongodb():
+        get_async_mongodb().close()
+
+def register_blueprints(app):
+    # register our route blueprints
+    app.register_blueprint(firebase_mongo_auth_bp)
+    app.register_blueprint(meal_bp)
+    app.register_blueprint(routine_bp)
+    print("async routes registered! :)")
+
+def register_error_handlers(app):
+    # same error json as error_handlers.py
+    @app.errorhandler(HTTPException)
+    async def handle_http_exception(error):
+        return jsonify({
+            'error': error.description,
+            'status_code': error.code
+        }), error.code
+
+    @app.errorhandler(Exception)
+    async def handle_generic_error(error):
+        return jsonify({'error': 'server error'}), 500
+
+def add_health_check(app):
+    # add basic health check
+    @app.route('/health')
+    async def health_check():
+        return jsonify({
+            'status': 'healthy',
+            'timestamp': datetime.utcnow().isoformat(),
+            'message': 'app is running! :)'
+        }), 200
+
+    @app.route('/')
+    async def root():
+        # basic api info
+        return jsonify({
+            'message': 'macromatch api',
+            'version': '1.0.0',
+            'endpoints': {
+                'health': '/health',
+                'auth': '/api/v1/auth',
+                'meals': '/api/v1/meals',
+                'users': '/api/v1/users',
+                'routine': '/api/v1/routine'
+            },
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+
+    @app.route('/metrics')
+    async def metrics():
+        # per-process cache counters
+        return jsonify({
+            'token_cache': get_token_cache().stats(),
+            'user_cache': get_user_cache().stats(),
+            'mongodb_pool': get_pool_metrics(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+
+# Create the application instance
+app = create_async_app()
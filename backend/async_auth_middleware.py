@@ -0,0 +1,90 @@
+# async authentication middleware for the ASGI app
+import asyncio
+import time
+from functools import wraps
+from quart import request, jsonify, current_app
+from firebase_admin import auth
+from firebase_config import lookup_cached_token, verify_id_token
+from user_cache import get_user_cache
+from async_mongodb_config import get_users_collection
+
+async def verify_token_async(id_token):
+    """
+    Verify an id token without blocking the event loop.
+
+    Cached claims are returned inline, only a cache miss (signature check and
+    possibly a cert fetch) is pushed to a worker thread.
+    """
+    decoded_token = lookup_cached_token(id_token)
+    if decoded_token is not None:
+        return decoded_token
+    return await asyncio.to_thread(verify_id_token, id_token)
+
+async def get_cached_user(firebase_uid):
+    """async version of user_cache.get_cached_user (shares the same cache)"""
+    if not current_app.config.get('USER_CACHE_ENABLED', True):
+        return await get_users_collection('auth_user_lookup').find_one({'firebase_uid': firebase_uid})
+
+    cache = get_user_cache()
+    user = cache.get(firebase_uid)
+    if user is not None:
+        return dict(user)
+
+    user = await get_users_collection('auth_user_lookup').find_one({'firebase_uid': firebase_uid})
+    if user:
+        ttl = current_app.config.get('USER_CACHE_TTL', 60)
+        cache.set(firebase_uid, dict(user), expires_at=time.time() + ttl)
+    return user
+
+def require_auth(f):
+    """
+    Async twin of auth_middleware.require_auth for Quart routes.
+
+    Same headers, status codes and error bodies, and it attaches the same
+    request.current_user / request.firebase_uid / request.user_email.
+    """
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        # get token from authorization header
+        auth_header = request.headers.get('Authorization', '')
+
+        if not auth_header.startswith('Bearer '):
+            return jsonify({'error': 'invalid authorization header'}), 401
+
+        try:
+            id_token = auth_header.split('Bearer ')[1]
+
+            decoded_token = await verify_token_async(id_token)
+            firebase_uid = decoded_token['uid']
+            email = decoded_token.get('email')
+
+            user = await get_cached_user(firebase_uid)
+
+            if not user:
+                return jsonify({'error': 'user not found in database'}), 404
+
+            # attach user info to request context
+            request.current_user = user
+            request.firebase_uid = firebase_uid
+            request.user_email = email
+
+        except auth.InvalidIdTokenError:
+            return jsonify({'error': 'invalid firebase token'}), 401
+        except auth.ExpiredIdTokenError:
+            return jsonify({'error': 'firebase token expired'}), 401
+        except IndexError:
+            return jsonify({'error': 'malformed authorization header'}), 401
+        except Exception as e:
+            print(f"async auth middleware error: {str(e)}")
+            return jsonify({'error': 'authentication failed'}), 401
+
+        return await f(*args, **kwargs)
+
+    return decorated
+
+async def verify_firebase_token(id_token):
+    try:
+        return await verify_token_async(id_token)
+    except Exception as e:
+        print(f"token verification error: {str(e)}")
+        return None
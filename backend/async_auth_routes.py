@@ -0,0 +1,290 @@
+# async Firebase + MongoDB authentication routes (same urls and json as firebase_mongo_auth_routes, without ETags)
+import asyncio
+from datetime import datetime
+from quart import Blueprint, request, jsonify
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from firebase_admin import auth as firebase_auth
+from firebase_config import get_firebase_service
+from user_cache import invalidate_user
+from async_mongodb_config import get_users_collection, get_calculator_data_collection
+from async_auth_middleware import require_auth, verify_firebase_token, get_cached_user
+from async_bookkeeping import bump_data_version, invalidate_responses
+from fieldsets import parse_fields
+from repository import PROFILE_SPARSE_FIELDS
+
+firebase_mongo_auth_bp = Blueprint('firebase_mongo_auth', __name__, url_prefix='/api/auth')
+
+PROFILE_FIELDS = ['age', 'weight', 'height', 'activity_level', 'dietary_goals', 'gender']
+
+def profile_response(user, firebase_uid, email, name):
+    """user json shared by login, profile and profile update"""
+    user_response = {
+        'id': str(user['_id']),
+        'firebase_uid': firebase_uid,
+        'email': email,
+        'name': name
+    }
+    for field in PROFILE_FIELDS:
+        user_response[field] = user.get(field)
+    return user_response
+
+async def get_or_create_user(firebase_uid, email, name=None):
+    """Get user from MongoDB or create if doesn't exist (one atomic upsert)"""
+    users_collection = get_users_collection('get_or_create_user')
+    now = datetime.utcnow()
+    new_user = {
+        'firebase_uid': firebase_uid,
+        'email': email,
+        'name': name or email.split('@')[0],
+        'created_at': now,
+        'updated_at': now
+    }
+
+    try:
+        user = await users_collection.find_one_and_update(
+            {'firebase_uid': firebase_uid},
+            {'$setOnInsert': new_user},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        user = await users_collection.find_one({'firebase_uid': firebase_uid})
+
+    invalidate_user(firebase_uid)
+    return user
+
+@firebase_mongo_auth_bp.route('/register', methods=['POST'])
+async def register():
+    """Register new user with Firebase Auth"""
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        email = data.get('email', '').strip().lower()
+        password = data.get('password', '')
+        name = data.get('name', '').strip()
+
+        # Validate input
+        if not email or '@' not in email:
+            return jsonify({'error': 'Valid email is required'}), 400
+
+        if not password or len(password) < 6:
+            return jsonify({'error': 'Password must be at least 6 characters'}), 400
+
+        try:
+            # the admin sdk is blocking, keep it off the event loop
+            get_firebase_service()
+            firebase_user = await asyncio.to_thread(
+                firebase_auth.create_user, email=email, password=password, display_name=name
+            )
+
+            mongo_user = await get_or_create_user(firebase_user.uid, email, name)
+
+            custom_token = await asyncio.to_thread(firebase_auth.create_custom_token, firebase_user.uid)
+
+            user_response = {
+                'id': str(mongo_user['_id']),
+                'firebase_uid': firebase_user.uid,
+                'email': email,
+                'name': name or email.split('@')[0]
+            }
+
+            return jsonify({
+                'message': 'Registration successful',
+                'customToken': custom_token.decode('utf-8'),
+                'user': user_response
+            }), 201
+
+        except firebase_auth.EmailAlreadyExistsError:
+            return jsonify({'error': 'Email already exists'}), 400
+        except Exception as e:
+            print(f"Firebase registration error: {str(e)}")
+            return jsonify({'error': 'Registration failed'}), 500
+
+    except Exception as e:
+        print(f"Registration error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/login', methods=['POST'])
+async def login():
+    """Login user - verify Firebase token and return user data from MongoDB"""
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        id_token = data.get('idToken')
+
+        if not id_token:
+            return jsonify({'error': 'ID token is required'}), 400
+
+        decoded_token = await verify_firebase_token(id_token)
+
+        if not decoded_token:
+            return jsonify({'error': 'Invalid token'}), 401
+
+        firebase_uid = decoded_token['uid']
+        email = decoded_token.get('email', '')
+        name = decoded_token.get('name', email.split('@')[0])
+
+        mongo_user = await get_or_create_user(firebase_uid, email, name)
+
+        return jsonify({
+            'message': 'Login successful',
+            'user': profile_response(mongo_user, firebase_uid, email, mongo_user.get('name', name))
+        }), 200
+
+    except Exception as e:
+        print(f"Login error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/verify', methods=['POST'])
+async def verify_token():
+    """Verify Firebase token"""
+    try:
+        data = await request.get_json()
+        id_token = data.get('idToken')
+
+        if not id_token:
+            return jsonify({'error': 'ID token is required'}), 400
+
+        decoded_token = await verify_firebase_token(id_token)
+
+        if not decoded_token:
+            return jsonify({'error': 'Invalid token'}), 401
+
+        firebase_uid = decoded_token['uid']
+        mongo_user = await get_cached_user(firebase_uid)
+
+        if not mongo_user:
+            return jsonify({'error': 'User not found'}), 404
+
+        user_response = {
+            'id': str(mongo_user['_id']),
+            'firebase_uid': firebase_uid,
+            'email': decoded_token.get('email'),
+            'name': mongo_user.get('name')
+        }
+
+        return jsonify({
+            'message': 'Token is valid',
+            'user': user_response
+        }), 200
+
+    except Exception as e:
+        print(f"Verify token error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/profile', methods=['GET'])
+@require_auth
+async def get_profile():
+    """Get user profile from MongoDB (?fields= picks which profile fields come back)"""
+    try:
+        try:
+            fields = parse_fields(request.args, PROFILE_SPARSE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        user = request.current_user
+        user_response = profile_response(user, request.firebase_uid, user.get('email'), user.get('name'))
+        if fields:
+            user_response = {field: user_response[field] for field in fields}
+        return jsonify({'user': user_response}), 200
+
+    except Exception as e:
+        print(f"Get profile error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/profile', methods=['PUT'])
+@require_auth
+async def update_profile():
+    """Update user profile in MongoDB"""
+    try:
+        data = await request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        # Allowed fields to update
+        allowed_fields = ['name'] + PROFILE_FIELDS
+        update_data = {k: v for k, v in data.items() if k in allowed_fields}
+
+        if not update_data:
+            return jsonify({'error': 'No valid fields to update'}), 400
+
+        update_data['updated_at'] = datetime.utcnow()
+
+        # update and read back in one round trip
+        user = await get_users_collection('update_profile').find_one_and_update(
+            {'firebase_uid': request.firebase_uid},
+            {'$set': update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        invalidate_user(request.firebase_uid)
+        await bump_data_version(request.firebase_uid, 'profile')
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        return jsonify({
+            'message': 'Profile updated successfully',
+            'user': profile_response(user, request.firebase_uid, user.get('email'), user.get('name'))
+        }), 200
+
+    except Exception as e:
+        print(f"Update profile error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/calculator-data', methods=['POST'])
+@require_auth
+async def save_calculator_data():
+    """Save calculator data to MongoDB"""
+    try:
+        data = await request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        calculator_data = {
+            'firebase_uid': request.firebase_uid,
+            'data': data,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }
+
+        result = await get_calculator_data_collection('save_calculator_data').update_one(
+            {'firebase_uid': request.firebase_uid},
+            {'$set': calculator_data},
+            upsert=True
+        )
+        await bump_data_version(request.firebase_uid, 'calculator_data')
+        await invalidate_responses(request.firebase_uid, 'calculator_data')
+
+        return jsonify({
+            'message': 'Calculator data saved successfully',
+            'id': str(result.upserted_id) if result.upserted_id else None
+        }), 200
+
+    except Exception as e:
+        print(f"Save calculator data error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
+
+@firebase_mongo_auth_bp.route('/calculator-data', methods=['GET'])
+@require_auth
+async def get_calculator_data():
+    """Get calculator data from MongoDB"""
+    try:
+        calculator_data = await get_calculator_data_collection('get_calculator_data').find_one({'firebase_uid': request.firebase_uid})
+
+        if not calculator_data:
+            return jsonify({'data': None}), 200
+
+        return jsonify({
+            'data': calculator_data.get('data')
+        }), 200
+
+    except Exception as e:
+        print(f"Get calculator data error: {str(e)}")
+        return jsonify({'error': 'Server error'}), 500
@@ -0,0 +1,24 @@
+# what every async write keeps in step besides the document itself (same as the sync routes) :)
+import asyncio
+import response_cache
+import repository
+from async_mongodb_config import get_daily_totals_collection, get_data_versions_collection
+
+async def update_daily_totals(firebase_uid, meals, sign):
+    """count meals into (sign 1) or out of (sign -1) daily_totals, like repository.daily_totals"""
+    operations = repository.daily_totals.operations(firebase_uid, meals, sign)
+    if operations:
+        await get_daily_totals_collection('update_daily_totals').bulk_write(operations, ordered=False)
+
+async def bump_data_version(firebase_uid, scope):
+    """new ETag version for scope, like repository.data_versions.bump"""
+    await get_data_versions_collection('bump_data_version').update_one(
+        {'_id': firebase_uid}, repository.data_versions.bump_update(scope), upsert=True
+    )
+
+async def invalidate_responses(firebase_uid, *routes):
+    """drop cached responses, like response_cache.invalidate_responses"""
+    # built by asgi.initialize_shared_services, None with RESPONSE_CACHE_BACKEND=none
+    if response_cache.response_cache is not None:
+        # the redis client blocks, keep it off the event loop
+        await asyncio.to_thread(response_cache.invalidate_responses, firebase_uid, *routes)
@@ -0,0 +1,133 @@
+# async meal routes (same json as meal_routes, see README for what isn't served here)
+from quart import Blueprint, request, jsonify
+from bson import ObjectId
+from models import Meal
+from async_mongodb_config import get_meals_collection
+from async_auth_middleware import require_auth
+from async_bookkeeping import update_daily_totals, bump_data_version, invalidate_responses
+from date_ranges import parse_range, range_filter
+from fieldsets import parse_fields
+from repository import MEAL_PAGE_SORT, MEAL_SPARSE_FIELDS, ROLLUP_MEAL_PROJECTION, meal_page, meal_page_query
+from response_cache import MEAL_ROUTES
+
+meal_bp = Blueprint('meals', __name__, url_prefix='/api/v1/meals')
+
+@meal_bp.route('/', methods=['POST'])
+@require_auth
+async def create_meal():
+    # create new meal
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error': 'no data provided'}), 400
+
+        # check required fields
+        if not data.get('name') or not data.get('meal_type'):
+            return jsonify({'error': 'need name and meal_type'}), 400
+
+        # create meal
+        meal = Meal(
+            name=data['name'].strip(),
+            meal_type=data['meal_type'].strip(),
+            calories=data.get('calories', 0),
+            notes=data.get('notes', '')
+        )
+
+        # validate
+        validation_errors = meal.validate()
+        if validation_errors:
+            return jsonify({'error': 'validation failed', 'details': validation_errors}), 400
+
+        # save to mongodb
+        meal_data = meal.to_dict()
+        meal_data['firebase_uid'] = request.firebase_uid
+        meal_data['user_id'] = str(request.current_user['_id'])
+
+        result = await get_meals_collection('create_meal').insert_one(meal_data)
+        await update_daily_totals(request.firebase_uid, [meal_data], 1)
+        await bump_data_version(request.firebase_uid, 'meals')
+        await invalidate_responses(request.firebase_uid, *MEAL_ROUTES)
+
+        return jsonify({
+            'message': 'meal created! :)',
+            'meal': {
+                'id': str(result.inserted_id),
+                'name': meal.name,
+                'meal_type': meal.meal_type,
+                'calories': meal.calories,
+                'notes': meal.notes,
+                'timestamp': meal.timestamp.isoformat()
+            }
+        }), 201
+
+    except Exception as e:
+        print(f"create meal error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
+
+@meal_bp.route('/', methods=['GET'])
+@require_auth
+async def get_meals():
+    # get user's meals, same paging, ?from=/?to=/?tz= and ?fields= as meal_routes.get_meals
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        if limit > 100:
+            limit = 100
+        if limit < 1:
+            limit = 1
+
+        try:
+            start, end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'invalid date range: {str(e)}'}), 400
+
+        try:
+            fields = parse_fields(request.args, MEAL_SPARSE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            query, projection = meal_page_query(
+                request.firebase_uid, request.args.get('cursor'), range_filter(start, end), fields
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # one extra document tells us whether there is a next page
+        meals_cursor = get_meals_collection('get_meals').find(query, projection).sort(MEAL_PAGE_SORT).limit(limit + 1)
+        page, next_cursor = meal_page(await meals_cursor.to_list(length=limit + 1), limit, fields)
+
+        # ids and timestamps are encoded by the app's json provider
+        return jsonify({
+            'meals': page,
+            'count': len(page),
+            'next_cursor': next_cursor
+        }), 200
+
+    except Exception as e:
+        print(f"get meals error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
+
+@meal_bp.route('/<meal_id>', methods=['DELETE'])
+@require_auth
+async def delete_meal(meal_id):
+    # delete a meal
+    try:
+        # verify meal exists and belongs to user, keeping what the rollups need
+        deleted_meal = await get_meals_collection('delete_meal').find_one_and_delete(
+            {'_id': ObjectId(meal_id), 'firebase_uid': request.firebase_uid},
+            projection=ROLLUP_MEAL_PROJECTION
+        )
+
+        if not deleted_meal:
+            return jsonify({'error': 'meal not found'}), 404
+
+        await update_daily_totals(request.firebase_uid, [deleted_meal], -1)
+        await bump_data_version(request.firebase_uid, 'meals')
+        await invalidate_responses(request.firebase_uid, *MEAL_ROUTES)
+
+        return jsonify({'message': 'meal deleted! :)'}), 200
+
+    except Exception as e:
+        print(f"delete meal error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
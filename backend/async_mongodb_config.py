@@ -0,0 +1,78 @@
+# async MongoDB connection (motor) for the ASGI app
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import Config
+from mongodb_config import get_operation_options, get_pool_options, pool_metrics
+
+class AsyncMongoDB:
+    """
+    Motor counterpart of mongodb_config.MongoDB.
+
+    The client binds to the running event loop, so connect() is awaited from
+    the app's startup hook in each worker rather than at import time.
+    """
+    _client = None
+    _db = None
+
+    async def connect(self):
+        """Connect to MongoDB and ping it"""
+        self._client = AsyncIOMotorClient(
+            Config.MONGODB_URI,
+            serverSelectionTimeoutMS=5000,
+            event_listeners=[pool_metrics],
+            **get_pool_options()
+        )
+        await self._client.admin.command('ping')
+        self._db = self._client[Config.MONGODB_DB_NAME]
+        print(f"async MongoDB connected to {Config.MONGODB_DB_NAME}! :)")
+
+    def get_db(self):
+        """Get database instance"""
+        if self._db is None:
+            raise RuntimeError("async MongoDB is not connected, await connect() first")
+        return self._db
+
+    def get_collection(self, collection_name, operation=None):
+        """Get a specific collection, configured with the operation's policy"""
+        collection = self.get_db()[collection_name]
+        if operation is None:
+            return collection
+        return collection.with_options(**get_operation_options(operation))
+
+    def close(self):
+        """Close MongoDB connection"""
+        if self._client:
+            self._client.close()
+            self._client = None
+            self._db = None
+            print("async MongoDB connection closed")
+
+# global async mongodb instance
+async_mongodb = AsyncMongoDB()
+
+def get_async_mongodb():
+    """Get async MongoDB instance"""
+    return async_mongodb
+
+def get_users_collection(operation=None):
+    """Get users collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('users', operation)
+
+def get_calculator_data_collection(operation=None):
+    """Get calculator data collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('calculator_data', operation)
+
+def get_meals_collection(operation=None):
+    """Get meals collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('meals', operation)
+
+def get_routine_collection(operation=None):
+    """Get routine collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('routine', operation)
+
+def get_daily_totals_collection(operation=None):
+    """Get daily totals collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('daily_totals', operation)
+
+def get_data_versions_collection(operation=None):
+    """Get data versions collection (operation picks the policy in OPERATION_POLICIES)"""
+    return async_mongodb.get_collection('data_versions', operation)
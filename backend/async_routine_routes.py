@@ -0,0 +1,147 @@
+# async routine routes (same json as routine_routes, see README for what isn't served here)
+from quart import Blueprint, request, jsonify
+from bson import ObjectId
+from models import Routine
+from async_mongodb_config import get_routine_collection
+from async_auth_middleware import require_auth
+from async_bookkeeping import bump_data_version, invalidate_responses
+from date_ranges import parse_weekdays
+from fieldsets import parse_fields
+from repository import ROUTINE_FIELDS, ROUTINE_SPARSE_FIELDS, routine_page, routine_page_query
+
+routine_bp = Blueprint('routine', __name__, url_prefix='/api/v1/routine')
+
+@routine_bp.route('/', methods=['POST'])
+@require_auth
+async def create_routine():
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No routine added'}), 400
+        if not data.get('activeDay') or not data.get('selected'):
+            return jsonify({'error' : 'Either no day was selected or a workout'}), 400
+
+        routine = Routine(
+            showPopup=data.get('showPopup', False),
+            activeDay=data['activeDay'],
+            selected=data['selected'],
+            duration=data.get('duration', ''),
+            speed=data.get('speed',''),
+            distance=data.get('distance',''),
+            highIntensity=data.get('highIntensity', ''),
+            lowIntensity=data.get('lowIntensity', ''),
+            restTime=data.get('restTime',''),
+            exercise=data.get('exercise', []),
+            notes=data.get('notes',''),
+            exercisePerRound=data.get('exercisePerRound','')
+        )
+
+        routine_data = routine.to_dict()
+        routine_data['firebase_uid'] = request.firebase_uid
+        routine_data['user_id'] = str(request.current_user['_id'])
+
+        result = await get_routine_collection('create_routine').insert_one(routine_data)
+        await bump_data_version(request.firebase_uid, 'routine')
+        await invalidate_responses(request.firebase_uid, 'routine')
+
+        routine_response = {'id': str(result.inserted_id)}
+        routine_response.update(routine.to_dict())
+        return jsonify({
+            'message' : 'routine created',
+            'routine' : routine_response
+        }), 201
+
+    except Exception as error:
+        print(f"create routine error: {str(error)}")
+        return jsonify({'error' : 'servor error'}),500
+
+@routine_bp.route('/', methods=['GET'])
+@require_auth
+async def get_routine():
+    try:
+        # same ?limit=/?cursor=, ?day=/?from=/?to= and ?fields= as routine_routes.get_routine
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), 100)
+        cursor = request.args.get('cursor')
+
+        try:
+            active_days = parse_weekdays(request.args)
+        except ValueError as error:
+            return jsonify({'error': f'invalid day filter: {str(error)}'}), 400
+
+        try:
+            fields = parse_fields(request.args, ROUTINE_SPARSE_FIELDS)
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+        try:
+            query, projection = routine_page_query(request.firebase_uid, cursor, active_days, fields)
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+        routine_cursor = get_routine_collection('get_routine').find(query, projection).sort('_id', 1)
+        if limit:
+            routine_user, next_cursor = routine_page(await routine_cursor.limit(limit + 1).to_list(length=limit + 1), limit)
+        else:
+            routine_user, next_cursor = await routine_cursor.to_list(length=None), None
+
+        if not routine_user and not cursor:
+            return jsonify({'error': 'No routine found'}), 404
+
+        return jsonify({'routine': routine_user, 'next_cursor': next_cursor}), 200
+    except Exception as error:
+        print(f"routine error: {str(error)}")
+        return jsonify({'error' : 'server error'}), 500
+
+@routine_bp.route('/<routine_id>', methods=['PUT'])
+@require_auth
+async def update_routine(routine_id):
+    try:
+        data = await request.get_json()
+
+        if not data:
+            return jsonify({'error' : 'no data is given'}), 400
+
+        updated_data = {field: data[field] for field in ROUTINE_FIELDS if field in data}
+        if not updated_data:
+            return jsonify({'error' : 'no fields were updated'}),400
+
+        result = await get_routine_collection('update_routine').update_one(
+            {'_id' : ObjectId(routine_id), 'firebase_uid' : request.firebase_uid},
+            {'$set' : updated_data}
+        )
+        # someone else's (or a deleted) routine, nothing changed so nothing to bump
+        if result.matched_count == 0:
+            return jsonify({'error' : 'routine not found'}), 404
+
+        await bump_data_version(request.firebase_uid, 'routine')
+        await invalidate_responses(request.firebase_uid, 'routine')
+
+        return jsonify({
+            'message' : 'routine updated',
+            'updates' : list(updated_data.keys()),
+        }),200
+
+    except Exception as error:
+        print(f"updating routine error: {str(error)}")
+        return jsonify({'error': 'server error'}), 500
+
+@routine_bp.route('/<routine_id>',methods=['DELETE'])
+@require_auth
+async def delete_routine(routine_id):
+    try:
+        result = await get_routine_collection('delete_routine').delete_one({
+            '_id': ObjectId(routine_id),
+            'firebase_uid':request.firebase_uid
+        })
+
+        if result.deleted_count == 0:
+            return jsonify({'error':'routine was not deleted'}),400
+        await bump_data_version(request.firebase_uid, 'routine')
+        await invalidate_responses(request.firebase_uid, 'routine')
+        return jsonify({'message' : 'routine was deleted'}), 200
+    except Exception as error:
+        print(f"delete routine error: {str(error)}")
+        return jsonify({'error':'server error'}),500
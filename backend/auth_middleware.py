@@ -1,9 +1,9 @@
 # authentication middleware for protecting routes
-from flask import request, jsonify
+from flask import g, request, jsonify
 from functools import wraps
 from firebase_admin import auth
-from mongodb_config import get_users_collection
-from firebase_config import get_firebase_service
+from user_cache import get_cached_user
+from firebase_config import verify_id_token
 
 def require_auth(f):
     """
@@ -17,6 +17,12 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
+        # sub-requests of POST /api/v1/batch reuse the batch's auth pass
+        batch_identity = g.get('batch_identity')
+        if batch_identity is not None:
+            request.current_user, request.firebase_uid, request.user_email = batch_identity
+            return f(*args, **kwargs)
+
         # get token from authorization header
         auth_header = request.headers.get('Authorization', '')
 
@@ -24,17 +30,14 @@ def require_auth(f):
             return jsonify({'error': 'invalid authorization header'}), 401
 
         try:
-            get_firebase_service()
-
             id_token = auth_header.split('Bearer ')[1]
 
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = verify_id_token(id_token)
             firebase_uid = decoded_token['uid']
             email = decoded_token.get('email')
 
-            # get user from mongodb
-            users_collection = get_users_collection()
-            user = users_collection.find_one({'firebase_uid': firebase_uid})
+            # get user from mongodb (served from the user cache when warm)
+            user = get_cached_user(firebase_uid)
 
             if not user:
                 return jsonify({'error': 'user not found in database'}), 404
@@ -60,8 +63,7 @@ def require_auth(f):
 
 def verify_firebase_token(id_token):
     try:
-        get_firebase_service()
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = verify_id_token(id_token)
         return decoded_token
     except Exception as e:
         print(f"token verification error: {str(e)}")
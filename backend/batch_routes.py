@@ -0,0 +1,126 @@
+# batch endpoint: many api calls, one round trip and one auth pass :)
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from auth_middleware import require_auth
+from user_cache import get_cached_user
+
+batch_bp = Blueprint('batch', __name__, url_prefix='/api/v1/batch')
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+# sub-request headers passed through (auth comes from the batch itself)
+BATCH_HEADERS = ('If-None-Match',)
+
+def validate_item(item, index):
+    """error message for a malformed sub-request, or None"""
+    if not isinstance(item, dict):
+        return f'request {index} is not an object'
+    if item.get('method', 'GET').upper() not in BATCH_METHODS:
+        return f"request {index}: method must be one of {', '.join(BATCH_METHODS)}"
+    path = item.get('path')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return f"request {index}: path must be an /api/ path"
+    return None
+
+def build_environ(item):
+    """the WSGI environ of a sub-request (its path percent-decoded like any request's)"""
+    headers = {name: value for name, value in (item.get('headers') or {}).items() if name in BATCH_HEADERS}
+    builder = EnvironBuilder(
+        path=item['path'],
+        method=item.get('method', 'GET').upper(),
+        json=item.get('body'),
+        headers=headers,
+        base_url=request.host_url
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+def matched_endpoint(environ):
+    """the endpoint the app's url map routes an environ to, or None"""
+    try:
+        endpoint, _ = current_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    return endpoint
+
+def dispatch(environ):
+    """run one sub-request through the app in-process, returning its result entry"""
+    with current_app.request_context(environ):
+        response = current_app.full_dispatch_request()
+
+    try:
+        if response.is_streamed:
+            return {'status': 400, 'body': {'error': "streaming endpoints can't be batched"}}
+        result = {
+            'status': response.status_code,
+            'body': response.get_json(silent=True) if response.is_json else response.get_data(as_text=True) or None
+        }
+        if response.headers.get('ETag'):
+            result['etag'] = response.headers['ETag']
+        return result
+    finally:
+        response.close()
+
+@batch_bp.route('/', methods=['POST'])
+@require_auth
+def run_batch():
+    """
+    Run up to BATCH_MAX_REQUESTS api calls in one request.
+
+    Body: {"requests": [{"method": "GET", "path": "/api/v1/meals/?limit=20"}, ...]}
+    with an optional "body" (json) and "headers" ({"If-None-Match": ...}) per
+    item. The token is verified once here, sub-requests reuse that identity.
+    Items run in order and each gets its own status in the response.
+    """
+    try:
+        # sub-requests share g, a batch inside a batch would reset the outer one's identity
+        if g.get('batch_identity') is not None:
+            return jsonify({'error': "batches can't be nested"}), 400
+
+        data = request.get_json(silent=True)
+        items = data.get('requests') if isinstance(data, dict) else data
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'need a non-empty list of requests'}), 400
+
+        max_size = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if len(items) > max_size:
+            return jsonify({'error': f'batch too large, max {max_size} requests'}), 400
+
+        environs = []
+        for index, item in enumerate(items):
+            error = validate_item(item, index)
+            if error:
+                return jsonify({'error': error}), 400
+            # matched after routing, so encoded paths like /api/v1/%62atch/ are caught too
+            environs.append(build_environ(item))
+            if matched_endpoint(environs[-1]) == request.endpoint:
+                return jsonify({'error': f"request {index}: batches can't be nested"}), 400
+
+        # require_auth sees this and skips token verification for the sub-requests
+        g.batch_identity = (request.current_user, request.firebase_uid, request.user_email)
+        results = []
+        try:
+            for index, (item, environ) in enumerate(zip(items, environs)):
+                result = dispatch(environ)
+                result['index'] = index
+                if 'id' in item:
+                    result['id'] = item['id']
+                results.append(result)
+
+                # a write may have changed the user document, later items should see it
+                if item.get('method', 'GET').upper() != 'GET':
+                    user = get_cached_user(request.firebase_uid)
+                    if user:
+                        g.batch_identity = (user, request.firebase_uid, request.user_email)
+        finally:
+            g.pop('batch_identity', None)
+
+        return jsonify({'responses': results, 'count': len(results)}), 200
+
+    except Exception as e:
+        print(f"batch error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_meals serialization: the old per-document rewrite loop plus
+Flask's stdlib json provider against MongoJSONProvider on raw documents.
+
+    python bench_json.py --meals 100 --iterations 2000
+
+No database needed, the meal lists are synthetic documents shaped like
+what MealRepository.find_page returns.
+"""
+
+import argparse
+import copy
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import MongoJSONProvider, orjson
+
+def synthetic_page(count):
+    """one get_meals page as it comes back from mongo"""
+    now = datetime.utcnow()
+    meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
+    return [
+        {
+            'id': ObjectId(),
+            'name': f'meal {index}',
+            'meal_type': meal_types[index % len(meal_types)],
+            'calories': random.randint(100, 900),
+            'notes': 'oats, berries and a coffee',
+            'timestamp': now - timedelta(hours=index * 5, microseconds=random.randint(0, 999999)),
+            'user_id': str(ObjectId()),
+            'firebase_uid': 'bench-user'
+        }
+        for index in range(count)
+    ]
+
+def old_path(provider, page):
+    # what get_meals did before: rewrite every document, then stdlib json
+    meals = []
+    for meal in page:
+        meal['id'] = str(meal['id'])
+        if 'timestamp' in meal and hasattr(meal['timestamp'], 'isoformat'):
+            meal['timestamp'] = meal['timestamp'].isoformat()
+        meals.append(meal)
+    return provider.response({'meals': meals, 'count': len(meals), 'next_cursor': None}).get_data()
+
+def new_path(provider, page):
+    return provider.response({'meals': page, 'count': len(page), 'next_cursor': None}).get_data()
+
+def bench(label, func, provider, page, iterations):
+    # the old path mutates its input, give every iteration a fresh copy (not timed)
+    pages = [copy.deepcopy(page) for _ in range(iterations)]
+    started = time.perf_counter()
+    for fresh_page in pages:
+        body = func(provider, fresh_page)
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / iterations * 1_000_000
+    print(f"{label:34}{per_call_us:>10.1f} us/response{len(body):>10} bytes")
+    return per_call_us
+
+def main():
+    parser = argparse.ArgumentParser(description='get_meals json serialization benchmark')
+    parser.add_argument('--meals', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    page = synthetic_page(args.meals)
+    print(f"{args.meals} meals per response, {args.iterations} iterations "
+          f"(orjson {'available' if orjson else 'missing, stdlib fallback'})\n")
+
+    old = bench('loop + DefaultJSONProvider', old_path, DefaultJSONProvider(app), page, args.iterations)
+    new = bench('MongoJSONProvider', new_path, MongoJSONProvider(app), page, args.iterations)
+    print(f"\n{old / new:.1f}x faster")
+
+if __name__ == '__main__':
+    main()
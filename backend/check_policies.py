@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Check OPERATION_POLICIES against a real replica set.
+
+Runs every declared operation on a scratch collection and uses command
+monitoring to confirm which member served it and which read/write concern
+went over the wire. Start a local three node replica set first, e.g.
+
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0-0
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs0-1
+    mongod --replSet rs0 --port 27019 --dbpath /tmp/rs0-2
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017"}, {_id: 1, host: "localhost:27018"},
+        {_id: 2, host: "localhost:27019"}]})'
+
+    MONGODB_URI="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" \
+        python check_policies.py
+"""
+
+import sys
+import threading
+from pymongo import MongoClient, WriteConcern, monitoring
+from config import Config
+from mongodb_config import OPERATION_POLICIES, get_operation_options
+
+class CommandRecorder(monitoring.CommandListener):
+    """remember the server address and command document of every command"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands = []
+
+    def started(self, event):
+        with self._lock:
+            self.commands.append((event.command_name, event.connection_id[:2], event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def last(self, command_name):
+        with self._lock:
+            for name, address, command in reversed(self.commands):
+                if name == command_name:
+                    return address, command
+        return None, None
+
+def check_operation(collection, recorder, operation, policy, primary, secondaries):
+    """run one operation and return a list of policy violations"""
+    problems = []
+    scoped = collection.with_options(**get_operation_options(operation))
+
+    if 'write_concern' in policy:
+        scoped.insert_one({'operation': operation})
+        address, command = recorder.last('insert')
+        expected = policy['write_concern']
+        sent = command.get('writeConcern', {})
+        for key, value in expected.items():
+            if sent.get(key) != value:
+                problems.append(f"writeConcern {key}={sent.get(key)!r}, expected {value!r}")
+
+    if 'read_preference' in policy or 'read_concern' in policy:
+        scoped.find_one({'operation': operation})
+        address, command = recorder.last('find')
+        mode = policy.get('read_preference')
+        if mode in ('secondary', 'secondaryPreferred') and secondaries and address not in secondaries:
+            problems.append(f"read served by {address}, expected a secondary")
+        if mode == 'primary' and address != primary:
+            problems.append(f"read served by {address}, expected the primary {primary}")
+        if 'read_concern' in policy:
+            level = command.get('readConcern', {}).get('level')
+            if level != policy['read_concern']:
+                problems.append(f"readConcern level={level!r}, expected {policy['read_concern']!r}")
+
+    return problems
+
+def main():
+    recorder = CommandRecorder()
+    client = MongoClient(Config.MONGODB_URI, serverSelectionTimeoutMS=5000, event_listeners=[recorder])
+    client.admin.command('ping')
+
+    primary = client.primary
+    secondaries = client.secondaries
+    if not secondaries:
+        print("warning: no secondaries found, secondary reads can't be checked (is this a replica set?)")
+
+    collection = client[Config.MONGODB_DB_NAME]['policy_check']
+    # make sure the scratch documents reached every member before reading them back
+    collection.with_options(write_concern=WriteConcern(w=len(secondaries) + 1)).insert_many(
+        [{'operation': operation} for operation in OPERATION_POLICIES]
+    )
+
+    failures = 0
+    try:
+        for operation, policy in OPERATION_POLICIES.items():
+            problems = check_operation(collection, recorder, operation, policy, primary, secondaries)
+            if problems:
+                failures += 1
+                print(f"FAIL {operation}: {'; '.join(problems)}")
+            else:
+                print(f"ok   {operation}")
+    finally:
+        collection.drop()
+        client.close()
+
+    if failures:
+        print(f"{failures} operation(s) don't match their policy")
+        sys.exit(1)
+    print("all operation policies verified! :)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+# Accept-Encoding negotiated response compression (gzip / brotli / zstd) :)
+import threading
+import time
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # br just isn't offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # same for zstd
+    zstandard = None
+
+# mimetypes worth compressing (json lists, ndjson exports, text)
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+class CompressionMetrics:
+    """bytes in/out and cpu time per encoding, for the metrics endpoint"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings = {}
+        self.skipped_small = 0
+        self.skipped_not_accepted = 0
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            totals = self._encodings.setdefault(encoding, {'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0})
+            totals['responses'] += 1
+            totals['bytes_in'] += bytes_in
+            totals['bytes_out'] += bytes_out
+            totals['cpu_seconds'] += cpu_seconds
+
+    def skip(self, reason):
+        with self._lock:
+            setattr(self, reason, getattr(self, reason) + 1)
+
+    def stats(self):
+        with self._lock:
+            encodings = {
+                encoding: {
+                    'responses': totals['responses'],
+                    'bytes_in': totals['bytes_in'],
+                    'bytes_out': totals['bytes_out'],
+                    'ratio': round(totals['bytes_in'] / totals['bytes_out'], 2) if totals['bytes_out'] else 0.0,
+                    'cpu_ms': round(totals['cpu_seconds'] * 1000, 3),
+                    'cpu_ms_per_response': round(totals['cpu_seconds'] * 1000 / totals['responses'], 3)
+                }
+                for encoding, totals in self._encodings.items()
+            }
+            return {
+                'encodings': encodings,
+                'skipped_small': self.skipped_small,
+                'skipped_not_accepted': self.skipped_not_accepted
+            }
+
+# global compression metrics (per process)
+compression_metrics = CompressionMetrics()
+
+def get_compression_metrics():
+    """Get response compression counters for this process"""
+    return compression_metrics.stats()
+
+class _Compressor:
+    """one response's worth of incremental compression for an encoding"""
+    def __init__(self, encoding, level):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            self._gzip = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == 'br':
+            self._brotli = brotli.Compressor(quality=level)
+        else:
+            self._zstd = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        """feed a chunk in, returning whatever compressed output is ready"""
+        if self.encoding == 'gzip':
+            return self._gzip.compress(chunk)
+        if self.encoding == 'br':
+            return self._brotli.process(chunk)
+        return self._zstd.compress(chunk)
+
+    def flush(self):
+        """emit everything fed in so far without ending the stream"""
+        if self.encoding == 'gzip':
+            return self._gzip.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == 'br':
+            return self._brotli.flush()
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        if self.encoding == 'gzip':
+            return self._gzip.flush(zlib.Z_FINISH)
+        if self.encoding == 'br':
+            return self._brotli.finish()
+        return self._zstd.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+def compress_bytes(encoding, level, body):
+    """one-shot compression of a whole body"""
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+def available_encodings(config):
+    """COMPRESSION_ALGORITHMS in preference order, minus any whose library is missing"""
+    installed = {'gzip': True, 'br': brotli is not None, 'zstd': zstandard is not None}
+    return [encoding for encoding in config.get('COMPRESSION_ALGORITHMS', ['zstd', 'br', 'gzip'])
+            if installed.get(encoding)]
+
+def negotiated_encoding():
+    """the encoding this request's Accept-Encoding gets (None for identity)"""
+    config = current_app.config
+    if not config.get('COMPRESSION_ENABLED', True):
+        return None
+    return request.accept_encodings.best_match(available_encodings(config))
+
+def _level(config, encoding):
+    return config.get('COMPRESSION_LEVELS', {}).get(encoding, {'gzip': 6, 'br': 4, 'zstd': 3}[encoding])
+
+def _compress_stream(chunks, encoding, level, flush_bytes):
+    # compress chunks as the app yields them, flushing every flush_bytes of input
+    # (flushing every small ndjson line would throw most of the ratio away)
+    compressor = _Compressor(encoding, level)
+    bytes_in = bytes_out = unflushed = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            started = time.thread_time()
+            compressed = compressor.compress(chunk)
+            unflushed += len(chunk)
+            if unflushed >= flush_bytes:
+                compressed += compressor.flush()
+                unflushed = 0
+            cpu_seconds += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(compressed)
+            if compressed:
+                yield compressed
+
+        started = time.thread_time()
+        tail = compressor.finish()
+        cpu_seconds += time.thread_time() - started
+        bytes_out += len(tail)
+        yield tail
+        compression_metrics.record(encoding, bytes_in, bytes_out, cpu_seconds)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def _encoded_etag(response, encoding):
+    # a compressed body is a different representation, so it gets its own strong ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+def compress_response(response):
+    """
+    after_request hook: compress json/ndjson/text responses with the best
+    encoding the client accepts.
+
+    Whole bodies are only compressed at COMPRESSION_MIN_SIZE bytes or more
+    (and only kept if they actually got smaller); streamed bodies can't be
+    measured up front, so they are always compressed as they are generated,
+    flushed to the client every COMPRESSION_STREAM_FLUSH_BYTES of input.
+    """
+    config = current_app.config
+    if not config.get('COMPRESSION_ENABLED', True):
+        return response
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.direct_passthrough
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)):
+        return response
+
+    # whatever we pick, the body depends on Accept-Encoding
+    response.vary.add('Accept-Encoding')
+
+    encoding = negotiated_encoding()
+    if not encoding:
+        compression_metrics.skip('skipped_not_accepted')
+        return response
+    level = _level(config, encoding)
+
+    if response.is_streamed:
+        response.response = _compress_stream(
+            response.response, encoding, level, config.get('COMPRESSION_STREAM_FLUSH_BYTES', 16384)
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < config.get('COMPRESSION_MIN_SIZE', 1024):
+            compression_metrics.skip('skipped_small')
+            return response
+
+        started = time.thread_time()
+        compressed = compress_bytes(encoding, level, body)
+        compression_metrics.record(encoding, len(body), len(compressed), time.thread_time() - started)
+        if len(compressed) >= len(body):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    _encoded_etag(response, encoding)
+    return response
+
+def init_compression(app):
+    """compress every blueprint's responses"""
+    app.after_request(compress_response)
@@ -20,7 +20,66 @@ class Config:
     # mongodb config
     MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
     MONGODB_DB_NAME = os.environ.get('MONGODB_DB_NAME', 'macromatch')
+    MONGODB_MAX_POOL_SIZE = int(os.environ.get('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MIN_POOL_SIZE = int(os.environ.get('MONGODB_MIN_POOL_SIZE', 0))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.environ['MONGODB_WAIT_QUEUE_TIMEOUT_MS']) if os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS') else None
+    MONGODB_MAX_IDLE_TIME_MS = int(os.environ['MONGODB_MAX_IDLE_TIME_MS']) if os.environ.get('MONGODB_MAX_IDLE_TIME_MS') else None
+    MONGODB_OPERATION_POLICIES = os.environ.get('MONGODB_OPERATION_POLICIES', 'true').lower() == 'true'
+    MONGODB_ENSURE_INDEXES = os.environ.get('MONGODB_ENSURE_INDEXES', 'true').lower() == 'true'
+    MONGODB_VERIFY_INDEXES = os.environ.get('MONGODB_VERIFY_INDEXES', 'false').lower() == 'true'
     
+    # token verifier config ('firebase' or 'offline' for load tests)
+    TOKEN_VERIFIER = os.environ.get('TOKEN_VERIFIER', 'firebase')
+    OFFLINE_TOKEN_PUBLIC_KEY_FILE = os.environ.get('OFFLINE_TOKEN_PUBLIC_KEY_FILE')
+    OFFLINE_TOKEN_PRIVATE_KEY_FILE = os.environ.get('OFFLINE_TOKEN_PRIVATE_KEY_FILE')
+    
+    # auth caching config
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 4096))
+    USER_CACHE_ENABLED = os.environ.get('USER_CACHE_ENABLED', 'true').lower() == 'true'
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    
+    # meal config
+    MEAL_BATCH_MAX_SIZE = int(os.environ.get('MEAL_BATCH_MAX_SIZE', 100))
+    # 'document' (one document per meal) or 'bucket' (one document per user per day)
+    MEAL_STORAGE_MODE = os.environ.get('MEAL_STORAGE_MODE', 'document')
+    MEAL_BUCKET_MAX_SIZE = int(os.environ.get('MEAL_BUCKET_MAX_SIZE', 50))
+    
+    # response cache config ('memory', 'redis' or 'none')
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 10000))
+    RESPONSE_CACHE_MAX_VARIANTS = int(os.environ.get('RESPONSE_CACHE_MAX_VARIANTS', 32))
+    RESPONSE_CACHE_MAX_BODY_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BODY_BYTES', 262144))
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # response compression config (algorithms in preference order)
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_STREAM_FLUSH_BYTES = int(os.environ.get('COMPRESSION_STREAM_FLUSH_BYTES', 16384))
+    COMPRESSION_ALGORITHMS = os.environ.get('COMPRESSION_ALGORITHMS', 'zstd,br,gzip').split(',')
+    COMPRESSION_LEVELS = {
+        'gzip': int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6)),
+        'br': int(os.environ.get('COMPRESSION_BR_LEVEL', 4)),
+        'zstd': int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3)),
+    }
+    
+    # conditional read config (no ETags this long after a write, covers replica lag)
+    ETAG_SETTLE_SECONDS = int(os.environ.get('ETAG_SETTLE_SECONDS', 5))
+    
+    # batch config
+    BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+    
+    # dashboard config (threads shared by every dashboard request in a worker)
+    DASHBOARD_MAX_WORKERS = int(os.environ.get('DASHBOARD_MAX_WORKERS', 16))
+    
+    # export config
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 500))
+    
+    # worker warmup config
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', 'true').lower() == 'true'
+    # certs are renewed from google's Cache-Control max-age, this is the wait without one (0 turns it off)
+    CERT_REFRESH_INTERVAL = int(os.environ.get('CERT_REFRESH_INTERVAL', 3600))
     
     # cors config
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',')
@@ -31,9 +90,16 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
 
+class TestingConfig(Config):
+    TESTING = True
+    DEBUG = True
+    WARMUP_ENABLED = False
+    MONGODB_ENSURE_INDEXES = False
+
 # config dictionary
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,122 @@
+# shared pytest fixtures: mongomock in place of mongodb, a test app and an authed client :)
+import sys
+
+import mongomock
+import pytest
+from pymongo import DeleteOne, InsertOne, UpdateOne
+
+import auth_middleware
+import mongodb_config
+import response_cache
+import user_cache
+
+# talks to a running server, run it with: python test_api.py
+collect_ignore = ['test_api.py']
+
+TEST_UID = 'test-uid'
+
+class _RenamingCursor:
+    """mongomock cursor that applies {'id': '$_id'} style projections after the fetch"""
+    def __init__(self, cursor, renames, dropped):
+        self._cursor = cursor
+        self._renames = renames
+        self._dropped = dropped
+
+    def sort(self, *args, **kwargs):
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor.limit(limit)
+        return self
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        for document in self._cursor:
+            for target, source in self._renames.items():
+                document[target] = document.get(source)
+            for source in self._dropped:
+                document.pop(source, None)
+            yield document
+
+class MockCollection:
+    """a mongomock collection plus the pymongo 4 features it lacks (bulk_write, computed projections)"""
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def find(self, filter=None, projection=None, **kwargs):
+        kwargs.pop('batch_size', None)
+        renames = {key: value[1:] for key, value in (projection or {}).items()
+                   if isinstance(value, str) and value.startswith('$')}
+        if not renames:
+            return self._collection.find(filter, projection, **kwargs)
+
+        fetched = {key: value for key, value in projection.items() if key not in renames}
+        dropped = {source for source in renames.values() if fetched.get(source) == 0}
+        fetched.update({source: 1 for source in renames.values()})
+        return _RenamingCursor(self._collection.find(filter, fetched, **kwargs), renames, dropped)
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            if isinstance(operation, InsertOne):
+                self._collection.insert_one(operation._doc)
+            elif isinstance(operation, UpdateOne):
+                self._collection.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            elif isinstance(operation, DeleteOne):
+                self._collection.delete_one(operation._filter)
+            else:
+                raise NotImplementedError(f"{type(operation).__name__} in bulk_write")
+
+class MockMongoDB:
+    """stands in for mongodb_config.MongoDB"""
+    def __init__(self):
+        self.client = mongomock.MongoClient()
+        self.db = self.client['macromatch_test']
+
+    def get_db(self):
+        return self.db
+
+    def get_collection(self, collection_name, operation=None):
+        # undeclared operations still fail like they do against a real server
+        mongodb_config.get_operation_options(operation)
+        return MockCollection(self.db[collection_name])
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """a fresh mongomock database behind every get_*_collection"""
+    mock = MockMongoDB()
+    monkeypatch.setattr(mongodb_config, 'get_mongodb', lambda: mock)
+    # these bind get_mongodb at import, so whichever test imports them first would decide
+    for module in ('indexes', 'meal_storage'):
+        if module in sys.modules:
+            monkeypatch.setattr(sys.modules[module], 'get_mongodb', lambda: mock)
+    return mock.db
+
+@pytest.fixture
+def app(mongo, monkeypatch):
+    """the flask app on mongomock, tokens are just the firebase uid"""
+    from app import create_app
+
+    monkeypatch.setattr(response_cache, 'response_cache', None)
+    monkeypatch.setattr(user_cache, 'user_cache', None)
+    monkeypatch.setattr(auth_middleware, 'verify_id_token', lambda id_token: {'uid': id_token, 'email': f'{id_token}@example.com'})
+    return create_app('testing')
+
+@pytest.fixture
+def user(mongo):
+    """a user document for TEST_UID"""
+    user = {'firebase_uid': TEST_UID, 'email': f'{TEST_UID}@example.com', 'name': 'Test User'}
+    user['_id'] = mongo.users.insert_one(user).inserted_id
+    return user
+
+@pytest.fixture
+def client(app, user):
+    """test client that sends TEST_UID's bearer token"""
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {TEST_UID}'
+    return client
@@ -0,0 +1,120 @@
+# home page dashboard: everything the first screen needs in one request :)
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, jsonify, request
+from auth_middleware import require_auth
+from date_ranges import get_timezone, parse_date_param, range_filter
+from user_routes import user_profile_response
+import repository
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/v1/dashboard')
+
+# global query pool (re-created in each forked worker, threads don't survive fork)
+dashboard_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+def get_dashboard_executor():
+    """get or create the bounded thread pool the dashboard queries run on"""
+    global dashboard_executor, _executor_pid
+    with _executor_lock:
+        if dashboard_executor is None or _executor_pid != os.getpid():
+            dashboard_executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('DASHBOARD_MAX_WORKERS', 16),
+                thread_name_prefix='dashboard'
+            )
+            _executor_pid = os.getpid()
+        return dashboard_executor
+
+def _timed(query, *args):
+    # run a repository call, returning (result, milliseconds)
+    started = time.perf_counter()
+    result = query(*args)
+    return result, round((time.perf_counter() - started) * 1000, 2)
+
+def _rollup_totals(firebase_uid, today_range):
+    # a utc day's daily_totals row, one point read instead of grouping the day's meals
+    rows = repository.daily_totals.find_range(
+        firebase_uid, repository.rollup_date(today_range['$gte']), repository.rollup_date(today_range['$lt'])
+    )
+    row = rows[0] if rows else {}
+    return {
+        'meal_count': row.get('meal_count', 0),
+        'total_calories': row.get('calories', 0),
+        # a type whose meals were all deleted keeps a zeroed entry
+        'calories_by_type': {
+            meal_type: group['calories'] for meal_type, group in row.get('by_type', {}).items() if group.get('count')
+        }
+    }
+
+def _grouped_totals(meals, firebase_uid, today_range):
+    # group the day's meals when it isn't a whole utc day the rollups could answer
+    totals = meals.stats_by_type(firebase_uid, today_range)
+    return {
+        'meal_count': sum(group['count'] for group in totals),
+        'total_calories': sum(group['calories'] for group in totals),
+        'calories_by_type': {group['_id'] or 'unknown': group['calories'] for group in totals}
+    }
+
+def _is_utc_day(today_range):
+    # rollups are per utc day, so they only match "today" when it starts at utc midnight and lasts 24h
+    start, end = today_range['$gte'], today_range['$lt']
+    return start == start.replace(hour=0, minute=0, second=0, microsecond=0) and end - start == timedelta(days=1)
+
+@dashboard_bp.route('/', methods=['GET'])
+@require_auth
+def get_dashboard():
+    """
+    Profile, calculator data, today's meals and totals and the week's routine.
+
+    The profile comes from the auth lookup; the four collection queries are
+    independent, so they run at the same time on the dashboard pool and the
+    request takes about as long as the slowest one. ?tz= sets which day is
+    "today" (utc by default). Today's totals come from the daily_totals
+    rollup when today is a whole utc day (utc, or a zone at +00:00 that
+    day); any other zone's day straddles two rollup rows, so its meals are
+    grouped instead.
+    """
+    try:
+        try:
+            tz = get_timezone(request.args.get('tz'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        today = datetime.now(tz).strftime('%Y-%m-%d')
+        today_range = range_filter(parse_date_param(today, tz=tz), parse_date_param(today, end_of_range=True, tz=tz))
+        firebase_uid = request.firebase_uid
+        # the pool threads have no app context to pick the layout from
+        meals = repository.meal_repository()
+
+        executor = get_dashboard_executor()
+        futures = {
+            'calculator_data': executor.submit(_timed, repository.calculator_data.find_data, firebase_uid),
+            'meals': executor.submit(_timed, meals.find_page, firebase_uid, 100, None, today_range),
+            'totals': (executor.submit(_timed, _rollup_totals, firebase_uid, today_range) if _is_utc_day(today_range)
+                       else executor.submit(_timed, _grouped_totals, meals, firebase_uid, today_range)),
+            'routine': executor.submit(_timed, repository.routines.find_page, firebase_uid, None),
+        }
+        results = {}
+        query_ms = {}
+        for name, future in futures.items():
+            results[name], query_ms[name] = future.result()
+
+        meals, _ = results['meals']
+        routine, _ = results['routine']
+        totals = results['totals']
+
+        return jsonify({
+            'user': user_profile_response(request.current_user),
+            'calculator_data': results['calculator_data'],
+            'today': {'date': today, 'meals': meals, **totals},
+            'routine': routine,
+            'query_ms': query_ms
+        }), 200
+
+    except Exception as e:
+        print(f"get dashboard error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
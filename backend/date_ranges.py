@@ -0,0 +1,85 @@
+# ?from= / ?to= / ?tz= query parameter parsing :)
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# routine activeDay values, in datetime.weekday() order
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+def get_timezone(name):
+    """the zone for a ?tz= IANA name (e.g. America/Chicago), utc when unset"""
+    if not name:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"unknown timezone '{name}'")
+
+def parse_date_param(value, end_of_range=False, tz=timezone.utc):
+    """
+    Parse a YYYY-MM-DD date or an ISO datetime into a naive UTC datetime.
+
+    Dates and datetimes without an offset are read as local time in tz, so a
+    bare date means that day's midnight where the user is. A bare date used
+    as the end of a range means "through the end of that day", so it becomes
+    the start of the next day (the range end is exclusive). Raises ValueError
+    for anything else.
+    """
+    if len(value) == 10:
+        parsed = datetime.strptime(value, '%Y-%m-%d')
+        if end_of_range:
+            parsed += timedelta(days=1)
+    else:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=tz)
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+def parse_range(args):
+    """
+    Read ?from=, ?to= and ?tz= from request args into a (start, end) pair.
+
+    Either side may be None. end is exclusive. Raises ValueError for bad values
+    or a range that ends before it starts.
+    """
+    tz = get_timezone(args.get('tz'))
+    start = parse_date_param(args['from'], tz=tz) if args.get('from') else None
+    end = parse_date_param(args['to'], end_of_range=True, tz=tz) if args.get('to') else None
+    if start and end and end <= start:
+        raise ValueError("'to' must be after 'from'")
+    return start, end
+
+def parse_weekdays(args):
+    """
+    The routine activeDay values a request asks for, or None for every day.
+
+    ?day=monday,tuesday picks days by name, ?from= / ?to= (YYYY-MM-DD) pick
+    the weekdays that range of dates covers. Both together keep the days in
+    both. Raises ValueError for bad values.
+    """
+    days = None
+    if args.get('day'):
+        days = {day.strip().lower() for day in args['day'].split(',') if day.strip()}
+        unknown = days - set(WEEKDAYS)
+        if unknown:
+            raise ValueError(f"unknown day '{sorted(unknown)[0]}'")
+
+    if args.get('from') and args.get('to'):
+        first = datetime.strptime(args['from'], '%Y-%m-%d').date()
+        last = datetime.strptime(args['to'], '%Y-%m-%d').date()
+        if last < first:
+            raise ValueError("'to' must be after 'from'")
+        span = min((last - first).days + 1, 7)
+        covered = {WEEKDAYS[(first + timedelta(days=offset)).weekday()] for offset in range(span)}
+        days = covered if days is None else days & covered
+
+    return days
+
+def range_filter(start, end):
+    """mongo range predicate for a (start, end) pair, or None when both are open"""
+    predicate = {}
+    if start:
+        predicate['$gte'] = start
+    if end:
+        predicate['$lt'] = end
+    return predicate or None
@@ -0,0 +1,93 @@
+# ETag / If-None-Match support for polled read endpoints :)
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, make_response, request
+from compression import negotiated_encoding
+import repository
+
+def make_etag(firebase_uid, scope, version, extra=None):
+    """
+    A strong ETag for one user's view of a scope at a data version.
+
+    Hashes the version and the request's path and query string (different
+    filters or pages are different representations), never the body.
+    """
+    key = f"{firebase_uid}|{scope}|{version}|{request.path}|{request.query_string.decode('latin-1')}|{extra}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def current_version(scope):
+    """
+    (version, bumped_at) of scope for the request's user, read once per request.
+
+    @conditional and @cached_response on the same view share the read. Kept
+    on the request rather than g, batch sub-requests share one app context.
+    """
+    versions = request.__dict__.setdefault('data_versions', {})
+    if scope not in versions:
+        versions[scope] = repository.data_versions.get_version(request.firebase_uid, scope)
+    return versions[scope]
+
+def settling(bumped_at):
+    """True for ETAG_SETTLE_SECONDS after a write, while reads may still come from a lagging secondary"""
+    settle = timedelta(seconds=current_app.config.get('ETAG_SETTLE_SECONDS', 5))
+    return bool(bumped_at) and datetime.utcnow() - bumped_at < settle
+
+def matching_etag(etag):
+    """
+    The If-None-Match tag naming this representation, or None.
+
+    A compressed 200 carried "<etag>-<encoding>" (compression._encoded_etag),
+    so that matches too as long as this request negotiates the same encoding.
+    The 304 has to repeat the exact tag the client holds.
+    """
+    if request.if_none_match.star_tag:
+        return etag
+    encoding = negotiated_encoding()
+    for tag in request.if_none_match:
+        if tag == etag or (encoding and tag == f"{etag}-{encoding}"):
+            return tag
+    return None
+
+def conditional(scope, extra=None):
+    """
+    Answer If-None-Match with 304 before the view runs. Goes under @require_auth.
+
+    The ETag comes from the user's data_versions counter for scope, which
+    every write to that scope bumps, so an unchanged read costs one point
+    read by _id instead of the main query and serialization. extra is an
+    optional callable whose value is mixed in (e.g. a cached document's
+    updated_at when the data comes from a per-process cache).
+
+    For ETAG_SETTLE_SECONDS after a write responses go out without an ETag:
+    the data may come from a secondary that hasn't seen the write yet, and
+    tagging that with the new version would 304 every later poll onto it.
+
+    Usage:
+        @meal_bp.route('/', methods=['GET'])
+        @require_auth
+        @conditional('meals')
+        def get_meals(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            version, bumped_at = current_version(scope)
+            if settling(bumped_at):
+                return f(*args, **kwargs)
+
+            etag = make_etag(request.firebase_uid, scope, version, extra() if extra else None)
+            matched = matching_etag(etag)
+            if matched:
+                response = make_response('', 304)
+                response.set_etag(matched)
+                response.vary.add('Accept-Encoding')
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+
+        return decorated
+    return decorator
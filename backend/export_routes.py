@@ -0,0 +1,60 @@
+# streaming export of a user's whole history :)
+import json
+from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from auth_middleware import require_auth
+from json_provider import bson_default
+import repository
+
+export_bp = Blueprint('export', __name__, url_prefix='/api/v1/export')
+
+def ndjson_line(record_type, document):
+    """one export record as a line of json, with _id renamed to id like the api does"""
+    record = {'type': record_type}
+    for key, value in document.items():
+        record['id' if key == '_id' else key] = value
+    return json.dumps(record, default=bson_default, separators=(',', ':')) + '\n'
+
+def stream_cursor(record_type, cursor):
+    """yield a cursor's documents as ndjson, closing it even if the client goes away"""
+    try:
+        for document in cursor:
+            yield ndjson_line(record_type, document)
+    finally:
+        cursor.close()
+
+@export_bp.route('/', methods=['GET'])
+@require_auth
+def export_history():
+    """
+    Stream the user's profile, calculator data, meals and routines as NDJSON.
+
+    Documents go straight from the mongo cursors (EXPORT_BATCH_SIZE at a time)
+    to the response, so memory stays flat however long the history is.
+    """
+    try:
+        firebase_uid = request.firebase_uid
+        user = request.current_user
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 500)
+        meals = repository.meal_repository()
+
+        def generate():
+            yield ndjson_line('profile', user)
+
+            calculator_data = repository.calculator_data.find_data(firebase_uid)
+            if calculator_data is not None:
+                yield ndjson_line('calculator_data', {'data': calculator_data})
+
+            yield from stream_cursor('meal', meals.iter_all(firebase_uid, batch_size))
+            yield from stream_cursor('routine', repository.routines.iter_all(firebase_uid, batch_size))
+
+        filename = f"macromatch-export-{datetime.utcnow().strftime('%Y%m%d')}.ndjson"
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+    except Exception as e:
+        print(f"export error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
@@ -0,0 +1,22 @@
+# ?fields= sparse fieldset parsing :)
+
+def parse_fields(args, allowed):
+    """
+    The fields a request asks for with ?fields=name,calories, or None for all.
+
+    Every name has to be in allowed (the resource's allow-list), so a client
+    can't project fields the api doesn't expose. Raises ValueError otherwise.
+    """
+    if not args.get('fields'):
+        return None
+
+    fields = []
+    for field in args['fields'].split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in allowed:
+            raise ValueError(f"unknown field '{field}', pick from {', '.join(allowed)}")
+        if field not in fields:
+            fields.append(field)
+    return fields or None
@@ -1,7 +1,14 @@
 # firebase admin sdk setup for authentication
+import hashlib
+import os
+import re
+import threading
+import time
 import firebase_admin
 from firebase_admin import credentials, auth
 from flask import current_app
+from cache_utils import LRUCache
+from token_verifiers import get_token_verifier
 
 class FirebaseService:
     """
@@ -38,7 +45,7 @@ class FirebaseService:
     def verify_token(self, id_token):
         """verify firebase id token and return decoded token"""
         try:
-            decoded_token = auth.verify_id_token(id_token)
+            decoded_token = verify_id_token(id_token)
             return decoded_token
         except Exception as e:
             print(f"token verification failed: {str(e)}")
@@ -53,3 +60,135 @@ def get_firebase_service():
     if firebase_service is None:
         firebase_service = FirebaseService()
     return firebase_service
+
+# verified token cache (token hash -> decoded claims)
+token_cache = None
+
+def get_token_cache():
+    """get or create the verified token cache singleton"""
+    global token_cache
+    if token_cache is None:
+        token_cache = LRUCache(max_size=current_app.config.get('TOKEN_CACHE_SIZE', 4096))
+    return token_cache
+
+def _token_cache_key(id_token):
+    return hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+
+def lookup_cached_token(id_token):
+    """return cached claims for a token that was already verified, else None"""
+    decoded_token = get_token_cache().get(_token_cache_key(id_token))
+    return dict(decoded_token) if decoded_token is not None else None
+
+def verify_id_token(id_token):
+    """
+    Verify a firebase id token, reusing the decoded claims for repeat tokens.
+
+    Claims are cached under a hash of the token until the token's own `exp`,
+    so a client reusing its token for an hour only pays for verification once.
+    Verification itself goes to the backend picked by TOKEN_VERIFIER. Failures
+    are never cached and raise the same errors as auth.verify_id_token.
+    """
+    decoded_token = lookup_cached_token(id_token)
+    if decoded_token is not None:
+        return decoded_token
+
+    decoded_token = get_token_verifier().verify(id_token)
+    if decoded_token.get('exp'):
+        get_token_cache().set(_token_cache_key(id_token), dict(decoded_token), expires_at=decoded_token['exp'])
+    return decoded_token
+
+# google's public id token signing certs, the ones auth.verify_id_token checks against
+ID_TOKEN_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+# renew this long before google's max-age runs out, but never more often than CERT_MIN_REFRESH_DELAY
+CERT_REFRESH_MARGIN = 300
+CERT_MIN_REFRESH_DELAY = 60
+
+# when the certs were last fetched (time.monotonic()) and the max-age google sent with them
+certs_fetched_at = None
+certs_max_age = None
+
+def _cert_request():
+    """
+    The transport to fetch the certs with.
+
+    That is the sdk's own cached transport when this firebase_admin version
+    (pinned in requirements.txt) keeps it where we expect, so the fetch
+    warms the cache verify_id_token reads. Otherwise a plain google-auth
+    transport, which still learns the max-age but warms nothing.
+    """
+    from google.auth.transport import Request
+    from google.auth.transport.requests import Request as RequestsRequest
+
+    get_client = getattr(auth, '_get_client', None)
+    if get_client is not None:
+        verifier = getattr(get_client(firebase_admin.get_app()), '_token_verifier', None)
+        request = getattr(verifier, 'request', None)
+        if isinstance(request, Request):
+            return request
+    return RequestsRequest()
+
+def _max_age(cache_control):
+    # max-age from a Cache-Control header, None without one
+    match = re.search(r'max-age=(\d+)', cache_control or '')
+    return int(match.group(1)) if match else None
+
+def prefetch_signing_certs(force=False):
+    """
+    Fetch google's id token signing certs into the sdk's http cache.
+
+    verify_id_token otherwise downloads them on first use. force=True skips
+    the cached copy so the refresher can renew it before it expires. Returns
+    the max-age google sent (None without one).
+    """
+    global certs_fetched_at, certs_max_age
+    headers = {'Cache-Control': 'no-cache'} if force else None
+    response = _cert_request()(ID_TOKEN_CERTS_URL, method='GET', headers=headers)
+    if response.status != 200:
+        raise RuntimeError(f"cert fetch returned {response.status}")
+
+    certs_fetched_at = time.monotonic()
+    certs_max_age = _max_age(response.headers.get('Cache-Control'))
+    return certs_max_age
+
+def next_refresh_delay(fallback_interval):
+    """seconds until shortly before the fetched certs go stale, fallback_interval without a max-age"""
+    if certs_max_age is None:
+        return fallback_interval
+    due = certs_fetched_at + certs_max_age - CERT_REFRESH_MARGIN
+    return max(CERT_MIN_REFRESH_DELAY, due - time.monotonic())
+
+# background cert refresher thread
+cert_refresher = None
+_refresher_fork_hook = False
+
+def start_cert_refresher(interval):
+    """
+    Renew the signing certs in a daemon thread just before google's max-age runs out.
+
+    interval is the wait when google sent no max-age (or a fetch failed),
+    0 turns the refresher off.
+    """
+    global cert_refresher, _refresher_fork_hook
+    if interval <= 0:
+        return None
+    if cert_refresher is not None and cert_refresher.is_alive():
+        return cert_refresher
+
+    def refresh_loop():
+        while True:
+            time.sleep(next_refresh_delay(interval))
+            try:
+                prefetch_signing_certs(force=True)
+            except Exception as e:
+                # stale certs come back as CERT_MIN_REFRESH_DELAY, so this retries soon
+                print(f"cert refresh error: {str(e)}")
+
+    cert_refresher = threading.Thread(target=refresh_loop, name='firebase-cert-refresher', daemon=True)
+    cert_refresher.start()
+
+    # threads don't survive a pre-fork server, so restart it in each worker
+    if not _refresher_fork_hook and hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: start_cert_refresher(interval))
+        _refresher_fork_hook = True
+    return cert_refresher
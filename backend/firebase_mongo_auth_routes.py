@@ -1,33 +1,29 @@
 # Firebase + MongoDB authentication routes
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-from mongodb_config import get_users_collection, get_calculator_data_collection
 from firebase_config import get_firebase_service
 from auth_middleware import require_auth, verify_firebase_token
+from user_cache import get_cached_user, invalidate_user
+from etags import conditional
+from fieldsets import parse_fields
+from user_routes import user_profile_response
+from response_cache import cached_response, invalidate_responses
 import firebase_admin
 from firebase_admin import auth as firebase_auth
+import repository
 
 firebase_mongo_auth_bp = Blueprint('firebase_mongo_auth', __name__, url_prefix='/api/auth')
 
 def get_or_create_user(firebase_uid, email, name=None):
-    """Get user from MongoDB or create if doesn't exist"""
-    users_collection = get_users_collection()
-    
-    user = users_collection.find_one({'firebase_uid': firebase_uid})
-    
-    if not user:
-        # Create new user in MongoDB
-        user_data = {
-            'firebase_uid': firebase_uid,
-            'email': email,
-            'name': name or email.split('@')[0],
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
-        }
-        result = users_collection.insert_one(user_data)
-        user_data['_id'] = result.inserted_id
-        return user_data
-    
+    """
+    Get user from MongoDB or create if doesn't exist.
+
+    Runs as a single upsert that returns the final document, so login costs one
+    round trip and concurrent first logins can't create duplicate users (the
+    unique firebase_uid index backs this up).
+    """
+    user = repository.users.get_or_create(firebase_uid, email, name or email.split('@')[0])
+    invalidate_user(firebase_uid)
     return user
 
 @firebase_mongo_auth_bp.route('/register', methods=['POST'])
@@ -159,8 +155,7 @@ def verify_token():
         firebase_uid = decoded_token['uid']
         
         # Get user from MongoDB
-        users_collection = get_users_collection()
-        mongo_user = users_collection.find_one({'firebase_uid': firebase_uid})
+        mongo_user = get_cached_user(firebase_uid)
         
         if not mongo_user:
             return jsonify({'error': 'User not found'}), 404
@@ -183,25 +178,17 @@ def verify_token():
 
 @firebase_mongo_auth_bp.route('/profile', methods=['GET'])
 @require_auth
+@conditional('profile', extra=lambda: request.current_user.get('updated_at'))
 def get_profile():
-    """Get user profile from MongoDB"""
+    """Get user profile from MongoDB (?fields= picks which profile fields come back)"""
     try:
-        user = request.current_user
-
-        user_response = {
-            'id': str(user['_id']),
-            'firebase_uid': request.firebase_uid,
-            'email': user.get('email'),
-            'name': user.get('name'),
-            'age': user.get('age'),
-            'weight': user.get('weight'),
-            'height': user.get('height'),
-            'activity_level': user.get('activity_level'),
-            'dietary_goals': user.get('dietary_goals'),
-            'gender': user.get('gender')
-        }
+        try:
+            fields = parse_fields(request.args, repository.PROFILE_SPARSE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        return jsonify({'user': user_response}), 200
+        # the profile comes from the cached auth lookup, so fields only trims the response
+        return jsonify({'user': user_profile_response(request.current_user, fields)}), 200
 
     except Exception as e:
         print(f"Get profile error: {str(e)}")
@@ -226,18 +213,14 @@ def update_profile():
 
         update_data['updated_at'] = datetime.utcnow()
 
-        # Update in MongoDB
-        users_collection = get_users_collection()
-        result = users_collection.update_one(
-            {'firebase_uid': request.firebase_uid},
-            {'$set': update_data}
-        )
+        # Update in MongoDB and get the updated user back in the same round trip
+        user = repository.users.update_profile(request.firebase_uid, update_data)
 
-        if result.matched_count == 0:
-            return jsonify({'error': 'User not found'}), 404
+        invalidate_user(request.firebase_uid)
+        repository.data_versions.bump(request.firebase_uid, 'profile')
 
-        # Get updated user
-        user = users_collection.find_one({'firebase_uid': request.firebase_uid})
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
 
         user_response = {
             'id': str(user['_id']),
@@ -271,21 +254,10 @@ def save_calculator_data():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        # Save to MongoDB
-        calculator_collection = get_calculator_data_collection()
-        calculator_data = {
-            'firebase_uid': request.firebase_uid,
-            'data': data,
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
-        }
-
         # Update or insert
-        result = calculator_collection.update_one(
-            {'firebase_uid': request.firebase_uid},
-            {'$set': calculator_data},
-            upsert=True
-        )
+        result = repository.calculator_data.save(request.firebase_uid, data)
+        repository.data_versions.bump(request.firebase_uid, 'calculator_data')
+        invalidate_responses(request.firebase_uid, 'calculator_data')
 
         return jsonify({
             'message': 'Calculator data saved successfully',
@@ -298,18 +270,14 @@ def save_calculator_data():
 
 @firebase_mongo_auth_bp.route('/calculator-data', methods=['GET'])
 @require_auth
+@conditional('calculator_data')
+@cached_response('calculator_data')
 def get_calculator_data():
     """Get calculator data from MongoDB"""
     try:
-        # Get from MongoDB
-        calculator_collection = get_calculator_data_collection()
-        calculator_data = calculator_collection.find_one({'firebase_uid': request.firebase_uid})
-
-        if not calculator_data:
-            return jsonify({'data': None}), 200
-
+        # Get from MongoDB (only the saved blob is read)
         return jsonify({
-            'data': calculator_data.get('data')
+            'data': repository.calculator_data.find_data(request.firebase_uid)
         }), 200
 
     except Exception as e:
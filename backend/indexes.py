@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+MongoDB index declarations, bootstrap and verification.
+
+    python indexes.py create   # create every declared index
+    python indexes.py verify   # explain() each route's query shape, exit 1 on COLLSCAN/SORT
+"""
+
+import sys
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from mongodb_config import get_mongodb
+
+# collection name -> indexes every query path relies on
+INDEX_SPECS = {
+    'users': [
+        # one user document per firebase account, lets login upsert atomically
+        IndexModel([('firebase_uid', ASCENDING)], name='firebase_uid_unique', unique=True),
+    ],
+    'meals': [
+        # get_meals: newest first, _id breaks timestamp ties for cursor paging
+        IndexModel([('firebase_uid', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+                   name='firebase_uid_timestamp_id'),
+    ],
+    'meal_buckets': [
+        # MEAL_STORAGE_MODE=bucket: get_meals walks a user's days newest first
+        IndexModel([('firebase_uid', ASCENDING), ('date', DESCENDING)], name='firebase_uid_date'),
+        # delete_meal finds the bucket holding a meal id
+        IndexModel([('firebase_uid', ASCENDING), ('meals._id', ASCENDING)], name='firebase_uid_meal_id'),
+    ],
+    'routine': [
+        # get_routine: a user's routines in _id order (cursor paging)
+        IndexModel([('firebase_uid', ASCENDING), ('_id', ASCENDING)], name='firebase_uid_id'),
+        # get_routine ?day= / ?from=&to=: the picked weekdays, merged back into _id order
+        IndexModel([('firebase_uid', ASCENDING), ('activeDay', ASCENDING), ('_id', ASCENDING)],
+                   name='firebase_uid_activeDay_id'),
+    ],
+    'daily_totals': [
+        # one rollup per user per day, also the $merge key for rebuilds
+        IndexModel([('firebase_uid', ASCENDING), ('date', ASCENDING)], name='firebase_uid_date_unique', unique=True),
+    ],
+    'calculator_data': [
+        # save_calculator_data upserts one document per user
+        IndexModel([('firebase_uid', ASCENDING)], name='firebase_uid_unique', unique=True),
+    ],
+}
+
+# query shapes the routes run: (name, collection, filter, sort)
+QUERY_SHAPES = [
+    ('auth user lookup', 'users', {'firebase_uid': 'explain-uid'}, None),
+    ('get_meals', 'meals', {'firebase_uid': 'explain-uid'}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('get_meals next page', 'meals', {'firebase_uid': 'explain-uid', '$or': [
+        {'timestamp': {'$lt': datetime(2024, 1, 1)}},
+        {'timestamp': datetime(2024, 1, 1), '_id': {'$lt': ObjectId('0' * 24)}},
+        {'timestamp': None}
+    ]}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('get_meals date range', 'meals', {'firebase_uid': 'explain-uid', 'timestamp': {
+        '$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 1, 8)
+    }}, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('get_meals (buckets)', 'meal_buckets', {'firebase_uid': 'explain-uid', 'date': {'$lte': '2024-01-01'}},
+     [('date', DESCENDING)]),
+    ('delete_meal (buckets)', 'meal_buckets', {'firebase_uid': 'explain-uid', 'meals._id': ObjectId('0' * 24)}, None),
+    ('get_routine', 'routine', {'firebase_uid': 'explain-uid'}, [('_id', ASCENDING)]),
+    ('get_routine next page', 'routine', {'firebase_uid': 'explain-uid', '_id': {'$gt': ObjectId('0' * 24)}},
+     [('_id', ASCENDING)]),
+    ('get_routine by day', 'routine', {'firebase_uid': 'explain-uid', 'activeDay': {'$in': ['monday', 'tuesday']}},
+     [('_id', ASCENDING)]),
+    ('daily totals range', 'daily_totals', {'firebase_uid': 'explain-uid', 'date': {'$gte': '2024-01-01', '$lt': '2024-02-01'}},
+     [('date', ASCENDING)]),
+    ('get_calculator_data', 'calculator_data', {'firebase_uid': 'explain-uid'}, None),
+]
+
+# plan stages that mean a query isn't served by an index
+BAD_STAGES = ('COLLSCAN', 'SORT')
+
+def ensure_indexes():
+    """create any declared index that doesn't exist yet (no-op when they do)"""
+    db = get_mongodb().get_db()
+    for collection_name, indexes in INDEX_SPECS.items():
+        created = db[collection_name].create_indexes(indexes)
+        print(f"indexes ready on {collection_name}: {', '.join(created)}")
+
+def _plan_stages(plan):
+    """yield every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return
+    # slot based engine nests the classic plan under queryPlan
+    if 'queryPlan' in plan:
+        plan = plan['queryPlan']
+    if 'stage' in plan:
+        yield plan['stage']
+    if 'inputStage' in plan:
+        yield from _plan_stages(plan['inputStage'])
+    for stage in plan.get('inputStages', []):
+        yield from _plan_stages(stage)
+
+def verify_query_plans():
+    """
+    Explain every route query shape and fail loudly if one isn't index-backed.
+
+    Returns a dict of shape name -> winning plan stages, raises RuntimeError
+    listing each shape that still does a COLLSCAN or an in-memory SORT.
+    """
+    db = get_mongodb().get_db()
+    plans = {}
+    failures = []
+
+    for name, collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+
+        stages = list(_plan_stages(explain['queryPlanner']['winningPlan']))
+        plans[name] = stages
+        bad = [stage for stage in stages if stage in BAD_STAGES]
+        if bad:
+            failures.append(f"{name} on {collection_name} uses {', '.join(bad)} ({' <- '.join(stages)})")
+
+    if failures:
+        raise RuntimeError("unindexed query shapes:\n  " + "\n  ".join(failures))
+    return plans
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    if command not in ('create', 'verify'):
+        print(f"usage: python {sys.argv[0]} [create|verify]")
+        sys.exit(2)
+
+    if command == 'create':
+        ensure_indexes()
+        return
+
+    try:
+        plans = verify_query_plans()
+    except RuntimeError as e:
+        print(f"index verification failed! {str(e)}")
+        sys.exit(1)
+
+    for name, stages in plans.items():
+        print(f"{name}: {' <- '.join(stages)}")
+    print("all query shapes use indexes! :)")
+
+if __name__ == '__main__':
+    main()
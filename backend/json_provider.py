@@ -0,0 +1,67 @@
+# flask json provider that speaks mongodb types :)
+import json
+from datetime import date, datetime
+from bson import Decimal128, ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # the stdlib path below still handles every bson type
+    orjson = None
+
+def bson_default(value):
+    """
+    Encode the bson values our documents hold.
+
+    ObjectId becomes its hex string, datetimes ISO 8601 (like the api always
+    returned them), Decimal128 a decimal string so no precision is lost.
+    Anything else gets Flask's default handling.
+    """
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    return DefaultJSONProvider.default(value)
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """
+    jsonify/app.json on orjson, encoding ObjectId, datetime and Decimal128
+    directly so routes can return mongo documents as they come back.
+
+    Falls back to the stdlib encoder (with the same bson handling) when
+    orjson isn't installed or a call passes json.dumps keyword arguments.
+    """
+    default = staticmethod(bson_default)
+
+    def _orjson_option(self, pretty):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault('default', self.default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option(False)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        # orjson already gives bytes, hand them to the response without a str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_option(pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
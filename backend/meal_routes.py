@@ -1,10 +1,13 @@
 # meal routes for our app :)
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
-from bson import ObjectId
 from models import Meal
-from mongodb_config import get_meals_collection
 from auth_middleware import require_auth
+from date_ranges import parse_range, range_filter
+from fieldsets import parse_fields
+from etags import conditional
+from response_cache import MEAL_ROUTES, cached_response, invalidate_responses
+import repository
 
 meal_bp = Blueprint('meals', __name__, url_prefix='/api/v1/meals')
 
@@ -36,17 +39,19 @@ def create_meal():
             return jsonify({'error': 'validation failed', 'details': validation_errors}), 400
 
         # save to mongodb
-        meals_collection = get_meals_collection()
         meal_data = meal.to_dict()
         meal_data['firebase_uid'] = request.firebase_uid
         meal_data['user_id'] = str(request.current_user['_id'])
 
-        result = meals_collection.insert_one(meal_data)
+        meal_id = repository.meal_repository().insert(meal_data)
+        repository.daily_totals.add_meals(request.firebase_uid, [meal_data])
+        repository.data_versions.bump(request.firebase_uid, 'meals')
+        invalidate_responses(request.firebase_uid, *MEAL_ROUTES)
 
         return jsonify({
             'message': 'meal created! :)',
             'meal': {
-                'id': str(result.inserted_id),
+                'id': str(meal_id),
                 'name': meal.name,
                 'meal_type': meal.meal_type,
                 'calories': meal.calories,
@@ -59,31 +64,131 @@ def create_meal():
         print(f"create meal error: {str(e)}")
         return jsonify({'error': 'server error'}), 500
 
-@meal_bp.route('/', methods=['GET'])
+@meal_bp.route('/batch', methods=['POST'])
 @require_auth
-def get_meals():
-    # get user's meals
+def create_meals_batch():
+    # create many meals in one request (a day's log or an offline sync)
     try:
-        limit = request.args.get('limit', 50, type=int)
-        if limit > 100:
-            limit = 100
+        data = request.get_json()
+        items = data.get('meals') if isinstance(data, dict) else data
 
-        meals_collection = get_meals_collection()
-        meals_cursor = meals_collection.find(
-            {'firebase_uid': request.firebase_uid}
-        ).sort('timestamp', -1).limit(limit)
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'need a non-empty list of meals'}), 400
 
+        max_size = current_app.config.get('MEAL_BATCH_MAX_SIZE', 100)
+        if len(items) > max_size:
+            return jsonify({'error': f'batch too large, max {max_size} meals'}), 400
+
+        # validate every item, only the valid ones get written
+        results = [None] * len(items)
         meals = []
-        for meal in meals_cursor:
-            meal['id'] = str(meal['_id'])
-            del meal['_id']
-            if 'timestamp' in meal and hasattr(meal['timestamp'], 'isoformat'):
-                meal['timestamp'] = meal['timestamp'].isoformat()
+        meal_docs = []
+        positions = []
+        user_id = str(request.current_user['_id'])
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('name') or not item.get('meal_type'):
+                results[index] = {'index': index, 'status': 'invalid', 'details': ['need name and meal_type']}
+                continue
+            # one bad item is that item's problem, not a 500 for the whole batch
+            if not isinstance(item['name'], str) or not isinstance(item['meal_type'], str):
+                results[index] = {'index': index, 'status': 'invalid', 'details': ['name and meal_type should be strings']}
+                continue
+
+            meal = Meal(
+                name=item['name'].strip(),
+                meal_type=item['meal_type'].strip(),
+                calories=item.get('calories', 0),
+                notes=item.get('notes', '')
+            )
+            validation_errors = meal.validate()
+            if validation_errors:
+                results[index] = {'index': index, 'status': 'invalid', 'details': validation_errors}
+                continue
+
+            meal_data = meal.to_dict()
+            meal_data['firebase_uid'] = request.firebase_uid
+            meal_data['user_id'] = user_id
             meals.append(meal)
+            meal_docs.append(meal_data)
+            positions.append(index)
+
+        # one unordered insert_many for everything that validated
+        if meal_docs:
+            ids, write_errors = repository.meal_repository().insert_many(meal_docs)
+            for doc_index, index in enumerate(positions):
+                if doc_index in write_errors:
+                    results[index] = {'index': index, 'status': 'failed', 'details': [write_errors[doc_index]]}
+                    continue
+                meal = meals[doc_index]
+                results[index] = {
+                    'index': index,
+                    'status': 'created',
+                    'meal': {
+                        'id': str(ids[doc_index]),
+                        'name': meal.name,
+                        'meal_type': meal.meal_type,
+                        'calories': meal.calories,
+                        'notes': meal.notes,
+                        'timestamp': meal.timestamp.isoformat()
+                    }
+                }
+
+            # roll up only what actually got written
+            repository.daily_totals.add_meals(request.firebase_uid, [
+                meal_doc for doc_index, meal_doc in enumerate(meal_docs) if doc_index not in write_errors
+            ])
+            repository.data_versions.bump(request.firebase_uid, 'meals')
+            invalidate_responses(request.firebase_uid, *MEAL_ROUTES)
+
+        created = sum(1 for result in results if result['status'] == 'created')
+        return jsonify({
+            'message': f'{created} of {len(items)} meals created! :)',
+            'created': created,
+            'failed': len(items) - created,
+            'results': results
+        }), 201 if created else 400
+
+    except Exception as e:
+        print(f"create meals batch error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
 
+@meal_bp.route('/', methods=['GET'])
+@require_auth
+@conditional('meals')
+@cached_response('meals')
+def get_meals():
+    # get user's meals, a page at a time (pass next_cursor back as ?cursor=)
+    # ?from=YYYY-MM-DD&to=YYYY-MM-DD (&tz=America/Chicago) limits it to those days
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        if limit > 100:
+            limit = 100
+        if limit < 1:
+            limit = 1
+
+        try:
+            start, end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'invalid date range: {str(e)}'}), 400
+
+        # ?fields=name,meal_type,calories,timestamp reads only those (id always comes back)
+        try:
+            fields = parse_fields(request.args, repository.MEAL_SPARSE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            page, next_cursor = repository.meal_repository().find_page(
+                request.firebase_uid, limit, request.args.get('cursor'), range_filter(start, end), fields
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # ids and timestamps are encoded by the app's json provider
         return jsonify({
-            'meals': meals,
-            'count': len(meals)
+            'meals': page,
+            'count': len(page),
+            'next_cursor': next_cursor
         }), 200
 
     except Exception as e:
@@ -95,17 +200,15 @@ def get_meals():
 def delete_meal(meal_id):
     # delete a meal
     try:
-        meals_collection = get_meals_collection()
-
         # verify meal exists and belongs to user
-        result = meals_collection.delete_one({
-            '_id': ObjectId(meal_id),
-            'firebase_uid': request.firebase_uid
-        })
-
-        if result.deleted_count == 0:
+        deleted_meal = repository.meal_repository().delete(request.firebase_uid, meal_id)
+        if not deleted_meal:
             return jsonify({'error': 'meal not found'}), 404
 
+        repository.daily_totals.remove_meals(request.firebase_uid, [deleted_meal])
+        repository.data_versions.bump(request.firebase_uid, 'meals')
+        invalidate_responses(request.firebase_uid, *MEAL_ROUTES)
+
         return jsonify({'message': 'meal deleted! :)'}), 200
 
     except Exception as e:
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Meal storage layout tools (MEAL_STORAGE_MODE).
+
+Copies meals between the one-document-per-meal layout (meals) and the
+per-user per-day bucket layout (meal_buckets), keeping every meal's _id, and
+benchmarks the two layouts against each other on synthetic data.
+
+    python meal_storage.py migrate --to bucket               # meals -> meal_buckets
+    python meal_storage.py migrate --to document --uid <uid> # meal_buckets -> meals, one user
+    python meal_storage.py bench --users 50 --days 365 --meals-per-day 4
+
+Migrate with meal writes stopped, then flip MEAL_STORAGE_MODE. The source
+collection is left as it was; re-running replaces each migrated user's copy
+in the target. The benchmark runs in its own database (--db) and drops it
+afterwards unless --keep is given.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from bson import ObjectId
+
+from config import Config
+from indexes import ensure_indexes
+from mongodb_config import get_mongodb, get_meals_collection, get_meal_buckets_collection
+from pagination import encode_cursor
+from repository import BUCKET_FIELDS, get_meal_repository, rollup_date
+
+def _flush(collection, documents):
+    if documents:
+        collection.insert_many(documents, ordered=False)
+        documents.clear()
+
+def migrate_to_buckets(query, batch_size, bucket_size):
+    """stream meals in (firebase_uid, timestamp) index order and write full buckets (every field comes along)"""
+    buckets_collection = get_meal_buckets_collection()
+    meals_collection = get_meals_collection()
+    # buckets are per day, a meal without a timestamp has no day to go in and
+    # would vanish from every read once MEAL_STORAGE_MODE=bucket, so stop before writing anything
+    undated = meals_collection.count_documents(dict(query, timestamp={'$not': {'$type': 'date'}}))
+    if undated:
+        raise SystemExit(f"{undated} meals have no timestamp, give them one (or delete them) before migrating to buckets")
+
+    cursor = meals_collection.find(query, batch_size=batch_size).sort(
+        [('firebase_uid', 1), ('timestamp', -1), ('_id', -1)]
+    )
+
+    pending = []
+    users = meal_count = bucket_count = 0
+    try:
+        for firebase_uid, user_meals in groupby(cursor, key=itemgetter('firebase_uid')):
+            users += 1
+            buckets_collection.delete_many({'firebase_uid': firebase_uid})
+            for date, day_meals in groupby(user_meals, key=lambda meal: rollup_date(meal['timestamp'])):
+                day_meals = list(day_meals)
+                for start in range(0, len(day_meals), bucket_size):
+                    chunk = day_meals[start:start + bucket_size]
+                    pending.append({
+                        'firebase_uid': firebase_uid,
+                        'user_id': chunk[0].get('user_id'),
+                        'date': date,
+                        'count': len(chunk),
+                        'meals': [{key: value for key, value in meal.items() if key not in BUCKET_FIELDS}
+                                  for meal in chunk]
+                    })
+                    meal_count += len(chunk)
+                    bucket_count += 1
+                if len(pending) >= batch_size:
+                    _flush(buckets_collection, pending)
+        _flush(buckets_collection, pending)
+    finally:
+        cursor.close()
+
+    print(f"migrated {meal_count} meals of {users} users into {bucket_count} buckets :)")
+
+def migrate_to_documents(query, batch_size):
+    """stream buckets user by user and write one meal document per meal"""
+    meals_collection = get_meals_collection()
+    cursor = get_meal_buckets_collection().find(query, batch_size=batch_size).sort(
+        [('firebase_uid', 1), ('date', -1)]
+    )
+
+    pending = []
+    users = meal_count = 0
+    try:
+        for firebase_uid, buckets in groupby(cursor, key=itemgetter('firebase_uid')):
+            users += 1
+            meals_collection.delete_many({'firebase_uid': firebase_uid})
+            for bucket in buckets:
+                for meal in bucket['meals']:
+                    meal['firebase_uid'] = firebase_uid
+                    meal['user_id'] = bucket.get('user_id')
+                    pending.append(meal)
+                    meal_count += 1
+                if len(pending) >= batch_size:
+                    _flush(meals_collection, pending)
+        _flush(meals_collection, pending)
+    finally:
+        cursor.close()
+
+    print(f"migrated {meal_count} meals of {users} users back to one document per meal :)")
+
+def migrate(args):
+    query = {'firebase_uid': args.uid} if args.uid else {}
+    if args.to == 'bucket':
+        migrate_to_buckets(query, args.batch_size, args.bucket_size)
+    else:
+        migrate_to_documents(query, args.batch_size)
+
+def synthetic_meals(users, days, meals_per_day):
+    """a meal history per synthetic user, meals spread over each day"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    meal_types = ['breakfast', 'lunch', 'dinner', 'snack']
+    for user in range(users):
+        firebase_uid = f'bench-user-{user:05d}'
+        user_id = str(ObjectId())
+        meals = []
+        for day in range(days):
+            for meal in range(meals_per_day):
+                meals.append({
+                    'name': f'meal {meal}',
+                    'meal_type': meal_types[meal % len(meal_types)],
+                    'calories': random.randint(100, 900),
+                    'notes': '',
+                    'timestamp': today - timedelta(days=day) + timedelta(hours=7 + meal * 16 / meals_per_day,
+                                                                         seconds=random.randint(0, 3000)),
+                    'firebase_uid': firebase_uid,
+                    'user_id': user_id
+                })
+        yield firebase_uid, meals
+
+def _timed(samples, func):
+    """p50/p95 in ms of func() over samples calls"""
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+def bench(args):
+    """load the same synthetic history into both layouts and compare size and read latency"""
+    if args.db == Config.MONGODB_DB_NAME:
+        raise SystemExit(f"refusing to benchmark in {args.db}, it gets dropped afterwards")
+
+    # point the shared connection at the scratch database before anything connects
+    Config.MONGODB_DB_NAME = args.db
+    db = get_mongodb().get_db()
+    db.meals.drop()
+    db.meal_buckets.drop()
+    ensure_indexes()
+
+    layouts = {'document': get_meal_repository('document'), 'bucket': get_meal_repository('bucket', args.bucket_size)}
+    collections = {'document': 'meals', 'bucket': 'meal_buckets'}
+    write_seconds = {mode: 0.0 for mode in layouts}
+    uids = []
+    try:
+        for firebase_uid, meals in synthetic_meals(args.users, args.days, args.meals_per_day):
+            uids.append(firebase_uid)
+            for mode, repo in layouts.items():
+                batch = [dict(meal) for meal in meals]
+                started = time.perf_counter()
+                for start in range(0, len(batch), 1000):
+                    repo.insert_many(batch[start:start + 1000])
+                write_seconds[mode] += time.perf_counter() - started
+        print(f"loaded {args.users} users x {args.days} days x {args.meals_per_day} meals into both layouts\n")
+
+        newest = datetime.utcnow()
+        middle_cursor = encode_cursor(newest - timedelta(days=args.days // 2), ObjectId('f' * 24))
+        month = {'$gte': newest - timedelta(days=30), '$lt': newest + timedelta(days=1)}
+        reads = {
+            'first page (50)': lambda repo: repo.find_page(random.choice(uids), 50),
+            'mid-history page (50)': lambda repo: repo.find_page(random.choice(uids), 50, middle_cursor),
+            'stats, last 30 days': lambda repo: repo.stats_by_type(random.choice(uids), month),
+        }
+
+        print(f"{'':28}{'document':>16}{'bucket':>16}")
+        sizes = {mode: db.command('collStats', collections[mode]) for mode in layouts}
+        for label, key in (('documents', 'count'), ('data size (KB)', 'size'), ('index size (KB)', 'totalIndexSize')):
+            values = [sizes[mode][key] if key == 'count' else sizes[mode][key] // 1024 for mode in layouts]
+            print(f"{label:28}{values[0]:>16}{values[1]:>16}")
+        print(f"{'load time (s)':28}{write_seconds['document']:>16.2f}{write_seconds['bucket']:>16.2f}")
+
+        for label, read in reads.items():
+            results = [_timed(args.samples, lambda: read(repo)) for repo in layouts.values()]
+            cells = [f"{p50:.2f} / {p95:.2f}" for p50, p95 in results]
+            print(f"{label + ' p50/p95 ms':28}{cells[0]:>16}{cells[1]:>16}")
+    finally:
+        if not args.keep:
+            db.client.drop_database(args.db)
+
+def main():
+    parser = argparse.ArgumentParser(description='meal storage layout tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subparsers.add_parser('migrate', help='copy meals into the other storage layout')
+    migrate_parser.add_argument('--to', choices=['bucket', 'document'], required=True)
+    migrate_parser.add_argument('--uid', help='only migrate this firebase uid')
+    migrate_parser.add_argument('--batch-size', type=int, default=500)
+    migrate_parser.add_argument('--bucket-size', type=int, default=Config.MEAL_BUCKET_MAX_SIZE)
+    migrate_parser.set_defaults(func=migrate)
+
+    bench_parser = subparsers.add_parser('bench', help='compare both layouts on synthetic data')
+    bench_parser.add_argument('--db', default='macromatch_bench', help='scratch database (dropped afterwards)')
+    bench_parser.add_argument('--users', type=int, default=50)
+    bench_parser.add_argument('--days', type=int, default=365)
+    bench_parser.add_argument('--meals-per-day', type=int, default=4)
+    bench_parser.add_argument('--samples', type=int, default=200)
+    bench_parser.add_argument('--bucket-size', type=int, default=Config.MEAL_BUCKET_MAX_SIZE)
+    bench_parser.add_argument('--keep', action='store_true', help="don't drop the scratch database")
+    bench_parser.set_defaults(func=bench)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
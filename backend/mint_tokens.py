@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline token helper for load tests.
+
+Generates the local keypair used by TOKEN_VERIFIER=offline and mints id
+tokens for thousands of synthetic users, optionally creating their MongoDB
+user documents so require_auth finds them right away.
+
+    python mint_tokens.py keygen --out-dir keys
+    python mint_tokens.py mint --count 5000 --out tokens.jsonl --seed-users
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from flask import Flask
+from pymongo import UpdateOne
+
+from config import config
+from token_verifiers import OfflineTokenVerifier, generate_keypair, mint_synthetic_tokens
+
+def keygen(args):
+    """write a fresh keypair and print the env vars that point at it"""
+    os.makedirs(args.out_dir, exist_ok=True)
+    private_pem, public_pem = generate_keypair()
+
+    private_path = os.path.join(args.out_dir, 'offline_token_private.pem')
+    public_path = os.path.join(args.out_dir, 'offline_token_public.pem')
+    with open(private_path, 'w') as f:
+        f.write(private_pem)
+    with open(public_path, 'w') as f:
+        f.write(public_pem)
+
+    print("keypair written, add these to your .env:")
+    print("TOKEN_VERIFIER=offline")
+    print(f"OFFLINE_TOKEN_PUBLIC_KEY_FILE={os.path.abspath(public_path)}")
+    print(f"OFFLINE_TOKEN_PRIVATE_KEY_FILE={os.path.abspath(private_path)}")
+
+def seed_users(users):
+    """upsert a user document per synthetic user in one bulk write"""
+    from mongodb_config import get_users_collection
+
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {'firebase_uid': uid},
+            {'$setOnInsert': {
+                'firebase_uid': uid,
+                'email': email,
+                'name': uid,
+                'created_at': now,
+                'updated_at': now
+            }},
+            upsert=True
+        )
+        for uid, email in users
+    ]
+    if operations:
+        result = get_users_collection().bulk_write(operations, ordered=False)
+        print(f"seeded {result.upserted_count} new users")
+
+def mint(args):
+    """mint tokens as json lines of {uid, email, token}"""
+    app = Flask(__name__)
+    app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+    verifier = OfflineTokenVerifier.from_config(app.config)
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    users = []
+    try:
+        for uid, email, token in mint_synthetic_tokens(verifier, args.count, args.prefix, args.lifetime):
+            out.write(json.dumps({'uid': uid, 'email': email, 'token': token}) + '\n')
+            users.append((uid, email))
+    finally:
+        if args.out:
+            out.close()
+
+    print(f"minted {len(users)} tokens", file=sys.stderr)
+    if args.seed_users:
+        seed_users(users)
+
+def main():
+    parser = argparse.ArgumentParser(description='offline token helper for load tests')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    keygen_parser = subparsers.add_parser('keygen', help='generate the offline keypair')
+    keygen_parser.add_argument('--out-dir', default='keys')
+    keygen_parser.set_defaults(func=keygen)
+
+    mint_parser = subparsers.add_parser('mint', help='mint tokens for synthetic users')
+    mint_parser.add_argument('--count', type=int, default=1000)
+    mint_parser.add_argument('--prefix', default='loadtest')
+    mint_parser.add_argument('--lifetime', type=int, default=3600, help='token lifetime in seconds')
+    mint_parser.add_argument('--out', help='output file (defaults to stdout)')
+    mint_parser.add_argument('--seed-users', action='store_true', help='create the users in mongodb')
+    mint_parser.set_defaults(func=mint)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -131,6 +131,24 @@ class Routine:
         #see if can add sets and reps can't be 0
         return errors
     """
+    @classmethod
+    def from_dict(cls, data):
+        # create routine from request/mongodb data
+        return cls(
+            activeDay=data.get('activeDay'),
+            selected=data.get('selected'),
+            showPopup=data.get('showPopup', False),
+            duration=data.get('duration', ''),
+            speed=data.get('speed', ''),
+            distance=data.get('distance', ''),
+            highIntensity=data.get('highIntensity', ''),
+            lowIntensity=data.get('lowIntensity', ''),
+            restTime=data.get('restTime', ''),
+            exercise=data.get('exercise', []),
+            notes=data.get('notes', ''),
+            exercisePerRound=data.get('exercisePerRound', '')
+        )
+
     def to_dict(self):
         routine_dict = {
             'activeDay': self.activeDay,
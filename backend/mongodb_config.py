@@ -1,15 +1,184 @@
 # MongoDB configuration and connection
 import os
-from pymongo import MongoClient
+import threading
+import time
+from pymongo import MongoClient, monitoring, ReadPreference, WriteConcern
 from pymongo.errors import ConnectionFailure
-from dotenv import load_dotenv
+from pymongo.read_concern import ReadConcern
+from config import Config
 
-load_dotenv()
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener that tracks pool size and checkout waits.
+
+    Checkouts happen on the requesting thread, so the wait is measured from
+    the thread's checkout-started event to its checked-out/failed event.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connections_open = 0
+            self.connections_in_use = 0
+            self.waiting = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.pool_clears = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def _finish_wait(self):
+        started = getattr(self._local, 'checkout_started', None)
+        self._local.checkout_started = None
+        if started is None:
+            return 0.0
+        return (time.monotonic() - started) * 1000
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = self._finish_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.connections_in_use += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._finish_wait()
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.connections_in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self):
+        """pool counters for the metrics endpoint"""
+        with self._lock:
+            attempts = self.checkouts + self.checkout_failures
+            return {
+                'connections_open': self.connections_open,
+                'connections_in_use': self.connections_in_use,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+                'avg_wait_ms': round(self.total_wait_ms / attempts, 3) if attempts else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3)
+            }
+
+# global pool metrics (shared by every client this process creates)
+pool_metrics = PoolMetrics()
+
+def get_pool_options():
+    """MongoClient pool settings from config (unset values keep pymongo defaults)"""
+    options = {
+        'maxPoolSize': Config.MONGODB_MAX_POOL_SIZE,
+        'minPoolSize': Config.MONGODB_MIN_POOL_SIZE,
+        'waitQueueTimeoutMS': Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        'maxIdleTimeMS': Config.MONGODB_MAX_IDLE_TIME_MS,
+    }
+    return {key: value for key, value in options.items() if value is not None}
+
+# per-operation read preference / read concern / write concern.
+# reads that tolerate slight staleness go to secondaries, high volume meal
+# writes only wait for the primary, profile and settings writes wait for a
+# majority. operations missing from this table use the client defaults.
+OPERATION_POLICIES = {
+    # reads
+    'get_meals': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    'get_routine': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    'get_calculator_data': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    'get_daily_totals': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    'get_user_stats': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    'export_user_data': {'read_preference': 'secondaryPreferred', 'read_concern': 'local'},
+    # the auth lookup has to see users created a moment ago by /login
+    'auth_user_lookup': {'read_preference': 'primary', 'read_concern': 'local'},
+    # writes
+    'create_meal': {'write_concern': {'w': 1}},
+    'delete_meal': {'write_concern': {'w': 1}},
+    'create_routine': {'write_concern': {'w': 1}},
+    'update_routine': {'write_concern': {'w': 1}},
+    'delete_routine': {'write_concern': {'w': 1}},
+    # reads the stored week it diffs against from the primary, then writes the diff
+    'save_routine_week': {'read_preference': 'primary', 'read_concern': 'local', 'write_concern': {'w': 1}},
+    'update_daily_totals': {'write_concern': {'w': 1}},
+    # rollup rebuilds read the meals they replace rollups with from the primary
+    'rebuild_daily_totals': {'read_preference': 'primary', 'read_concern': 'majority', 'write_concern': {'w': 'majority'}},
+    # ETags must see the write that just bumped them, or a poll could 304 past it
+    'get_data_version': {'read_preference': 'primary', 'read_concern': 'local'},
+    'bump_data_version': {'write_concern': {'w': 1}},
+    'get_or_create_user': {'read_preference': 'primary', 'write_concern': {'w': 'majority'}},
+    'update_profile': {'read_preference': 'primary', 'read_concern': 'majority', 'write_concern': {'w': 'majority'}},
+    'save_calculator_data': {'write_concern': {'w': 'majority'}},
+}
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+def get_operation_options(operation):
+    """Collection.with_options kwargs for an operation in OPERATION_POLICIES"""
+    if not operation or not Config.MONGODB_OPERATION_POLICIES:
+        return {}
+    policy = OPERATION_POLICIES.get(operation)
+    if policy is None:
+        raise KeyError(f"no mongodb policy declared for operation '{operation}'")
+
+    options = {}
+    if 'read_preference' in policy:
+        options['read_preference'] = READ_PREFERENCES[policy['read_preference']]
+    if 'read_concern' in policy:
+        options['read_concern'] = ReadConcern(policy['read_concern'])
+    if 'write_concern' in policy:
+        options['write_concern'] = WriteConcern(**policy['write_concern'])
+    return options
 
 class MongoDB:
     _instance = None
     _client = None
     _db = None
+    _pid = None
+    _collections = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -17,20 +186,32 @@ class MongoDB:
         return cls._instance
     
     def __init__(self):
-        if self._client is None:
+        if self._client is None or self._pid != os.getpid():
             self.connect()
     
     def connect(self):
         """Connect to MongoDB"""
         try:
-            mongo_uri = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
-            self._client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+            # a client inherited across fork() is unsafe, drop it and build our own
+            if self._client is not None and self._pid != os.getpid():
+                self._client = None
+                self._db = None
+                pool_metrics.reset()
+
+            self._client = MongoClient(
+                Config.MONGODB_URI,
+                serverSelectionTimeoutMS=5000,
+                event_listeners=[pool_metrics],
+                **get_pool_options()
+            )
+            self._pid = os.getpid()
             
             # Test connection
             self._client.admin.command('ping')
             
-            db_name = os.environ.get('MONGODB_DB_NAME', 'macromatch')
+            db_name = Config.MONGODB_DB_NAME
             self._db = self._client[db_name]
+            self._collections = {}
             
             print(f"MongoDB connected to {db_name}! :)")
             
@@ -39,14 +220,23 @@ class MongoDB:
             raise
     
     def get_db(self):
-        """Get database instance"""
-        if self._db is None:
+        """Get database instance (re-created lazily in each forked worker)"""
+        if self._db is None or self._pid != os.getpid():
             self.connect()
         return self._db
     
-    def get_collection(self, collection_name):
-        """Get a specific collection"""
-        return self.get_db()[collection_name]
+    def get_collection(self, collection_name, operation=None):
+        """Get a specific collection, configured with the operation's policy"""
+        db = self.get_db()
+        if operation is None:
+            return db[collection_name]
+
+        key = (collection_name, operation)
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = db[collection_name].with_options(**get_operation_options(operation))
+            self._collections[key] = collection
+        return collection
     
     def close(self):
         """Close MongoDB connection"""
@@ -58,18 +248,34 @@ def get_mongodb():
     """Get MongoDB instance"""
     return MongoDB()
 
-def get_users_collection():
-    """Get users collection"""
-    return get_mongodb().get_collection('users')
+def get_pool_metrics():
+    """Get connection pool metrics for this process"""
+    return pool_metrics.stats()
+
+def get_users_collection(operation=None):
+    """Get users collection (operation picks the policy in OPERATION_POLICIES)"""
+    return get_mongodb().get_collection('users', operation)
+
+def get_calculator_data_collection(operation=None):
+    """Get calculator data collection (operation picks the policy in OPERATION_POLICIES)"""
+    return get_mongodb().get_collection('calculator_data', operation)
+
+def get_meals_collection(operation=None):
+    """Get meals collection (operation picks the policy in OPERATION_POLICIES)"""
+    return get_mongodb().get_collection('meals', operation)
+
+def get_meal_buckets_collection(operation=None):
+    """Get per-user per-day meal buckets collection (MEAL_STORAGE_MODE=bucket)"""
+    return get_mongodb().get_collection('meal_buckets', operation)
 
-def get_calculator_data_collection():
-    """Get calculator data collection"""
-    return get_mongodb().get_collection('calculator_data')
+def get_data_versions_collection(operation=None):
+    """Get per-user data version counters collection (ETags)"""
+    return get_mongodb().get_collection('data_versions', operation)
 
-def get_meals_collection():
-    """Get meals collection"""
-    return get_mongodb().get_collection('meals')
+def get_daily_totals_collection(operation=None):
+    """Get daily nutrition rollups collection (operation picks the policy in OPERATION_POLICIES)"""
+    return get_mongodb().get_collection('daily_totals', operation)
 
-def get_routine_collection():
-    """Get routine collection"""
-    return get_mongodb().get_collection('routine')
+def get_routine_collection(operation=None):
+    """Get routine collection (operation picks the policy in OPERATION_POLICIES)"""
+    return get_mongodb().get_collection('routine', operation)
@@ -0,0 +1,29 @@
+# opaque keyset cursors for paging through lists :)
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+
+def encode_cursor(timestamp=None, doc_id=None):
+    """pack the sort key of the last returned document into an opaque string"""
+    position = {'id': str(doc_id)}
+    if timestamp is not None:
+        position['ts'] = timestamp.isoformat()
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Unpack a cursor from encode_cursor into (timestamp or None, ObjectId).
+
+    Raises ValueError for anything that isn't a cursor we issued.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        doc_id = ObjectId(position['id'])
+        timestamp = datetime.fromisoformat(position['ts']) if 'ts' in position else None
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError(f"invalid cursor: {str(e)}")
+    return timestamp, doc_id
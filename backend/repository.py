@@ -0,0 +1,749 @@
+# query layer over mongodb_config with an explicit projection for each use :)
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from flask import current_app, has_app_context
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from config import Config
+from models import Routine
+from pagination import decode_cursor, encode_cursor
+from mongodb_config import (
+    get_users_collection, get_meals_collection, get_routine_collection, get_calculator_data_collection,
+    get_daily_totals_collection, get_meal_buckets_collection, get_data_versions_collection
+)
+
+# profile fields the api exposes
+PROFILE_FIELDS = ['name', 'age', 'weight', 'height', 'activity_level', 'dietary_goals', 'gender']
+
+# what require_auth and the profile/login responses read from a user document
+AUTH_USER_PROJECTION = {field: 1 for field in ['_id', 'firebase_uid', 'email', 'updated_at'] + PROFILE_FIELDS}
+
+def response_projection(fields: List[str]) -> Dict[str, Any]:
+    """find() projection of just these fields, with _id handed back as id (always included)"""
+    projection = {'_id': 0, 'id': '$_id'}
+    projection.update({field: 1 for field in fields if field != 'id'})
+    return projection
+
+# fields a stored meal document has (what get_meals returns)
+MEAL_FIELDS = ['name', 'meal_type', 'calories', 'notes', 'timestamp', 'user_id', 'firebase_uid']
+
+# fields a stored routine document has (what get_routine returns)
+ROUTINE_FIELDS = ['activeDay', 'showPopup', 'selected', 'duration', 'speed', 'distance', 'highIntensity',
+                  'lowIntensity', 'restTime', 'exercise', 'notes', 'exercisePerRound']
+ROUTINE_RESPONSE_FIELDS = ['user_id', 'firebase_uid'] + ROUTINE_FIELDS
+
+# what ?fields= may ask for on each resource
+MEAL_SPARSE_FIELDS = ['id'] + MEAL_FIELDS
+ROUTINE_SPARSE_FIELDS = ['id'] + ROUTINE_RESPONSE_FIELDS
+PROFILE_SPARSE_FIELDS = ['id', 'firebase_uid', 'email'] + PROFILE_FIELDS
+
+# meal fields that live on the bucket rather than on each meal in it
+BUCKET_FIELDS = ['firebase_uid', 'user_id']
+
+# an export record is every field the api exposes on the resource, nothing else the document carries
+MEAL_EXPORT_PROJECTION = {field: 1 for field in ['_id'] + MEAL_FIELDS}
+ROUTINE_EXPORT_PROJECTION = {field: 1 for field in ['_id'] + ROUTINE_RESPONSE_FIELDS}
+
+# what a daily rollup needs from a meal
+ROLLUP_MEAL_PROJECTION = {'_id': 1, 'meal_type': 1, 'calories': 1, 'timestamp': 1}
+
+# get_calculator_data only returns the saved blob
+CALCULATOR_DATA_PROJECTION = {'_id': 0, 'data': 1}
+
+def _calories(value) -> float:
+    # meals store whatever the client sent, count anything non-numeric as 0
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def rollup_date(timestamp: datetime) -> str:
+    """the daily_totals key for a meal timestamp (utc day)"""
+    return timestamp.strftime('%Y-%m-%d')
+
+# meal pages are newest first, _id breaks timestamp ties
+MEAL_PAGE_SORT = [('timestamp', -1), ('_id', -1)]
+
+def meal_page_query(firebase_uid: str, cursor: Optional[str] = None,
+                    timestamp_range: Optional[Dict[str, Any]] = None,
+                    fields: Optional[List[str]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    find() filter and projection of one MealRepository.find_page page.
+
+    Sort it by MEAL_PAGE_SORT, fetch one document past the limit and hand the
+    result to meal_page. The async app runs the same query on motor. Raises
+    ValueError for a bad cursor.
+    """
+    query = {'firebase_uid': firebase_uid}
+    if timestamp_range:
+        query['timestamp'] = timestamp_range
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        if timestamp is None:
+            # already into the undated meals
+            query['$or'] = [{'timestamp': None, '_id': {'$lt': last_id}}]
+        else:
+            query['$or'] = [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': last_id}},
+                {'timestamp': None}
+            ]
+
+    # the cursor needs timestamp even when the client didn't ask for it
+    return query, response_projection((fields or MEAL_FIELDS) + ['timestamp'])
+
+def meal_page(documents: List[Dict[str, Any]], limit: int,
+              fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """the page and next cursor from up to limit + 1 meals in MEAL_PAGE_SORT order"""
+    # trim the extra document into a next cursor, then drop timestamp if it was only there for the cursor
+    # (older meals can have no timestamp, they sort last and page on _id alone)
+    fields = fields or MEAL_FIELDS
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1].get('timestamp'), documents[-1]['id'])
+    if 'timestamp' not in fields:
+        for document in documents:
+            document.pop('timestamp', None)
+    return documents, next_cursor
+
+class UserRepository:
+    """user document queries"""
+
+    def find_auth_user(self, firebase_uid: str) -> Optional[Dict[str, Any]]:
+        """the user fields auth and profile responses need"""
+        return get_users_collection('auth_user_lookup').find_one(
+            {'firebase_uid': firebase_uid}, AUTH_USER_PROJECTION
+        )
+
+    def get_or_create(self, firebase_uid: str, email: str, name: str) -> Dict[str, Any]:
+        """atomic upsert that returns the final document in one round trip"""
+        users_collection = get_users_collection('get_or_create_user')
+        now = datetime.utcnow()
+        new_user = {
+            'firebase_uid': firebase_uid,
+            'email': email,
+            'name': name,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        try:
+            return users_collection.find_one_and_update(
+                {'firebase_uid': firebase_uid},
+                {'$setOnInsert': new_user},
+                projection=AUTH_USER_PROJECTION,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # lost an insert race with another login, the winner's document is there now
+            return users_collection.find_one({'firebase_uid': firebase_uid}, AUTH_USER_PROJECTION)
+
+    def update_profile(self, firebase_uid: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """apply a profile update and return the updated profile (None if no user)"""
+        return get_users_collection('update_profile').find_one_and_update(
+            {'firebase_uid': firebase_uid},
+            {'$set': update_data},
+            projection=AUTH_USER_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+
+class MealRepository:
+    """meal document queries"""
+
+    def insert(self, meal_data: Dict[str, Any]) -> ObjectId:
+        return get_meals_collection('create_meal').insert_one(meal_data).inserted_id
+
+    def insert_many(self, meal_docs: List[Dict[str, Any]]) -> Tuple[List[Optional[ObjectId]], Dict[int, str]]:
+        """
+        Insert meals with one unordered insert_many.
+
+        Returns the ids lined up with meal_docs (None where the write failed)
+        and a {index: error message} dict for the failed ones.
+        """
+        for meal_doc in meal_docs:
+            meal_doc.setdefault('_id', ObjectId())
+
+        errors = {}
+        try:
+            get_meals_collection('create_meal').insert_many(meal_docs, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                errors[write_error['index']] = write_error.get('errmsg', 'write failed')
+
+        ids = [None if index in errors else meal_doc['_id'] for index, meal_doc in enumerate(meal_docs)]
+        return ids, errors
+
+    def find_page(self, firebase_uid: str, limit: int, cursor: Optional[str] = None,
+                  timestamp_range: Optional[Dict[str, Any]] = None,
+                  fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a user's meals (with id for _id), newest first, plus the cursor for the next one.
+
+        Pages are keyed on (timestamp, _id) rather than skipped, so every page is
+        a bounded range scan on the (firebase_uid, timestamp, _id) index no matter
+        how deep into the history it is. Meals without a timestamp sort after
+        all the others. timestamp_range ({'$gte', '$lt'}) narrows that scan to
+        the requested dates, fields (from MEAL_SPARSE_FIELDS) to the requested
+        fields. Raises ValueError for a bad cursor.
+        """
+        query, projection = meal_page_query(firebase_uid, cursor, timestamp_range, fields)
+        # one extra document tells us whether there is a next page
+        documents = list(get_meals_collection('get_meals').find(query, projection)
+                         .sort(MEAL_PAGE_SORT).limit(limit + 1))
+        return meal_page(documents, limit, fields)
+
+    def stats_by_type(self, firebase_uid: str, timestamp_range: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Meal count, calorie total and first/last timestamp per meal_type.
+
+        One $group over the (firebase_uid, timestamp) index range, so the
+        result is at most one row per meal type whatever the history size.
+        """
+        match = {'firebase_uid': firebase_uid}
+        if timestamp_range:
+            match['timestamp'] = timestamp_range
+
+        stages = [
+            {'$group': {
+                '_id': '$meal_type',
+                'count': {'$sum': 1},
+                'calories': {'$sum': {'$convert': {'input': '$calories', 'to': 'double', 'onError': 0, 'onNull': 0}}},
+                'first': {'$min': '$timestamp'},
+                'last': {'$max': '$timestamp'}
+            }}
+        ]
+        return list(self.aggregate(match, stages, 'get_user_stats'))
+
+    def aggregate(self, match: Dict[str, Any], stages: List[Dict[str, Any]], operation: str, **kwargs):
+        """
+        Run stages over the meals matching match, one document per meal.
+
+        match may only use firebase_uid and a timestamp range, so the bucket
+        layout can turn it into a bucket filter.
+        """
+        return get_meals_collection(operation).aggregate([{'$match': match}] + stages, **kwargs)
+
+    def iter_all(self, firebase_uid: str, batch_size: int):
+        """cursor over every meal of a user, fetched batch_size documents at a time"""
+        return get_meals_collection('export_user_data').find(
+            {'firebase_uid': firebase_uid}, MEAL_EXPORT_PROJECTION, batch_size=batch_size
+        ).sort([('timestamp', -1), ('_id', -1)])
+
+    def delete(self, firebase_uid: str, meal_id: str) -> Optional[Dict[str, Any]]:
+        """delete a meal, returning what the rollups need from it (None if not found)"""
+        return get_meals_collection('delete_meal').find_one_and_delete(
+            {'_id': ObjectId(meal_id), 'firebase_uid': firebase_uid},
+            projection=ROLLUP_MEAL_PROJECTION
+        )
+
+class BucketedMealRepository(MealRepository):
+    """
+    Meal queries for MEAL_STORAGE_MODE=bucket.
+
+    A user's meals for one utc day share a meal_buckets document
+    {firebase_uid, user_id, date, count, meals: [...]}, with at most
+    bucket_size meals per bucket (a full day spills into another bucket).
+    Meals keep their own _id, and every method returns the same shapes as
+    MealRepository, so routes don't know which layout is in use.
+    """
+
+    def __init__(self, bucket_size: int):
+        self.bucket_size = bucket_size
+
+    def _push(self, meal_doc: Dict[str, Any]) -> UpdateOne:
+        # append to any bucket of that day with room left, or start a new one
+        meal_doc.setdefault('_id', ObjectId())
+        meal = {key: value for key, value in meal_doc.items() if key not in BUCKET_FIELDS}
+        return UpdateOne(
+            {
+                'firebase_uid': meal_doc['firebase_uid'],
+                'date': rollup_date(meal_doc['timestamp']),
+                'count': {'$lt': self.bucket_size}
+            },
+            {
+                '$push': {'meals': meal},
+                '$inc': {'count': 1},
+                '$setOnInsert': {'user_id': meal_doc.get('user_id')}
+            },
+            upsert=True
+        )
+
+    def _unbucket(self, bucket: Dict[str, Any], meal: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+        # shaped like response_projection(fields)
+        meal['id'] = meal.pop('_id')
+        for field in BUCKET_FIELDS:
+            if field in fields:
+                meal[field] = bucket.get(field)
+        return meal
+
+    def insert(self, meal_data: Dict[str, Any]) -> ObjectId:
+        get_meal_buckets_collection('create_meal').bulk_write([self._push(meal_data)])
+        return meal_data['_id']
+
+    def insert_many(self, meal_docs: List[Dict[str, Any]]) -> Tuple[List[Optional[ObjectId]], Dict[int, str]]:
+        """one unordered bulk write of $push upserts, same return shape as MealRepository"""
+        operations = [self._push(meal_doc) for meal_doc in meal_docs]
+
+        errors = {}
+        try:
+            get_meal_buckets_collection('create_meal').bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                errors[write_error['index']] = write_error.get('errmsg', 'write failed')
+
+        ids = [None if index in errors else meal_doc['_id'] for index, meal_doc in enumerate(meal_docs)]
+        return ids, errors
+
+    def _date_range(self, timestamp_range: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        # the bucket days a {'$gte', '$lt'} timestamp range touches
+        dates = {}
+        if timestamp_range and '$gte' in timestamp_range:
+            dates['$gte'] = rollup_date(timestamp_range['$gte'])
+        if timestamp_range and '$lt' in timestamp_range:
+            dates['$lte'] = rollup_date(timestamp_range['$lt'])
+        return dates
+
+    def find_page(self, firebase_uid: str, limit: int, cursor: Optional[str] = None,
+                  timestamp_range: Optional[Dict[str, Any]] = None,
+                  fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Same pages and cursors as MealRepository.find_page.
+
+        Meals never cross a day boundary, so buckets are read newest day first
+        over the (firebase_uid, date) index and each day is sorted in memory,
+        stopping as soon as the page is full.
+        """
+        fields = fields or MEAL_FIELDS
+        query = {'firebase_uid': firebase_uid}
+        dates = self._date_range(timestamp_range)
+        position = None
+        if cursor:
+            position = decode_cursor(cursor)
+            if position[0] is None:
+                # buckets only hold dated meals, nothing sorts after an undated one
+                return [], None
+            dates['$lte'] = min(dates.get('$lte', '9999-12-31'), rollup_date(position[0]))
+        if dates:
+            query['date'] = dates
+
+        start = (timestamp_range or {}).get('$gte')
+        end = (timestamp_range or {}).get('$lt')
+
+        projection = {'firebase_uid': 1, 'user_id': 1, 'date': 1, 'meals._id': 1, 'meals.timestamp': 1}
+        projection.update({f'meals.{field}': 1 for field in fields if field not in BUCKET_FIELDS and field != 'id'})
+
+        documents = []
+        buckets = get_meal_buckets_collection('get_meals').find(query, projection).sort('date', -1)
+        try:
+            for _, day_buckets in groupby(buckets, key=itemgetter('date')):
+                day_meals = [self._unbucket(bucket, meal, fields) for bucket in day_buckets for meal in bucket['meals']]
+                day_meals.sort(key=itemgetter('timestamp', 'id'), reverse=True)
+                if position:
+                    day_meals = [meal for meal in day_meals if (meal['timestamp'], meal['id']) < position]
+                # the first and last day can be partly outside the range
+                if start or end:
+                    day_meals = [meal for meal in day_meals
+                                 if (not start or meal['timestamp'] >= start) and (not end or meal['timestamp'] < end)]
+                documents.extend(day_meals)
+                # one extra document tells us whether there is a next page
+                if len(documents) > limit:
+                    break
+        finally:
+            buckets.close()
+
+        return meal_page(documents, limit, fields)
+
+    def _unwind(self, match: Dict[str, Any], bucket_stages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # pipeline head turning the buckets of match into meal documents
+        bucket_match = {}
+        if 'firebase_uid' in match:
+            bucket_match['firebase_uid'] = match['firebase_uid']
+        # narrow to the days the timestamp range touches before unwinding
+        dates = self._date_range(match.get('timestamp'))
+        if dates:
+            bucket_match['date'] = dates
+
+        return [{'$match': bucket_match}] + bucket_stages + [
+            {'$unwind': '$meals'},
+            {'$replaceRoot': {'newRoot': {'$mergeObjects': [
+                '$meals', {'firebase_uid': '$firebase_uid', 'user_id': '$user_id'}
+            ]}}},
+            {'$match': match}
+        ]
+
+    def aggregate(self, match: Dict[str, Any], stages: List[Dict[str, Any]], operation: str, **kwargs):
+        """unwind the buckets into meal documents first, then run the same stages"""
+        return get_meal_buckets_collection(operation).aggregate(self._unwind(match, []) + stages, **kwargs)
+
+    def iter_all(self, firebase_uid: str, batch_size: int):
+        """
+        Cursor over every meal of a user, newest day first.
+
+        The days come off the (firebase_uid, date) index in order, so the
+        export still streams. Meals within a day keep the order they were
+        logged in (a full sort of the unwound meals would block on the whole
+        history).
+        """
+        pipeline = self._unwind({'firebase_uid': firebase_uid}, [{'$sort': {'date': -1}}])
+        return get_meal_buckets_collection('export_user_data').aggregate(
+            pipeline + [{'$project': MEAL_EXPORT_PROJECTION}], batchSize=batch_size
+        )
+
+    def delete(self, firebase_uid: str, meal_id: str) -> Optional[Dict[str, Any]]:
+        """pull a meal out of its bucket, returning it (None if not found)"""
+        meal_id = ObjectId(meal_id)
+        buckets_collection = get_meal_buckets_collection('delete_meal')
+        bucket = buckets_collection.find_one_and_update(
+            {'firebase_uid': firebase_uid, 'meals._id': meal_id},
+            {'$pull': {'meals': {'_id': meal_id}}, '$inc': {'count': -1}},
+            projection={'count': 1, 'meals.$': 1}
+        )
+        if not bucket:
+            return None
+
+        # that was the bucket's last meal
+        if bucket['count'] <= 1:
+            buckets_collection.delete_one({'_id': bucket['_id'], 'count': {'$lte': 0}})
+        return bucket['meals'][0]
+
+def get_meal_repository(mode: str, bucket_size: int = Config.MEAL_BUCKET_MAX_SIZE) -> MealRepository:
+    """the meal repository for a MEAL_STORAGE_MODE"""
+    if mode == 'bucket':
+        return BucketedMealRepository(bucket_size)
+    if mode == 'document':
+        return MealRepository()
+    raise ValueError(f"unknown meal storage mode '{mode}'")
+
+# one repository per (mode, bucket_size), they hold no state
+_meal_repositories = {}
+
+def meal_repository() -> MealRepository:
+    """
+    The meal repository for the running app's MEAL_STORAGE_MODE.
+
+    Read from current_app.config on every call, so each app (and test
+    config) gets its own layout. CLI tools outside an app context get
+    Config's. Resolve it in the request before handing it to a thread.
+    """
+    config = current_app.config if has_app_context() else vars(Config)
+    key = (config.get('MEAL_STORAGE_MODE', 'document'), config.get('MEAL_BUCKET_MAX_SIZE', Config.MEAL_BUCKET_MAX_SIZE))
+    if key not in _meal_repositories:
+        _meal_repositories[key] = get_meal_repository(*key)
+    return _meal_repositories[key]
+
+def routine_page_query(firebase_uid: str, cursor: Optional[str] = None, active_days: Optional[set] = None,
+                       fields: Optional[List[str]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    find() filter and projection of RoutineRepository.find_page, sorted by _id.
+
+    Fetch one document past the limit and hand the result to routine_page.
+    Raises ValueError for a bad cursor.
+    """
+    query = {'firebase_uid': firebase_uid}
+    if active_days is not None:
+        query['activeDay'] = {'$in': sorted(active_days)}
+    if cursor:
+        _, last_id = decode_cursor(cursor)
+        query['_id'] = {'$gt': last_id}
+    return query, response_projection(fields or ROUTINE_RESPONSE_FIELDS)
+
+def routine_page(documents: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """the page and next cursor from up to limit + 1 routines in _id order"""
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(doc_id=documents[-1]['id'])
+    return documents, next_cursor
+
+class RoutineRepository:
+    """routine document queries"""
+
+    def insert(self, routine_data: Dict[str, Any]) -> ObjectId:
+        return get_routine_collection('create_routine').insert_one(routine_data).inserted_id
+
+    def find_for_user(self, firebase_uid: str, fields: List[str], operation: str = 'get_routine') -> List[Dict[str, Any]]:
+        """every routine of a user, just _id and these fields"""
+        projection = {field: 1 for field in ['_id'] + fields}
+        return list(get_routine_collection(operation).find({'firebase_uid': firebase_uid}, projection))
+
+    def find_page(self, firebase_uid: str, limit: Optional[int], cursor: Optional[str] = None,
+                  active_days: Optional[set] = None,
+                  fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        A user's routines (with id for _id) in _id order, a page at a time when limit is set.
+
+        Keyed on _id over the (firebase_uid, _id) index, or the
+        (firebase_uid, activeDay, _id) one when active_days narrows it to some
+        weekdays. fields (from ROUTINE_SPARSE_FIELDS) limits what is read.
+        Raises ValueError for a bad cursor.
+        """
+        query, projection = routine_page_query(firebase_uid, cursor, active_days, fields)
+        routine_cursor = get_routine_collection('get_routine').find(query, projection).sort('_id', 1)
+        if not limit:
+            return list(routine_cursor), None
+        return routine_page(list(routine_cursor.limit(limit + 1)), limit)
+
+    def iter_all(self, firebase_uid: str, batch_size: int):
+        """cursor over every routine of a user, fetched batch_size documents at a time"""
+        return get_routine_collection('export_user_data').find(
+            {'firebase_uid': firebase_uid}, ROUTINE_EXPORT_PROJECTION, batch_size=batch_size
+        ).sort('_id', 1)
+
+    def save_week(self, firebase_uid: str, user_id: str, days: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Make the user's stored routines match `days` with a single bulk_write.
+
+        Days with an `id` update that routine (only the fields that changed),
+        days without one are inserted, and stored routines that aren't listed
+        are deleted. Raises ValueError for ids that aren't the user's.
+        """
+        # diff against the primary, a lagging secondary could miss a routine created a moment ago
+        # only the fields sent for existing routines get compared, so only those are read
+        compared = [field for field in ROUTINE_FIELDS if any(day.get('id') and field in day for day in days)]
+        stored = {str(routine['_id']): routine
+                  for routine in self.find_for_user(firebase_uid, compared, 'save_routine_week')}
+
+        operations = []
+        ids = []
+        kept = set()
+        inserted = updated = 0
+        for day in days:
+            routine_id = day.get('id')
+            if routine_id:
+                routine_id = str(routine_id)
+                current = stored.get(routine_id)
+                if current is None or routine_id in kept:
+                    raise ValueError(f"unknown or repeated routine id {routine_id}")
+                kept.add(routine_id)
+
+                changes = {field: day[field] for field in ROUTINE_FIELDS if field in day and day[field] != current.get(field)}
+                if changes:
+                    operations.append(UpdateOne({'_id': current['_id'], 'firebase_uid': firebase_uid}, {'$set': changes}))
+                    updated += 1
+                ids.append(current['_id'])
+            else:
+                routine_data = Routine.from_dict(day).to_dict()
+                routine_data['_id'] = ObjectId()
+                routine_data['firebase_uid'] = firebase_uid
+                routine_data['user_id'] = user_id
+                operations.append(InsertOne(routine_data))
+                inserted += 1
+                ids.append(routine_data['_id'])
+
+        deleted_ids = [routine['_id'] for routine_id, routine in stored.items() if routine_id not in kept]
+        operations.extend(DeleteOne({'_id': routine_id, 'firebase_uid': firebase_uid}) for routine_id in deleted_ids)
+
+        if operations:
+            get_routine_collection('save_routine_week').bulk_write(operations, ordered=False)
+
+        return {
+            'ids': ids,
+            'deleted_ids': deleted_ids,
+            'inserted': inserted,
+            'updated': updated,
+            'deleted': len(deleted_ids)
+        }
+
+    def update(self, firebase_uid: str, routine_id: str, updated_data: Dict[str, Any]):
+        return get_routine_collection('update_routine').update_one(
+            {'_id': ObjectId(routine_id), 'firebase_uid': firebase_uid},
+            {'$set': updated_data}
+        )
+
+    def delete(self, firebase_uid: str, routine_id: str) -> bool:
+        result = get_routine_collection('delete_routine').delete_one({
+            '_id': ObjectId(routine_id),
+            'firebase_uid': firebase_uid
+        })
+        return result.deleted_count > 0
+
+class CalculatorDataRepository:
+    """calculator data queries (one document per user)"""
+
+    def find_data(self, firebase_uid: str) -> Optional[Dict[str, Any]]:
+        """the saved calculator blob, or None if the user never saved one"""
+        document = get_calculator_data_collection('get_calculator_data').find_one(
+            {'firebase_uid': firebase_uid}, CALCULATOR_DATA_PROJECTION
+        )
+        return document.get('data') if document else None
+
+    def save(self, firebase_uid: str, data: Dict[str, Any]):
+        now = datetime.utcnow()
+        return get_calculator_data_collection('save_calculator_data').update_one(
+            {'firebase_uid': firebase_uid},
+            {'$set': {
+                'firebase_uid': firebase_uid,
+                'data': data,
+                'created_at': now,
+                'updated_at': now
+            }},
+            upsert=True
+        )
+
+class DailyTotalsRepository:
+    """
+    Per-user per-day nutrition rollups kept in step with meal writes.
+
+    Documents look like {firebase_uid, date: 'YYYY-MM-DD', meal_count, calories,
+    by_type: {breakfast: {count, calories}, ...}} and are only ever changed
+    with $inc, so concurrent writers can't lose updates.
+    """
+
+    def _increments(self, meals: List[Dict[str, Any]], sign: int) -> Dict[str, Dict[str, float]]:
+        per_day = {}
+        # a meal without a timestamp isn't on any day
+        for meal in meals:
+            if not isinstance(meal.get('timestamp'), datetime):
+                continue
+            increments = per_day.setdefault(rollup_date(meal['timestamp']), {})
+            calories = sign * _calories(meal.get('calories'))
+            meal_type = meal.get('meal_type') or 'unknown'
+            for key, amount in (('meal_count', sign), ('calories', calories),
+                                (f'by_type.{meal_type}.count', sign), (f'by_type.{meal_type}.calories', calories)):
+                increments[key] = increments.get(key, 0) + amount
+        return per_day
+
+    def operations(self, firebase_uid: str, meals: List[Dict[str, Any]], sign: int) -> List[UpdateOne]:
+        """the $inc upserts that count meals into (sign 1) or out of (sign -1) their days"""
+        # updated_at is server time, rebuild compares it against the server clock
+        return [
+            UpdateOne(
+                {'firebase_uid': firebase_uid, 'date': date},
+                {'$inc': increments, '$currentDate': {'updated_at': True}},
+                upsert=True
+            )
+            for date, increments in self._increments(meals, sign).items()
+        ]
+
+    def _apply(self, firebase_uid: str, meals: List[Dict[str, Any]], sign: int):
+        operations = self.operations(firebase_uid, meals, sign)
+        if operations:
+            # one round trip however many days the meals span
+            get_daily_totals_collection('update_daily_totals').bulk_write(operations, ordered=False)
+
+    def add_meals(self, firebase_uid: str, meals: List[Dict[str, Any]]):
+        """count newly written meals into their days"""
+        self._apply(firebase_uid, meals, 1)
+
+    def remove_meals(self, firebase_uid: str, meals: List[Dict[str, Any]]):
+        """take deleted meals back out of their days"""
+        self._apply(firebase_uid, meals, -1)
+
+    def find_range(self, firebase_uid: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """rollups for [start_date, end_date) in date order, one point read per day"""
+        query = {'firebase_uid': firebase_uid}
+        date_range = {}
+        if start_date:
+            date_range['$gte'] = start_date
+        if end_date:
+            date_range['$lt'] = end_date
+        if date_range:
+            query['date'] = date_range
+        return list(get_daily_totals_collection('get_daily_totals').find(
+            query, {'_id': 0, 'date': 1, 'meal_count': 1, 'calories': 1, 'by_type': 1}
+        ).sort('date', 1))
+
+    def user_ids(self) -> List[str]:
+        """every firebase_uid that has rollups"""
+        return [row['_id'] for row in get_daily_totals_collection().aggregate([{'$group': {'_id': '$firebase_uid'}}])]
+
+    def rebuild(self, firebase_uid: Optional[str] = None) -> int:
+        """
+        Recompute rollups from the raw meals to repair drift.
+
+        $merges freshly grouped rollups over the ones in scope (one user, or
+        everyone), reading the meals from the primary, then deletes the rows
+        the merge didn't rewrite and no meal write touched since it started:
+        days that have no meals left. Rollups stay readable throughout. A
+        meal write landing while its day is being replaced can still be lost,
+        so run it while meal writes are quiet. Returns the number of days in scope.
+        """
+        match = {'firebase_uid': firebase_uid} if firebase_uid else {}
+        totals_collection = get_daily_totals_collection('rebuild_daily_totals')
+        calories = {'$convert': {'input': '$calories', 'to': 'double', 'onError': 0, 'onNull': 0}}
+        stages = [
+            {'$match': {'timestamp': {'$type': 'date'}}},
+            {'$group': {
+                '_id': {
+                    'firebase_uid': '$firebase_uid',
+                    'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$timestamp'}},
+                    'meal_type': {'$ifNull': ['$meal_type', 'unknown']}
+                },
+                'count': {'$sum': 1},
+                'calories': {'$sum': calories}
+            }},
+            {'$group': {
+                '_id': {'firebase_uid': '$_id.firebase_uid', 'date': '$_id.date'},
+                'meal_count': {'$sum': '$count'},
+                'calories': {'$sum': '$calories'},
+                'by_type': {'$push': {'k': '$_id.meal_type', 'v': {'count': '$count', 'calories': '$calories'}}}
+            }},
+            {'$project': {
+                '_id': 0,
+                'firebase_uid': '$_id.firebase_uid',
+                'date': '$_id.date',
+                'meal_count': 1,
+                'calories': 1,
+                'by_type': {'$arrayToObject': '$by_type'},
+                'updated_at': '$$NOW'
+            }},
+            {'$merge': {
+                'into': 'daily_totals',
+                'on': ['firebase_uid', 'date'],
+                'whenMatched': 'replace',
+                'whenNotMatched': 'insert'
+            }}
+        ]
+
+        # server time before the merge, every row it writes gets a later $$NOW
+        started_at = totals_collection.database.command('hello')['localTime']
+        meal_repository().aggregate(match, stages, 'rebuild_daily_totals')
+        totals_collection.delete_many(dict(match, updated_at={'$not': {'$gte': started_at}}))
+        return totals_collection.count_documents(match)
+
+class DataVersionRepository:
+    """
+    Per-user write counters behind the read endpoints' ETags.
+
+    One document per user, {_id: firebase_uid, meals: n, meals_at: ..., ...},
+    with a counter per scope that every write to that scope $incs and the
+    time of that write.
+    """
+
+    def get_version(self, firebase_uid: str, scope: str) -> Tuple[int, Optional[datetime]]:
+        """(counter, time of the last bump) for a scope, (0, None) before any write"""
+        versions = get_data_versions_collection('get_data_version').find_one(
+            {'_id': firebase_uid}, {scope: 1, f'{scope}_at': 1}
+        ) or {}
+        return versions.get(scope, 0), versions.get(f'{scope}_at')
+
+    def bump_update(self, scope: str) -> Dict[str, Any]:
+        """the update a write to scope applies to the user's versions document"""
+        return {'$inc': {scope: 1}, '$set': {f'{scope}_at': datetime.utcnow()}}
+
+    def bump(self, firebase_uid: str, scope: str):
+        get_data_versions_collection('bump_data_version').update_one(
+            {'_id': firebase_uid}, self.bump_update(scope), upsert=True
+        )
+
+    def bump_many(self, firebase_uids: List[str], scope: str, batch_size: int = 1000):
+        """bump scope for many users (maintenance jobs), batch_size users per bulk write"""
+        for start in range(0, len(firebase_uids), batch_size):
+            get_data_versions_collection('bump_data_version').bulk_write([
+                UpdateOne({'_id': firebase_uid}, self.bump_update(scope), upsert=True)
+                for firebase_uid in firebase_uids[start:start + batch_size]
+            ], ordered=False)
+
+# global repository instances
+users = UserRepository()
+routines = RoutineRepository()
+calculator_data = CalculatorDataRepository()
+daily_totals = DailyTotalsRepository()
+data_versions = DataVersionRepository()
@@ -0,0 +1,238 @@
+# server-side cache of authenticated GET responses :)
+import time
+import threading
+from functools import wraps
+from flask import Response, current_app, request
+from cache_utils import LRUCache
+from etags import current_version, settling
+import repository
+
+# global response cache instance
+response_cache = None
+
+# cached routes whose responses are computed from a user's meals
+MEAL_ROUTES = ('meals', 'stats', 'daily_totals')
+
+class MemoryCacheBackend:
+    """
+    In-process backend on LRUCache.
+
+    Each (route, firebase_uid) tag is one LRU entry holding a dict of
+    variant (query string) -> (expires_at, mimetype, body), so invalidating
+    a tag drops every page and filter of it at once.
+    """
+    def __init__(self, max_size, max_variants):
+        self._entries = LRUCache(max_size=max_size)
+        self._lock = threading.Lock()
+        self.max_variants = max_variants
+
+    def get(self, tag, variant):
+        variants = self._entries.get(tag)
+        return variants.get(variant) if variants else None
+
+    def set(self, tag, variant, entry):
+        with self._lock:
+            variants = self._entries.get(tag) or {}
+            if variant not in variants and len(variants) >= self.max_variants:
+                variants.pop(next(iter(variants)))
+            variants[variant] = entry
+            self._entries.set(tag, variants)
+
+    def delete(self, tags):
+        # under the lock so a concurrent set can't write a dropped tag back
+        with self._lock:
+            for tag in tags:
+                self._entries.delete(tag)
+
+    def size(self):
+        return self._entries.stats()['size']
+
+class RedisCacheBackend:
+    """
+    Backend on any Redis-protocol server (redis, valkey, a local stand-in).
+
+    Each tag is a hash of variant -> packed entry, so invalidation is one
+    DEL. Entries carry their own expiry, the hash itself expires ttl after
+    its last write so abandoned users don't pile up.
+    """
+    def __init__(self, client, ttl, max_variants, key_prefix='macromatch:responses:'):
+        self.client = client
+        self.ttl = ttl
+        self.max_variants = max_variants
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url, ttl, max_variants):
+        # redis is only needed when RESPONSE_CACHE_BACKEND=redis
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5), ttl, max_variants)
+
+    def get(self, tag, variant):
+        packed = self.client.hget(self.key_prefix + tag, variant)
+        if packed is None:
+            return None
+        expires_at, mimetype, body = packed.split(b'|', 2)
+        return float(expires_at), mimetype.decode('utf-8'), body
+
+    def set(self, tag, variant, entry):
+        expires_at, mimetype, body = entry
+        key = self.key_prefix + tag
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, variant, f"{expires_at:.3f}|{mimetype}|".encode('utf-8') + body)
+        pipeline.hlen(key)
+        pipeline.expire(key, self.ttl)
+        _, variants, _ = pipeline.execute()
+        # too many pages/filters cached for one user, start that tag over
+        if variants > self.max_variants:
+            self.client.delete(key)
+
+    def delete(self, tags):
+        if tags:
+            self.client.delete(*[self.key_prefix + tag for tag in tags])
+
+    def size(self):
+        return None
+
+class ResponseCache:
+    """backend + ttl/size limits + the hit/miss counters /metrics reports"""
+    def __init__(self, backend, ttl, max_body_bytes):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_body_bytes = max_body_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, tag, variant):
+        """(mimetype, body) of a live entry, or None. Backend errors count as misses."""
+        try:
+            entry = self.backend.get(tag, variant)
+        except Exception as e:
+            print(f"response cache get error: {str(e)}")
+            self._count('errors')
+            entry = None
+
+        if entry is None or entry[0] <= time.time():
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry[1], entry[2]
+
+    def set(self, tag, variant, mimetype, body):
+        if len(body) > self.max_body_bytes:
+            return
+        try:
+            self.backend.set(tag, variant, (time.time() + self.ttl, mimetype, body))
+            self._count('stores')
+        except Exception as e:
+            print(f"response cache set error: {str(e)}")
+            self._count('errors')
+
+    def invalidate(self, tags):
+        try:
+            self.backend.delete(tags)
+            self._count('invalidations')
+        except Exception as e:
+            # the entries still expire after ttl
+            print(f"response cache invalidate error: {str(e)}")
+            self._count('errors')
+
+    def stats(self):
+        """hit/miss counters for the metrics endpoint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'size': self.backend.size(),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+                'errors': self.errors,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+def get_response_cache():
+    """get or create the response cache singleton (None when RESPONSE_CACHE_BACKEND=none)"""
+    global response_cache
+    if response_cache is None:
+        config = current_app.config
+        backend_name = config.get('RESPONSE_CACHE_BACKEND', 'memory')
+        if backend_name == 'none':
+            return None
+
+        ttl = config.get('RESPONSE_CACHE_TTL', 30)
+        max_variants = config.get('RESPONSE_CACHE_MAX_VARIANTS', 32)
+        if backend_name == 'redis':
+            backend = RedisCacheBackend.from_url(config['RESPONSE_CACHE_REDIS_URL'], ttl, max_variants)
+        elif backend_name == 'memory':
+            backend = MemoryCacheBackend(config.get('RESPONSE_CACHE_SIZE', 10000), max_variants)
+        else:
+            raise ValueError(f"unknown RESPONSE_CACHE_BACKEND '{backend_name}'")
+        response_cache = ResponseCache(backend, ttl, config.get('RESPONSE_CACHE_MAX_BODY_BYTES', 262144))
+    return response_cache
+
+def _tag(route, firebase_uid):
+    return f"{route}:{firebase_uid}"
+
+def cached_response(route, scope=None):
+    """
+    Serve a GET from the response cache, keyed by (route, firebase_uid, data version, query string).
+
+    Goes under @require_auth (and under @conditional, so 304s skip the cache
+    lookup too). scope is the data_versions scope the route reads (route by
+    default). Its version is part of the key, so a write made through any
+    worker retires the entries every other worker holds, even with the
+    per-process memory backend and before @conditional tags the response
+    with that version. Only 200 responses are stored, and not within
+    ETAG_SETTLE_SECONDS of a write (the view may have read a secondary that
+    hasn't seen it yet) or when a write raced the view. Writes should still
+    call invalidate_responses for the routes they change to free the space.
+
+    Usage:
+        @routine_bp.route('/', methods=['GET'])
+        @require_auth
+        @cached_response('routine')
+        def get_routine(): ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None:
+                return f(*args, **kwargs)
+
+            version, bumped_at = current_version(scope or route)
+            if settling(bumped_at):
+                return f(*args, **kwargs)
+
+            tag = _tag(route, request.firebase_uid)
+            variant = f"{version}|{request.query_string.decode('latin-1')}"
+            cached = cache.get(tag, variant)
+            if cached is not None:
+                mimetype, body = cached
+                return Response(body, status=200, mimetype=mimetype)
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                # read again after the view ran, so a write that raced it is seen too
+                if repository.data_versions.get_version(request.firebase_uid, scope or route)[0] == version:
+                    cache.set(tag, variant, response.mimetype, response.get_data())
+            return response
+
+        return decorated
+    return decorator
+
+def invalidate_responses(firebase_uid, *routes):
+    """drop every cached response of these routes for a user after a write"""
+    cache = get_response_cache()
+    if cache is not None:
+        cache.invalidate([_tag(route, firebase_uid) for route in routes])
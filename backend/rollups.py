@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Daily nutrition rollup maintenance.
+
+Meal writes keep daily_totals up to date with $inc, but the meal write and
+the rollup update are separate operations, so a crash between them (or a
+manual edit to meals) leaves the rollups drifted. This recomputes them from
+the raw meals, then bumps the rebuilt users' meal data versions and drops
+their cached stats responses so nobody keeps reading the drifted numbers.
+
+    python rollups.py rebuild               # every user
+    python rollups.py rebuild --uid <uid>   # one user
+"""
+
+import argparse
+
+from flask import Flask
+
+from config import Config
+from response_cache import invalidate_responses
+import repository
+
+def invalidate_cached_stats(firebase_uids):
+    """drop the users' cached stats and daily-totals responses"""
+    if Config.RESPONSE_CACHE_BACKEND == 'memory':
+        # each worker's memory cache is out of reach from here
+        print(f"memory response caches catch up within RESPONSE_CACHE_TTL ({Config.RESPONSE_CACHE_TTL}s)")
+        return
+
+    # the response cache reads its settings from a flask app config
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    with app.app_context():
+        for firebase_uid in firebase_uids:
+            invalidate_responses(firebase_uid, 'stats', 'daily_totals')
+
+def rebuild(args):
+    """recompute rollups from meals with one aggregation ($merge into daily_totals)"""
+    # users whose rollups may change: everyone who had some before or has some after
+    firebase_uids = {args.uid} if args.uid else set(repository.daily_totals.user_ids())
+    days = repository.daily_totals.rebuild(args.uid)
+    if not args.uid:
+        firebase_uids.update(repository.daily_totals.user_ids())
+
+    # stats are cached (and settle) under the meals data version
+    firebase_uids = sorted(firebase_uids)
+    repository.data_versions.bump_many(firebase_uids, 'meals')
+    invalidate_cached_stats(firebase_uids)
+
+    scope = f"user {args.uid}" if args.uid else "all users"
+    print(f"rebuilt {days} daily totals for {scope} :)")
+
+def main():
+    parser = argparse.ArgumentParser(description='daily nutrition rollup maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='recompute daily_totals from the raw meals')
+    rebuild_parser.add_argument('--uid', help='only rebuild this firebase uid')
+    rebuild_parser.set_defaults(func=rebuild)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
-from mongodb_config import get_routine_collection
 from auth_middleware import require_auth
+from date_ranges import parse_weekdays
+from fieldsets import parse_fields
+from etags import conditional
+from response_cache import cached_response, invalidate_responses
 from models import Routine
-from bson import ObjectId
+import repository
 
 routine_bp = Blueprint('routine', __name__, url_prefix='/api/v1/routine')
 
@@ -36,17 +39,18 @@ def create_routine():
         if validation_errors:
             return jsonify({'error' : 'validation failed', 'details':validation_errors}), 400
         """
-        routine_collection = get_routine_collection()
         routine_data = routine.to_dict()
         routine_data['firebase_uid'] = request.firebase_uid
         routine_data['user_id'] = str(request.current_user['_id'])
 
-        result = routine_collection.insert_one(routine_data)
+        routine_id = repository.routines.insert(routine_data)
+        repository.data_versions.bump(request.firebase_uid, 'routine')
+        invalidate_responses(request.firebase_uid, 'routine')
 
         return jsonify({
             'message' : 'routine created',
             'routine' :{
-                'id' : str(result.inserted_id),
+                'id' : str(routine_id),
                 'activeDay': routine.activeDay,
                 'showPopup': routine.showPopup,
                 'selected': routine.selected,
@@ -68,28 +72,83 @@ def create_routine():
 
 @routine_bp.route('/', methods=['GET'])
 @require_auth
+@conditional('routine')
+@cached_response('routine')
 def get_routine():
     try:
-
-        routine_collection = get_routine_collection()
-        routine_user = list(routine_collection.find({'firebase_uid' : request.firebase_uid}))
-
-        if not routine_user:
+        # everything by default, or a page at a time with ?limit= and ?cursor=
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = min(max(limit, 1), 100)
+        cursor = request.args.get('cursor')
+
+        # only some weekdays with ?day=monday,tuesday or ?from=YYYY-MM-DD&to=YYYY-MM-DD
+        try:
+            active_days = parse_weekdays(request.args)
+        except ValueError as error:
+            return jsonify({'error': f'invalid day filter: {str(error)}'}), 400
+
+        try:
+            fields = parse_fields(request.args, repository.ROUTINE_SPARSE_FIELDS)
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+        try:
+            routine_user, next_cursor = repository.routines.find_page(
+                request.firebase_uid, limit, cursor, active_days, fields
+            )
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+
+        if not routine_user and not cursor:
             return jsonify({'error': 'No routine found'}), 404
         
-        addIdRoutine= []
-        for r in routine_user:
-            r['id'] = str(r['_id'])
-            r.pop('_id', None)
-            addIdRoutine.append(r)
-        
-        return jsonify({'routine': addIdRoutine}), 200
+        return jsonify({'routine': routine_user, 'next_cursor': next_cursor}), 200
     except Exception as error:
         print(f"routine error: {str(error)}")
         return jsonify({'error' : 'server error'}), 500
     
 
 
+@routine_bp.route('/week', methods=['PUT'])
+@require_auth
+def save_routine_week():
+    # save the whole weekly plan in one request and one bulk write
+    try:
+        data = request.get_json()
+        days = data.get('days') if isinstance(data, dict) else data
+
+        if not isinstance(days, list):
+            return jsonify({'error' : 'need a list of days'}), 400
+
+        for index, day in enumerate(days):
+            if not isinstance(day, dict):
+                return jsonify({'error' : f'day {index} is not an object'}), 400
+            if not day.get('id') and (not day.get('activeDay') or not day.get('selected')):
+                return jsonify({'error' : f'day {index}: either no day was selected or a workout'}), 400
+
+        try:
+            result = repository.routines.save_week(
+                request.firebase_uid, str(request.current_user['_id']), days
+            )
+        except ValueError as error:
+            return jsonify({'error' : str(error)}), 400
+        repository.data_versions.bump(request.firebase_uid, 'routine')
+        invalidate_responses(request.firebase_uid, 'routine')
+
+        return jsonify({
+            'message' : 'week saved',
+            'ids' : [str(routine_id) for routine_id in result['ids']],
+            'deleted_ids' : [str(routine_id) for routine_id in result['deleted_ids']],
+            'inserted' : result['inserted'],
+            'updated' : result['updated'],
+            'deleted' : result['deleted']
+        }), 200
+
+    except Exception as error:
+        print(f"save routine week error: {str(error)}")
+        return jsonify({'error' : 'server error'}), 500
+
 #there might be a better way to go about this
 @routine_bp.route('/<routine_id>', methods=['PUT'])
 @require_auth
@@ -110,15 +169,14 @@ def update_routine(routine_id):
         if not updated_data:
             return jsonify({'error' : 'no fields were updated'}),400
 
-        routine_collection = get_routine_collection();
-        result = routine_collection.update_one(
-            {'_id' : ObjectId(routine_id), 'firebase_uid' : request.firebase_uid},
-            {'$set' : updated_data}
-        )
+        result = repository.routines.update(request.firebase_uid, routine_id, updated_data)
+        # someone else's (or a deleted) routine, nothing changed so nothing to bump
+        if result.matched_count == 0:
+            return jsonify({'error' : 'routine not found'}), 404
+
+        repository.data_versions.bump(request.firebase_uid, 'routine')
+        invalidate_responses(request.firebase_uid, 'routine')
 
-        if not result:
-            return jsonify({'error' : 'failed to updated routine'}), 500
-        
         return jsonify({
             'message' : 'routine updated',
             'updates' : list(updated_data.keys()),
@@ -134,15 +192,10 @@ def update_routine(routine_id):
 @require_auth
 def delete_routine(routine_id):
     try:
-        routine_collection = get_routine_collection()
-
-        result= routine_collection.delete_one({
-            '_id': ObjectId(routine_id),
-            'firebase_uid':request.firebase_uid
-        })
-
-        if result.deleted_count == 0:
+        if not repository.routines.delete(request.firebase_uid, routine_id):
             return jsonify({'error':'routine was not deleted'}),400
+        repository.data_versions.bump(request.firebase_uid, 'routine')
+        invalidate_responses(request.firebase_uid, 'routine')
         return jsonify({'message' : 'routine was deleted'}), 200
     except Exception as error:
         print(f"delete routine error: {str(error)}")
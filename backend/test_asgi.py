@@ -0,0 +1,155 @@
+# async app: same bookkeeping on writes as the sync routes :)
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import async_auth_middleware
+import async_mongodb_config
+import response_cache
+import user_cache
+from asgi import create_async_app
+from config import config
+from conftest import TEST_UID, MockCollection
+
+class AsyncCursor:
+    """motor cursor over a mongomock one: sort/limit chain, to_list awaits"""
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._cursor)[:length]
+
+class AsyncCollection:
+    """awaitable methods over a MockCollection, enough of motor for the routes"""
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+@pytest.fixture
+def async_app(mongo, user, monkeypatch):
+    """the quart app with motor swapped for mongomock"""
+    def get_collection(collection_name, operation=None):
+        async_mongodb_config.get_operation_options(operation)
+        return AsyncCollection(MockCollection(mongo[collection_name]))
+
+    async def verify_token_async(id_token):
+        return {'uid': id_token, 'email': f'{id_token}@example.com'}
+
+    monkeypatch.setattr(async_mongodb_config.async_mongodb, 'get_collection', get_collection)
+    monkeypatch.setattr(async_auth_middleware, 'verify_token_async', verify_token_async)
+    monkeypatch.setattr(response_cache, 'response_cache', None)
+    monkeypatch.setattr(user_cache, 'user_cache', None)
+    return create_async_app('testing')
+
+def test_async_app_refuses_bucket_storage(monkeypatch):
+    monkeypatch.setattr(config['testing'], 'MEAL_STORAGE_MODE', 'bucket')
+    with pytest.raises(RuntimeError):
+        create_async_app('testing')
+
+def test_async_meal_writes_keep_rollups_versions_and_cache(async_app, mongo):
+    headers = {'Authorization': f'Bearer {TEST_UID}'}
+    cache = response_cache.response_cache
+    cache.set(f'stats:{TEST_UID}', '', 'application/json', b'{}')
+
+    async def scenario():
+        client = async_app.test_client()
+        created = await client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300},
+                                    headers=headers)
+        assert created.status_code == 201
+        meal_id = (await created.get_json())['meal']['id']
+
+        [totals] = mongo.daily_totals.find({'firebase_uid': TEST_UID})
+        assert (totals['meal_count'], totals['calories']) == (1, 300)
+        assert mongo.data_versions.find_one({'_id': TEST_UID})['meals'] == 1
+        assert cache.get(f'stats:{TEST_UID}', '') is None
+
+        deleted = await client.delete(f'/api/v1/meals/{meal_id}', headers=headers)
+        assert deleted.status_code == 200
+        [totals] = mongo.daily_totals.find({'firebase_uid': TEST_UID})
+        assert (totals['meal_count'], totals['calories']) == (0, 0)
+        assert mongo.data_versions.find_one({'_id': TEST_UID})['meals'] == 2
+
+    asyncio.run(scenario())
+
+def test_async_routine_writes_bump_the_routine_version(async_app, mongo):
+    headers = {'Authorization': f'Bearer {TEST_UID}'}
+
+    async def scenario():
+        client = async_app.test_client()
+        created = await client.post('/api/v1/routine/', json={'activeDay': 'monday', 'selected': 'run'}, headers=headers)
+        assert created.status_code == 201
+        routine_id = (await created.get_json())['routine']['id']
+        await client.put(f'/api/v1/routine/{routine_id}', json={'duration': '30'}, headers=headers)
+        await client.delete(f'/api/v1/routine/{routine_id}', headers=headers)
+
+    asyncio.run(scenario())
+    assert mongo.data_versions.find_one({'_id': TEST_UID})['routine'] == 3
+
+def test_async_update_of_someone_elses_routine_is_a_404(async_app, mongo):
+    other = mongo.routine.insert_one({'firebase_uid': 'someone-else', 'activeDay': 'monday'}).inserted_id
+
+    async def scenario():
+        client = async_app.test_client()
+        return await client.put(f'/api/v1/routine/{other}', json={'duration': '30'},
+                                headers={'Authorization': f'Bearer {TEST_UID}'})
+
+    assert asyncio.run(scenario()).status_code == 404
+    assert 'duration' not in mongo.routine.find_one({'_id': other})
+    assert mongo.data_versions.count_documents({}) == 0
+
+def test_async_reads_page_and_filter_like_the_sync_app(client, async_app, mongo):
+    # client first, async_app builds the shared caches after the sync app fixture resets them
+    headers = {'Authorization': f'Bearer {TEST_UID}'}
+    start = datetime(2024, 1, 1, 12)
+    mongo.meals.insert_many([{'firebase_uid': TEST_UID, 'name': f'meal {n}', 'meal_type': 'lunch', 'calories': n,
+                              'notes': '', 'timestamp': start + timedelta(hours=6 * n)} for n in range(7)])
+    for day in ('monday', 'tuesday', 'friday'):
+        mongo.routine.insert_one({'firebase_uid': TEST_UID, 'activeDay': day, 'selected': 'run'})
+
+    paths = ['/api/v1/meals/?limit=3', '/api/v1/meals/?limit=2&fields=name,timestamp',
+             '/api/v1/meals/?from=2024-01-02&to=2024-01-02&tz=America/Chicago',
+             '/api/v1/routine/?limit=2', '/api/v1/routine/?day=friday,monday&fields=activeDay',
+             '/api/v1/meals/?fields=password', '/api/auth/profile?fields=email,name']
+
+    async def walk(path):
+        # every page of a list, following next_cursor
+        pages = []
+        test_client = async_app.test_client()
+        while path:
+            response = await test_client.get(path, headers=headers)
+            body = await response.get_json()
+            pages.append((response.status_code, body))
+            cursor = body.get('next_cursor') if response.status_code == 200 else None
+            path = f"{path.split('&cursor=')[0]}&cursor={cursor}" if cursor else None
+        return pages
+
+    def walk_sync(path):
+        pages = []
+        while path:
+            response = client.get(path)
+            body = response.get_json()
+            pages.append((response.status_code, body))
+            cursor = body.get('next_cursor') if response.status_code == 200 else None
+            path = f"{path.split('&cursor=')[0]}&cursor={cursor}" if cursor else None
+        return pages
+
+    for path in paths:
+        assert asyncio.run(walk(path)) == walk_sync(path), path
@@ -0,0 +1,44 @@
+# POST /api/v1/batch: dispatch, auth reuse and nesting :)
+import auth_middleware
+import batch_routes
+
+def test_items_run_in_order_on_one_token_check(client, monkeypatch):
+    verified = []
+    verify_id_token = auth_middleware.verify_id_token
+    monkeypatch.setattr(auth_middleware, 'verify_id_token', lambda id_token: verified.append(id_token) or verify_id_token(id_token))
+
+    response = client.post('/api/v1/batch/', json={'requests': [
+        {'method': 'POST', 'path': '/api/v1/meals/', 'body': {'name': 'eggs', 'meal_type': 'breakfast', 'calories': 150}},
+        {'path': '/api/v1/meals/?fields=name', 'id': 'list'},
+        {'method': 'DELETE', 'path': '/api/v1/meals/000000000000000000000000'},
+    ]})
+
+    results = response.get_json()['responses']
+    assert response.status_code == 200
+    assert [result['status'] for result in results] == [201, 200, 404]
+    assert results[1]['id'] == 'list'
+    assert [meal['name'] for meal in results[1]['body']['meals']] == ['eggs']
+    assert len(verified) == 1
+
+def test_sub_requests_need_the_batch_token(app, user):
+    response = app.test_client().post('/api/v1/batch/', json=[{'path': '/api/v1/meals/'}])
+    assert response.status_code == 401
+
+def test_encoded_batch_path_is_rejected(client):
+    response = client.post('/api/v1/batch/', json=[
+        {'method': 'POST', 'path': '/api/v1/%62atch/', 'body': [{'path': '/api/v1/meals/'}] * 25},
+    ])
+    assert response.status_code == 400
+    assert "nested" in response.get_json()['error']
+
+def test_nested_batch_keeps_the_outer_identity(client, monkeypatch):
+    # even if a path got past routing, the inner batch refuses to run
+    monkeypatch.setattr(batch_routes, 'matched_endpoint', lambda environ: None)
+
+    response = client.post('/api/v1/batch/', json=[
+        {'method': 'POST', 'path': '/api/v1/batch/', 'body': [{'path': '/api/v1/meals/'}]},
+        {'path': '/api/v1/meals/'},
+    ])
+
+    results = response.get_json()['responses']
+    assert [result['status'] for result in results] == [400, 200]
@@ -0,0 +1,92 @@
+# Accept-Encoding negotiated compression and encoded ETags :)
+import gzip
+import json
+from datetime import datetime
+
+import brotli
+import pytest
+import zstandard
+from flask import Flask, Response, jsonify
+
+from compression import init_compression
+from conftest import TEST_UID
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'br': brotli.decompress,
+    'zstd': lambda body: zstandard.ZstdDecompressor().decompressobj().decompress(body),
+}
+
+ROWS = [{'id': index, 'name': f'meal {index}', 'calories': index * 10} for index in range(200)]
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+    app.config.update(COMPRESSION_MIN_SIZE=1024, COMPRESSION_STREAM_FLUSH_BYTES=2048)
+
+    @app.route('/rows')
+    def rows():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson')
+
+    init_compression(app)
+    return app
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_each_encoding_round_trips(compressed_app, encoding):
+    response = compressed_app.test_client().get('/rows', headers={'Accept-Encoding': encoding})
+
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = response.get_data()
+    assert len(body) < len(json.dumps(ROWS))
+    assert json.loads(DECOMPRESS[encoding](body)) == ROWS
+
+def test_preference_order_and_identity(compressed_app):
+    client = compressed_app.test_client()
+    assert client.get('/rows', headers={'Accept-Encoding': 'gzip, br, zstd'}).headers['Content-Encoding'] == 'zstd'
+    assert client.get('/rows', headers={'Accept-Encoding': 'gzip;q=1, br;q=0.5'}).headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Encoding' not in client.get('/rows').headers
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+def test_streams_are_flushed_as_they_go(compressed_app, encoding):
+    response = compressed_app.test_client().get('/stream', headers={'Accept-Encoding': encoding}, buffered=False)
+    chunks = [chunk for chunk in response.response if chunk]
+
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Content-Length' not in response.headers
+    # one flush per COMPRESSION_STREAM_FLUSH_BYTES of input plus the tail, not one per line
+    raw_size = sum(len(json.dumps(row)) + 1 for row in ROWS)
+    assert raw_size // 2048 <= len(chunks) < len(ROWS)
+    lines = DECOMPRESS[encoding](b''.join(chunks)).decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+def test_not_modified_repeats_the_encoded_etag(app, client, mongo):
+    app.config['COMPRESSION_MIN_SIZE'] = 0
+    mongo.meals.insert_many([
+        {'firebase_uid': TEST_UID, 'name': f'meal {hour}', 'meal_type': 'lunch', 'calories': 100,
+         'notes': 'same as yesterday', 'timestamp': datetime(2024, 1, 1, hour)}
+        for hour in range(20)
+    ])
+
+    first = client.get('/api/v1/meals/', headers={'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert etag.endswith('-gzip"')
+
+    again = client.get('/api/v1/meals/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+
+    # a client that now negotiates another encoding gets the other representation
+    other = client.get('/api/v1/meals/', headers={'Accept-Encoding': 'br', 'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'].endswith('-br"')
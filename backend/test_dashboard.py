@@ -0,0 +1,82 @@
+# dashboard: one response for the home screen, today's totals from the rollups when they line up :)
+from datetime import datetime, timezone
+
+import pytest
+
+import dashboard_routes
+import repository
+from conftest import TEST_UID
+
+class FrozenDatetime(datetime):
+    # 02:00 utc on the 10th is still the 9th in new york
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2026, 3, 10, 2, 0, tzinfo=timezone.utc).astimezone(tz)
+
+@pytest.fixture
+def meals(mongo, monkeypatch):
+    monkeypatch.setattr(dashboard_routes, 'datetime', FrozenDatetime)
+    meals = [
+        {'firebase_uid': TEST_UID, 'name': 'pasta', 'meal_type': 'dinner', 'calories': 700, 'timestamp': datetime(2026, 3, 9, 23)},
+        {'firebase_uid': TEST_UID, 'name': 'cookie', 'meal_type': 'snack', 'calories': 150, 'timestamp': datetime(2026, 3, 10, 1)},
+        {'firebase_uid': TEST_UID, 'name': 'eggs', 'meal_type': 'breakfast', 'calories': 300, 'timestamp': datetime(2026, 3, 10, 5, 30)},
+    ]
+    mongo.meals.insert_many(meals)
+    repository.daily_totals.add_meals(TEST_UID, meals)
+    return meals
+
+def test_dashboard_combines_everything_in_one_response(client, meals):
+    client.post('/api/v1/routine/', json={'activeDay': 'monday', 'selected': 'run'})
+
+    response = client.get('/api/v1/dashboard/')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert set(body) == {'user', 'calculator_data', 'today', 'routine', 'query_ms'}
+    assert body['user']['email'] == f'{TEST_UID}@example.com'
+    assert [routine['activeDay'] for routine in body['routine']] == ['monday']
+    assert set(body['today']) == {'date', 'meals', 'meal_count', 'total_calories', 'calories_by_type'}
+    assert set(body['query_ms']) == {'calculator_data', 'meals', 'totals', 'routine'}
+    assert all(isinstance(ms, (int, float)) and ms >= 0 for ms in body['query_ms'].values())
+
+def test_utc_today_comes_from_the_rollup(client, meals, monkeypatch):
+    def no_grouping(*args):
+        raise AssertionError('a utc day should be read from daily_totals')
+    monkeypatch.setattr(repository.MealRepository, 'stats_by_type', no_grouping)
+
+    today = client.get('/api/v1/dashboard/').get_json()['today']
+
+    assert today['date'] == '2026-03-10'
+    assert [meal['name'] for meal in today['meals']] == ['eggs', 'cookie']
+    assert (today['meal_count'], today['total_calories']) == (2, 450)
+    assert today['calories_by_type'] == {'breakfast': 300, 'snack': 150}
+
+def test_tz_picks_today_and_groups_its_meals(client, meals, monkeypatch):
+    # mongomock can't run the $group, so stand in for it and check the range it's asked for
+    ranges = []
+    def stats_by_type(self, firebase_uid, timestamp_range=None):
+        ranges.append(timestamp_range)
+        return [{'_id': 'dinner', 'count': 1, 'calories': 700.0}, {'_id': 'snack', 'count': 1, 'calories': 150.0}]
+    monkeypatch.setattr(repository.MealRepository, 'stats_by_type', stats_by_type)
+
+    today = client.get('/api/v1/dashboard/?tz=America/New_York').get_json()['today']
+
+    assert today['date'] == '2026-03-09'
+    assert [meal['name'] for meal in today['meals']] == ['cookie', 'pasta']
+    # new york midnight to midnight (edt by the 9th), in utc
+    assert ranges == [{'$gte': datetime(2026, 3, 9, 4), '$lt': datetime(2026, 3, 10, 4)}]
+    assert (today['meal_count'], today['total_calories']) == (2, 850)
+    assert today['calories_by_type'] == {'dinner': 700, 'snack': 150}
+
+def test_a_failing_query_fails_the_dashboard(client, meals, monkeypatch):
+    def broken(*args):
+        raise RuntimeError('routine shard down')
+    monkeypatch.setattr(repository.routines, 'find_page', broken)
+
+    response = client.get('/api/v1/dashboard/')
+
+    assert response.status_code == 500
+    assert response.get_json() == {'error': 'server error'}
+
+def test_bad_tz_is_a_400(client, meals):
+    assert client.get('/api/v1/dashboard/?tz=Mars/Olympus').status_code == 400
@@ -0,0 +1,48 @@
+# ?from= / ?to= / ?tz= / ?day= parsing :)
+from datetime import datetime
+
+import pytest
+
+from date_ranges import parse_range, parse_weekdays, range_filter
+
+def test_dates_are_local_days_in_tz():
+    # chicago is utc-6 in january and utc-5 in july
+    assert parse_range({'from': '2024-01-10', 'to': '2024-01-10', 'tz': 'America/Chicago'}) == (
+        datetime(2024, 1, 10, 6), datetime(2024, 1, 11, 6))
+    assert parse_range({'from': '2024-07-10', 'tz': 'America/Chicago'}) == (datetime(2024, 7, 10, 5), None)
+    # the day the clocks go forward is 23 hours long
+    start, end = parse_range({'from': '2024-03-10', 'to': '2024-03-10', 'tz': 'America/Chicago'})
+    assert (end - start).total_seconds() == 23 * 3600
+
+def test_datetimes_keep_their_own_offset():
+    assert parse_range({'from': '2024-01-10T08:00:00Z', 'tz': 'Asia/Tokyo'})[0] == datetime(2024, 1, 10, 8)
+    assert parse_range({'to': '2024-01-10T08:00:00+02:00'})[1] == datetime(2024, 1, 10, 6)
+    # without one they are local time in tz
+    assert parse_range({'from': '2024-01-10T08:00:00', 'tz': 'Asia/Tokyo'})[0] == datetime(2024, 1, 9, 23)
+
+def test_dates_default_to_utc():
+    assert parse_range({'from': '2024-01-10', 'to': '2024-01-11'}) == (datetime(2024, 1, 10), datetime(2024, 1, 12))
+    assert parse_range({}) == (None, None)
+    assert range_filter(None, None) is None
+
+@pytest.mark.parametrize('args', [
+    {'from': '2024-01-10', 'tz': 'Mars/Olympus_Mons'},
+    {'from': '10/01/2024'},
+    {'from': '2024-01-10', 'to': '2024-01-09'},
+])
+def test_bad_ranges_raise(args):
+    with pytest.raises(ValueError):
+        parse_range(args)
+
+def test_weekdays_by_name_and_by_dates():
+    assert parse_weekdays({}) is None
+    assert parse_weekdays({'day': 'Monday, friday,'}) == {'monday', 'friday'}
+    # 2024-01-05 is a friday
+    assert parse_weekdays({'from': '2024-01-05', 'to': '2024-01-07'}) == {'friday', 'saturday', 'sunday'}
+    assert len(parse_weekdays({'from': '2024-01-01', 'to': '2024-03-01'})) == 7
+    assert parse_weekdays({'day': 'monday,friday', 'from': '2024-01-05', 'to': '2024-01-07'}) == {'friday'}
+
+@pytest.mark.parametrize('args', [{'day': 'funday'}, {'from': '2024-01-07', 'to': '2024-01-05'}])
+def test_bad_weekdays_raise(args):
+    with pytest.raises(ValueError):
+        parse_weekdays(args)
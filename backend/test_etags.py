@@ -0,0 +1,46 @@
+# ETag / If-None-Match on polled reads and the settle window after writes :)
+from datetime import datetime, timedelta
+
+from conftest import TEST_UID
+
+def _settle(mongo):
+    # as if the last meal write was long enough ago for the secondaries to have it
+    mongo.data_versions.update_one({'_id': TEST_UID}, {'$set': {'meals_at': datetime.utcnow() - timedelta(minutes=1)}})
+
+def test_unchanged_meals_answer_304(client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    _settle(mongo)
+
+    first = client.get('/api/v1/meals/')
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.get('/api/v1/meals/', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert again.get_data() == b''
+
+    # another page is another representation
+    other = client.get('/api/v1/meals/?limit=1', headers={'If-None-Match': first.headers['ETag']})
+    assert other.status_code == 200
+
+def test_no_etag_while_a_write_settles(client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    _settle(mongo)
+    old_etag = client.get('/api/v1/meals/').headers['ETag']
+
+    client.post('/api/v1/meals/', json={'name': 'toast', 'meal_type': 'breakfast', 'calories': 200})
+    # inside ETAG_SETTLE_SECONDS the old tag isn't answered with 304 and no new tag is handed out
+    settling = client.get('/api/v1/meals/', headers={'If-None-Match': old_etag})
+    assert settling.status_code == 200
+    assert 'ETag' not in settling.headers
+
+    _settle(mongo)
+    settled = client.get('/api/v1/meals/', headers={'If-None-Match': old_etag})
+    assert settled.status_code == 200
+    assert settled.headers['ETag'] not in (None, old_etag)
+    assert [meal['name'] for meal in settled.get_json()['meals']] == ['toast', 'soup']
+
+def test_settle_window_is_configurable(client, mongo, app):
+    app.config['ETAG_SETTLE_SECONDS'] = 0
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    assert client.get('/api/v1/meals/').headers.get('ETag')
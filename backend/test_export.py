@@ -0,0 +1,21 @@
+# ndjson export of a user's history :)
+import json
+
+from conftest import TEST_UID
+
+def test_export_streams_every_record_type(client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    client.post('/api/v1/routine/', json={'activeDay': 'monday', 'selected': 'run'})
+    mongo.meals.update_one({'name': 'soup'}, {'$set': {'internal_flag': True}})
+
+    response = client.get('/api/v1/export/')
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['type'] for record in records] == ['profile', 'meal', 'routine']
+
+    meal, routine = records[1], records[2]
+    assert (meal['name'], meal['calories'], meal['firebase_uid']) == ('soup', 300, TEST_UID)
+    assert (routine['activeDay'], routine['firebase_uid']) == ('monday', TEST_UID)
+    assert meal['id'] and routine['id'] and meal['user_id'] == routine['user_id']
+    # only the fields the api exposes
+    assert 'internal_flag' not in meal and '_id' not in meal
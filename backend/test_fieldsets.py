@@ -0,0 +1,20 @@
+# ?fields= sparse fieldsets :)
+import pytest
+
+from fieldsets import parse_fields
+from repository import MEAL_SPARSE_FIELDS
+
+def test_fields_must_be_on_the_allow_list():
+    assert parse_fields({}, MEAL_SPARSE_FIELDS) is None
+    assert parse_fields({'fields': 'name, calories,name,'}, MEAL_SPARSE_FIELDS) == ['name', 'calories']
+    with pytest.raises(ValueError):
+        parse_fields({'fields': 'name,password_hash'}, MEAL_SPARSE_FIELDS)
+
+def test_unknown_fields_are_a_bad_request(client):
+    response = client.get('/api/v1/meals/?fields=name,_id')
+    assert response.status_code == 400
+    assert "unknown field '_id'" in response.get_json()['error']
+
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    [meal] = client.get('/api/v1/meals/?fields=calories').get_json()['meals']
+    assert set(meal) == {'id', 'calories'}
@@ -0,0 +1,124 @@
+# signing cert warmup and its refresh schedule :)
+import firebase_admin
+import pytest
+from firebase_admin import auth, credentials
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport import Request
+
+import cache_utils
+import firebase_config
+from cache_utils import LRUCache
+
+class FakeResponse:
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = headers
+
+class RecordingRequest(Request):
+    """google-auth transport that answers every fetch with the same response"""
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        self.calls.append((url, headers))
+        return self.response
+
+class FakeCredential(credentials.Base):
+    def get_credential(self):
+        return AnonymousCredentials()
+
+@pytest.fixture
+def cert_request(monkeypatch):
+    request = RecordingRequest(FakeResponse(200, {'Cache-Control': 'public, max-age=21600, must-revalidate'}))
+    monkeypatch.setattr(firebase_config, '_cert_request', lambda: request)
+    monkeypatch.setattr(firebase_config, 'certs_fetched_at', None)
+    monkeypatch.setattr(firebase_config, 'certs_max_age', None)
+    return request
+
+def test_refresh_follows_googles_max_age(cert_request, monkeypatch):
+    assert firebase_config.next_refresh_delay(3600) == 3600
+
+    clock = iter([1000.0, 1000.0, 23000.0])
+    monkeypatch.setattr(firebase_config.time, 'monotonic', lambda: next(clock))
+    assert firebase_config.prefetch_signing_certs(force=True) == 21600
+    assert cert_request.calls == [(firebase_config.ID_TOKEN_CERTS_URL, {'Cache-Control': 'no-cache'})]
+
+    # renewed CERT_REFRESH_MARGIN before the max-age runs out, not on a fixed interval
+    assert firebase_config.next_refresh_delay(3600) == 21600 - firebase_config.CERT_REFRESH_MARGIN
+    # and retried soon once it has
+    assert firebase_config.next_refresh_delay(3600) == firebase_config.CERT_MIN_REFRESH_DELAY
+
+def test_failed_cert_fetch_raises(cert_request):
+    cert_request.response = FakeResponse(503, {})
+    with pytest.raises(RuntimeError):
+        firebase_config.prefetch_signing_certs()
+    assert firebase_config.certs_max_age is None
+
+def test_warmup_uses_the_sdks_cached_transport(monkeypatch):
+    app = firebase_admin.initialize_app(FakeCredential(), options={'projectId': 'macromatch-test'}, name='[DEFAULT]')
+    try:
+        request = firebase_config._cert_request()
+        # the same transport verify_id_token fetches through, so the warmup is what it reads
+        assert request is firebase_admin.auth._get_client(app)._token_verifier.request
+
+        monkeypatch.delattr(firebase_admin.auth, '_get_client')
+        assert firebase_config._cert_request() is not request
+    finally:
+        firebase_admin.delete_app(app)
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class CountingVerifier:
+    """token verifier that accepts every token, expiring an hour after the clock says it was issued"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.calls = []
+
+    def verify(self, id_token):
+        self.calls.append(id_token)
+        if id_token == 'bad':
+            raise auth.InvalidIdTokenError('bad token')
+        claims = {'uid': id_token}
+        if id_token != 'no-exp':
+            claims['exp'] = self.clock.now + 3600
+        return claims
+
+@pytest.fixture
+def verifier(monkeypatch):
+    clock = FakeClock(1_700_000_000)
+    verifier = CountingVerifier(clock)
+    monkeypatch.setattr(cache_utils.time, 'time', clock)
+    monkeypatch.setattr(firebase_config, 'token_cache', LRUCache(max_size=16))
+    monkeypatch.setattr(firebase_config, 'get_token_verifier', lambda: verifier)
+    return verifier
+
+def test_verified_tokens_are_cached_until_exp(verifier):
+    clock = verifier.clock
+    claims = firebase_config.verify_id_token('alice')
+
+    clock.now += 3599
+    assert firebase_config.verify_id_token('alice') == claims
+    assert verifier.calls == ['alice']
+
+    # at exp the cached claims are gone and the token is verified again (and rejected, for a real expired one)
+    clock.now += 1
+    assert firebase_config.lookup_cached_token('alice') is None
+    firebase_config.verify_id_token('alice')
+    assert verifier.calls == ['alice', 'alice']
+
+def test_cached_claims_are_copies(verifier):
+    firebase_config.verify_id_token('alice')['uid'] = 'mallory'
+    assert firebase_config.verify_id_token('alice')['uid'] == 'alice'
+
+def test_failures_and_tokens_without_exp_are_not_cached(verifier):
+    for _ in range(2):
+        with pytest.raises(auth.InvalidIdTokenError):
+            firebase_config.verify_id_token('bad')
+        firebase_config.verify_id_token('no-exp')
+    assert verifier.calls == ['bad', 'no-exp'] * 2
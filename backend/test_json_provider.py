@@ -0,0 +1,59 @@
+# json provider: bson types encode the same on orjson and on the stdlib fallback :)
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from bson import Decimal128, ObjectId
+from flask import jsonify
+
+import json_provider
+
+MEAL_ID = ObjectId('65f0c0ffee0000000000beef')
+DOCUMENT = {
+    '_id': MEAL_ID,
+    'timestamp': datetime(2026, 3, 9, 12, 30, 15, 250000),
+    'date': date(2026, 3, 9),
+    'price': Decimal128('12.10'),
+    'meals': [{'_id': MEAL_ID, 'calories': 300}],
+}
+EXPECTED = {
+    '_id': '65f0c0ffee0000000000beef',
+    'timestamp': '2026-03-09T12:30:15.250000',
+    'date': '2026-03-09',
+    'price': '12.10',
+    'meals': [{'_id': '65f0c0ffee0000000000beef', 'calories': 300}],
+}
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def encoder(request, app, monkeypatch):
+    if request.param == 'stdlib':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    assert isinstance(app.json, json_provider.MongoJSONProvider)
+    return app
+
+def test_bson_values_encode(encoder):
+    assert json.loads(encoder.json.dumps(DOCUMENT)) == EXPECTED
+
+def test_decimal128_keeps_its_precision(encoder):
+    value = Decimal128(Decimal('0.1000000000000000000000000000000001'))
+    assert json.loads(encoder.json.dumps({'value': value})) == {'value': '0.1000000000000000000000000000000001'}
+
+def test_jsonify_returns_mongo_documents_as_is(encoder):
+    with encoder.test_request_context():
+        response = jsonify(DOCUMENT)
+
+    assert response.mimetype == 'application/json'
+    assert response.get_data().endswith(b'\n')
+    assert json.loads(response.get_data()) == EXPECTED
+
+def test_loads_round_trips(encoder):
+    assert encoder.json.loads(encoder.json.dumps(DOCUMENT)) == EXPECTED
+
+def test_unknown_types_still_fail(encoder):
+    with pytest.raises(TypeError):
+        encoder.json.dumps({'value': object()})
+
+def test_keyword_arguments_use_the_stdlib_encoder(app):
+    # orjson has no indent=, so the call goes through json.dumps with the bson default
+    assert app.json.dumps({'_id': MEAL_ID}, indent=2) == '{\n  "_id": "65f0c0ffee0000000000beef"\n}'
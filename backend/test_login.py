@@ -0,0 +1,103 @@
+# first logins: one atomic upsert per login, one user however many race :)
+import threading
+from datetime import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import repository
+
+class FakeClock(datetime):
+    """datetime whose utcnow the test moves by hand"""
+    now_value = datetime(2026, 3, 9, 12)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now_value
+
+@pytest.fixture
+def users(mongo, monkeypatch):
+    # the unique index indexes.py creates, the upsert leans on it
+    mongo.users.create_index('firebase_uid', unique=True)
+    monkeypatch.setattr(repository, 'datetime', FakeClock)
+    # put the clock back after tests that move it
+    monkeypatch.setattr(FakeClock, 'now_value', FakeClock.now_value)
+    return mongo.users
+
+def test_later_logins_keep_the_first_ones_document(users):
+    first = repository.users.get_or_create('new-user', 'new@example.com', 'new')
+
+    FakeClock.now_value = datetime(2026, 3, 10, 8)
+    again = repository.users.get_or_create('new-user', 'renamed@example.com', 'renamed')
+
+    assert again['_id'] == first['_id']
+    [user] = users.find()
+    assert (user['email'], user['name']) == ('new@example.com', 'new')
+    assert user['created_at'] == user['updated_at'] == datetime(2026, 3, 9, 12)
+
+def test_concurrent_first_logins_make_one_user(users, monkeypatch):
+    logins = 8
+    barrier = threading.Barrier(logins)
+    get_users_collection = repository.get_users_collection
+
+    class RacingCollection:
+        # every login reaches the upsert before any of them runs it
+        def __init__(self, collection):
+            self._collection = collection
+
+        def __getattr__(self, name):
+            return getattr(self._collection, name)
+
+        def find_one_and_update(self, *args, **kwargs):
+            barrier.wait(timeout=5)
+            return self._collection.find_one_and_update(*args, **kwargs)
+
+    monkeypatch.setattr(repository, 'get_users_collection',
+                        lambda operation=None: RacingCollection(get_users_collection(operation)))
+
+    results = [None] * logins
+    def login(index):
+        results[index] = repository.users.get_or_create('racer', 'racer@example.com', f'racer {index}')
+    threads = [threading.Thread(target=login, args=(index,)) for index in range(logins)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    [user] = users.find()
+    assert all(result is not None and result['_id'] == user['_id'] for result in results)
+    assert {result['name'] for result in results} == {user['name']}
+
+def test_losing_the_insert_race_returns_the_winners_document(users, monkeypatch):
+    # the upsert found no user, then lost the insert to a login that got there first
+    winner = users.insert_one({'firebase_uid': 'racer', 'email': 'racer@example.com', 'name': 'winner'}).inserted_id
+    get_users_collection = repository.get_users_collection
+
+    class LosingCollection:
+        def __init__(self, collection):
+            self._collection = collection
+
+        def __getattr__(self, name):
+            return getattr(self._collection, name)
+
+        def find_one_and_update(self, *args, **kwargs):
+            raise DuplicateKeyError('E11000 duplicate key error collection: users index: firebase_uid_unique')
+
+    monkeypatch.setattr(repository, 'get_users_collection',
+                        lambda operation=None: LosingCollection(get_users_collection(operation)))
+
+    user = repository.users.get_or_create('racer', 'racer@example.com', 'loser')
+
+    assert (user['_id'], user['name']) == (winner, 'winner')
+    assert users.count_documents({}) == 1
+
+def test_login_route_creates_the_user_once(app, mongo, monkeypatch):
+    mongo.users.create_index('firebase_uid', unique=True)
+    client = app.test_client()
+
+    for _ in range(2):
+        response = client.post('/api/auth/login', json={'idToken': 'first-timer'})
+        assert response.status_code == 200
+        assert response.get_json()['user']['email'] == 'first-timer@example.com'
+
+    assert mongo.users.count_documents({'firebase_uid': 'first-timer'}) == 1
@@ -0,0 +1,182 @@
+# meal queries in both storage layouts :)
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+import meal_storage
+import repository
+from conftest import TEST_UID
+from pagination import decode_cursor, encode_cursor
+
+class RecordingBuckets:
+    """meal_buckets stand-in that keeps the last pipeline it was given"""
+    def aggregate(self, pipeline, **kwargs):
+        self.pipeline = pipeline
+        return iter([])
+
+def test_bucket_export_walks_days_newest_first(monkeypatch):
+    buckets = RecordingBuckets()
+    monkeypatch.setattr(repository, 'get_meal_buckets_collection', lambda operation=None: buckets)
+
+    repository.BucketedMealRepository(50).iter_all('u1', 100)
+
+    stages = [next(iter(stage)) for stage in buckets.pipeline]
+    assert stages.index('$sort') < stages.index('$unwind')
+    assert buckets.pipeline[stages.index('$sort')] == {'$sort': {'date': -1}}
+
+def test_undated_meals_page_last_instead_of_failing(client, mongo):
+    mongo.meals.insert_many([{'firebase_uid': TEST_UID, 'name': f'old {n}', 'meal_type': 'lunch', 'calories': 100}
+                             for n in range(3)])
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+
+    names, cursor = [], None
+    while True:
+        page = client.get('/api/v1/meals/?limit=2&fields=name' + (f'&cursor={cursor}' if cursor else ''))
+        assert page.status_code == 200
+        body = page.get_json()
+        names += [meal['name'] for meal in body['meals']]
+        cursor = body.get('next_cursor')
+        if not cursor:
+            break
+
+    assert names == ['soup', 'old 2', 'old 1', 'old 0']
+
+def test_undated_meals_stay_out_of_daily_totals(client, mongo):
+    meal_id = mongo.meals.insert_one({'firebase_uid': TEST_UID, 'name': 'old', 'meal_type': 'lunch', 'calories': 100}).inserted_id
+
+    assert client.delete(f'/api/v1/meals/{meal_id}').status_code == 200
+    assert mongo.daily_totals.count_documents({}) == 0
+
+def test_cursor_round_trip():
+    timestamp, doc_id = datetime(2024, 3, 1, 12, 30, 5, 250), ObjectId()
+    assert decode_cursor(encode_cursor(timestamp, doc_id)) == (timestamp, doc_id)
+    assert decode_cursor(encode_cursor(doc_id=doc_id)) == (None, doc_id)
+    # opaque, url safe and unpadded
+    assert '=' not in encode_cursor(timestamp, doc_id) and '/' not in encode_cursor(timestamp, doc_id)
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', encode_cursor(doc_id='nope'), 'eyJ0cyI6IjIwMjQifQ'])
+def test_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def _pages(meals, limit, timestamp_range=None, fields=None):
+    # walk every page, returning the pages as lists of ids
+    pages, cursor = [], None
+    while True:
+        page, cursor = meals.find_page('u1', limit, cursor, timestamp_range, fields)
+        pages.append(page)
+        if not cursor:
+            return pages
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 100])
+@pytest.mark.parametrize('timestamp_range', [
+    None,
+    {'$gte': datetime(2024, 1, 2, 12)},
+    {'$gte': datetime(2024, 1, 2), '$lt': datetime(2024, 1, 4, 9)},
+])
+def test_bucket_pages_match_document_pages(mongo, limit, timestamp_range):
+    documents = repository.MealRepository()
+    buckets = repository.BucketedMealRepository(bucket_size=2)
+    start = datetime(2024, 1, 1, 7)
+    # five days of three meals, two of them logged at the same second
+    meals = [{'firebase_uid': 'u1', 'user_id': 'x', 'name': f'meal {n}', 'meal_type': 'lunch', 'calories': n,
+              'notes': '', 'timestamp': start + timedelta(days=n // 3, hours=5 * (n % 3 and 1))}
+             for n in range(15)]
+    meals.append({'firebase_uid': 'u2', 'user_id': 'y', 'name': 'someone else', 'timestamp': start})
+    for meal in meals:
+        meal['_id'] = ObjectId()
+        documents.insert(dict(meal))
+        buckets.insert(dict(meal))
+    # three meals a day in buckets of two, so every day spills into a second bucket
+    assert mongo.meal_buckets.count_documents({'firebase_uid': 'u1'}) == 10
+
+    expected = _pages(documents, limit, timestamp_range)
+    assert _pages(buckets, limit, timestamp_range) == expected
+    assert _pages(buckets, limit, timestamp_range, ['name']) == _pages(documents, limit, timestamp_range, ['name'])
+    assert sum(map(len, expected)) == len([meal for meal in meals[:15] if _in_range(meal, timestamp_range)])
+
+def _in_range(meal, timestamp_range):
+    timestamp_range = timestamp_range or {}
+    return timestamp_range.get('$gte', datetime.min) <= meal['timestamp'] < timestamp_range.get('$lt', datetime.max)
+
+def test_storage_layout_follows_the_app_config(app, client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    app.config['MEAL_STORAGE_MODE'] = 'bucket'
+    client.post('/api/v1/meals/', json={'name': 'toast', 'meal_type': 'breakfast', 'calories': 200})
+
+    assert [meal['name'] for meal in mongo.meals.find()] == ['soup']
+    [bucket] = mongo.meal_buckets.find()
+    assert [meal['name'] for meal in bucket['meals']] == ['toast']
+    assert [meal['name'] for meal in client.get('/api/v1/meals/').get_json()['meals']] == ['toast']
+
+def test_bucket_migration_stops_on_undated_meals(mongo):
+    mongo.meals.insert_many([
+        {'firebase_uid': 'u1', 'name': 'soup', 'timestamp': datetime(2024, 1, 1, 12)},
+        {'firebase_uid': 'u1', 'name': 'old'},
+    ])
+
+    with pytest.raises(SystemExit, match='1 meals have no timestamp'):
+        meal_storage.migrate_to_buckets({}, 100, 50)
+    assert mongo.meal_buckets.count_documents({}) == 0
+
+    mongo.meals.delete_one({'name': 'old'})
+    meal_storage.migrate_to_buckets({}, 100, 50)
+    [bucket] = mongo.meal_buckets.find()
+    assert (bucket['date'], [meal['name'] for meal in bucket['meals']]) == ('2024-01-01', ['soup'])
+
+def test_batch_reports_each_item(client, mongo):
+    response = client.post('/api/v1/meals/batch', json={'meals': [
+        {'name': 'toast', 'meal_type': 'breakfast', 'calories': 250},
+        {'meal_type': 'lunch'},
+        {'name': 42, 'meal_type': 'lunch'},
+        {'name': 'soup', 'meal_type': ['lunch']},
+        {'name': 'cake', 'meal_type': 'dessert'},
+        'not a meal',
+    ]})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (1, 5)
+    assert [result['status'] for result in body['results']] == ['created'] + ['invalid'] * 5
+    assert [result['index'] for result in body['results']] == list(range(6))
+    assert body['results'][2]['details'] == ['name and meal_type should be strings']
+    assert body['results'][0]['meal']['id'] == str(mongo.meals.find_one({'name': 'toast'})['_id'])
+    assert mongo.meals.count_documents({}) == 1
+
+def test_batch_with_nothing_valid_is_a_400(client, mongo):
+    response = client.post('/api/v1/meals/batch', json=[{'name': 7, 'meal_type': 'lunch'}])
+
+    assert response.status_code == 400
+    assert response.get_json()['created'] == 0
+    assert mongo.data_versions.count_documents({}) == 0
+
+def test_batch_keeps_the_writes_that_went_through(client, mongo):
+    # a unique index the second item trips over, the unordered insert still writes the rest
+    mongo.meals.create_index('name', unique=True)
+    mongo.meals.insert_one({'firebase_uid': TEST_UID, 'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+
+    response = client.post('/api/v1/meals/batch', json=[
+        {'name': 'toast', 'meal_type': 'breakfast', 'calories': 250},
+        {'name': 'soup', 'meal_type': 'lunch', 'calories': 300},
+        {'name': 'apple', 'meal_type': 'snack', 'calories': 80},
+    ])
+
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == ['created', 'failed', 'created']
+    assert 'id' not in results[1] and results[1]['details']
+    assert mongo.meals.count_documents({}) == 3
+    # only the meals that were written are rolled up
+    [totals] = mongo.daily_totals.find({'firebase_uid': TEST_UID})
+    assert (totals['meal_count'], totals['calories']) == (2, 330)
+
+def test_batch_size_is_capped_by_config(app, client, mongo):
+    app.config['MEAL_BATCH_MAX_SIZE'] = 2
+
+    response = client.post('/api/v1/meals/batch', json=[{'name': f'meal {n}', 'meal_type': 'snack'} for n in range(3)])
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'batch too large, max 2 meals'
+    assert mongo.meals.count_documents({}) == 0
+    assert client.post('/api/v1/meals/batch', json=[{'name': 'one', 'meal_type': 'snack'}] * 2).status_code == 201
@@ -0,0 +1,141 @@
+# response cache keys, backends and invalidation :)
+from argparse import Namespace
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+import redis
+
+import repository
+import response_cache
+import rollups
+from config import Config
+from conftest import TEST_UID
+
+ROLLUP = {'firebase_uid': TEST_UID, 'date': '2024-01-02', 'meal_count': 1, 'calories': 500.0,
+          'by_type': {'lunch': {'count': 1, 'calories': 500.0}}}
+
+def _settle(mongo):
+    # as if the last meal write was long enough ago for the secondaries to have it
+    mongo.data_versions.update_one({'_id': TEST_UID}, {'$set': {'meals_at': datetime.utcnow() - timedelta(minutes=1)}})
+
+def test_stats_and_daily_totals_are_cached_apart(client, mongo):
+    mongo.daily_totals.insert_one(dict(ROLLUP))
+
+    stats = client.get('/api/v1/users/stats?from=2024-01-01')
+    totals = client.get('/api/v1/users/daily-totals?from=2024-01-01')
+    # same query string, second request must not be served the first one's body
+    cached_totals = client.get('/api/v1/users/daily-totals?from=2024-01-01')
+
+    assert stats.get_json()['stats']['total_calories'] == 500.0
+    assert totals.get_json()['count'] == 1
+    assert cached_totals.get_json() == totals.get_json()
+    assert response_cache.response_cache.stats()['hits'] == 1
+
+def test_meal_write_drops_every_meal_derived_route(client, mongo):
+    mongo.daily_totals.insert_one(dict(ROLLUP))
+    for path in ('/api/v1/meals/', '/api/v1/users/stats', '/api/v1/users/daily-totals'):
+        assert client.get(path).status_code == 200
+
+    # nothing was written yet, so everything is cached under version 0
+    backend = response_cache.response_cache.backend
+    assert all(backend.get(f'{route}:{TEST_UID}', '0|') for route in response_cache.MEAL_ROUTES)
+
+    created = client.post('/api/v1/meals/', json={'name': 'soup', 'meal_type': 'lunch', 'calories': 300})
+    assert created.status_code == 201
+    assert not any(backend.get(f'{route}:{TEST_UID}', '0|') for route in response_cache.MEAL_ROUTES)
+
+def test_write_through_another_worker_retires_cached_pages(client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'toast', 'meal_type': 'breakfast', 'calories': 200})
+    _settle(mongo)
+    first = client.get('/api/v1/meals/')
+    assert response_cache.response_cache.stats()['stores'] == 1
+
+    # another worker takes a write: the meal and the version bump land, this worker's cache isn't told
+    mongo.meals.insert_one({'firebase_uid': TEST_UID, 'name': 'soup', 'meal_type': 'lunch', 'calories': 300,
+                            'timestamp': datetime.utcnow()})
+    mongo.data_versions.update_one({'_id': TEST_UID}, {'$inc': {'meals': 1}})
+    _settle(mongo)
+
+    fresh = client.get('/api/v1/meals/', headers={'If-None-Match': first.headers['ETag']})
+    assert fresh.status_code == 200
+    assert [meal['name'] for meal in fresh.get_json()['meals']] == ['soup', 'toast']
+    # the new tag is on the new body, so polling with it is safe
+    assert client.get('/api/v1/meals/', headers={'If-None-Match': fresh.headers['ETag']}).status_code == 304
+
+@pytest.fixture
+def redis_server():
+    """an in-process redis (fakeredis speaks the real protocol to redis-py)"""
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def redis_client(redis_server):
+    return fakeredis.FakeRedis(server=redis_server)
+
+@pytest.fixture
+def fake_redis(monkeypatch, redis_server, redis_client):
+    """RESPONSE_CACHE_BACKEND=redis connects to the fakeredis server whatever the url"""
+    monkeypatch.setattr(redis.Redis, 'from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=redis_server, **kwargs))
+    return redis_client
+
+def test_redis_backend_round_trip(redis_client):
+    backend = response_cache.RedisCacheBackend(redis_client, ttl=30, max_variants=2)
+    backend.set('meals:u1', 'limit=5', (123.5, 'application/json', b'{"a":1}'))
+
+    assert backend.get('meals:u1', 'limit=5') == (123.5, 'application/json', b'{"a":1}')
+    assert backend.get('meals:u1', 'limit=6') is None
+    assert redis_client.ttl('macromatch:responses:meals:u1') == 30
+
+    # going over max_variants starts the tag over
+    backend.set('meals:u1', 'limit=6', (123.5, 'application/json', b'{}'))
+    backend.set('meals:u1', 'limit=7', (123.5, 'application/json', b'{}'))
+    assert backend.get('meals:u1', 'limit=5') is None
+
+    backend.set('routine:u1', '', (123.5, 'application/json', b'[]'))
+    backend.delete(['routine:u1'])
+    assert backend.get('routine:u1', '') is None
+
+def test_redis_errors_count_as_misses(redis_server, redis_client):
+    redis_server.connected = False
+
+    cache = response_cache.ResponseCache(response_cache.RedisCacheBackend(redis_client, 30, 8), 30, 1024)
+    assert cache.get('meals:u1', '') is None
+    cache.set('meals:u1', '', 'application/json', b'{}')
+    assert cache.stats()['errors'] == 2
+    assert (cache.stats()['misses'], cache.stats()['stores']) == (1, 0)
+
+def test_redis_backend_serves_and_invalidates(app, client, fake_redis):
+    app.config['RESPONSE_CACHE_BACKEND'] = 'redis'
+
+    first = client.get('/api/v1/meals/?limit=5')
+    second = client.get('/api/v1/meals/?limit=5')
+    assert second.get_json() == first.get_json()
+    assert response_cache.response_cache.stats()['hits'] == 1
+    assert fake_redis.exists(f'macromatch:responses:meals:{TEST_UID}')
+
+    client.post('/api/v1/meals/', json={'name': 'toast', 'meal_type': 'breakfast', 'calories': 200})
+    assert not fake_redis.exists(f'macromatch:responses:meals:{TEST_UID}')
+
+def test_nothing_is_stored_right_after_a_write(client, mongo):
+    client.post('/api/v1/meals/', json={'name': 'toast', 'meal_type': 'breakfast', 'calories': 200})
+
+    # the read may have come from a secondary that hasn't seen the write yet
+    assert client.get('/api/v1/meals/').status_code == 200
+    assert response_cache.response_cache.stats()['stores'] == 0
+
+    _settle(mongo)
+    assert client.get('/api/v1/meals/').status_code == 200
+    assert response_cache.response_cache.stats()['stores'] == 1
+
+def test_rollup_rebuild_bumps_versions_and_drops_cached_stats(mongo, monkeypatch, fake_redis):
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_BACKEND', 'redis')
+    monkeypatch.setattr(response_cache, 'response_cache', None)
+    monkeypatch.setattr(repository.daily_totals, 'rebuild', lambda firebase_uid=None: 2)
+    monkeypatch.setattr(repository.daily_totals, 'user_ids', lambda: ['u1', 'u2'])
+    fake_redis.hset('macromatch:responses:stats:u1', 'from=2024-01-01', b'0|application/json|{}')
+    fake_redis.hset('macromatch:responses:daily_totals:u2', '', b'0|application/json|{}')
+
+    rollups.rebuild(Namespace(uid=None))
+
+    assert {versions['_id']: versions['meals'] for versions in mongo.data_versions.find()} == {'u1': 1, 'u2': 1}
+    assert fake_redis.keys() == []
@@ -0,0 +1,67 @@
+# daily_totals upkeep and rebuilds :)
+from datetime import datetime
+
+import mongodb_config
+import repository
+
+MEALS = [
+    {'_id': 1, 'meal_type': 'lunch', 'calories': 400, 'timestamp': datetime(2024, 1, 2, 12)},
+    {'_id': 2, 'meal_type': 'dinner', 'calories': '250', 'timestamp': datetime(2024, 1, 2, 19)},
+    {'_id': 3, 'meal_type': 'lunch', 'calories': 'lots', 'timestamp': datetime(2024, 1, 3, 12)},
+]
+
+def test_meal_writes_inc_their_days(mongo):
+    repository.daily_totals.add_meals('u1', MEALS)
+    repository.daily_totals.remove_meals('u1', MEALS[:1])
+
+    days = {day['date']: day for day in mongo.daily_totals.find({'firebase_uid': 'u1'})}
+    assert days['2024-01-02']['meal_count'] == 1
+    assert days['2024-01-02']['calories'] == 250
+    assert days['2024-01-02']['by_type']['lunch'] == {'count': 0, 'calories': 0}
+    # non-numeric calories count as 0
+    assert days['2024-01-03']['calories'] == 0
+    assert all(isinstance(day['updated_at'], datetime) for day in days.values())
+
+class RecordingTotals:
+    """daily_totals stand-in that records what rebuild asks of it"""
+    def __init__(self, calls, server_time):
+        self.calls = calls
+        self.database = self
+        self.server_time = server_time
+
+    def command(self, name):
+        self.calls.append(('command', name))
+        return {'localTime': self.server_time}
+
+    def delete_many(self, query):
+        self.calls.append(('delete_many', query))
+
+    def count_documents(self, query):
+        self.calls.append(('count_documents', query))
+        return 3
+
+def test_rebuild_merges_first_and_only_deletes_untouched_rows(monkeypatch):
+    calls = []
+    server_time = datetime(2024, 2, 1, 3)
+    operations = []
+
+    def get_daily_totals_collection(operation=None):
+        operations.append(operation)
+        return RecordingTotals(calls, server_time)
+
+    monkeypatch.setattr(repository, 'get_daily_totals_collection', get_daily_totals_collection)
+    monkeypatch.setattr(repository.MealRepository, 'aggregate',
+                        lambda self, match, stages, operation, **kwargs: calls.append(('aggregate', operation, stages[-1])))
+
+    assert repository.daily_totals.rebuild('u1') == 3
+
+    assert [call[0] for call in calls] == ['command', 'aggregate', 'delete_many', 'count_documents']
+    _, operation, merge = calls[1]
+    assert operation == 'rebuild_daily_totals'
+    assert merge['$merge']['whenNotMatched'] == 'insert'
+    assert calls[2][1] == {'firebase_uid': 'u1', 'updated_at': {'$not': {'$gte': server_time}}}
+    assert set(operations) == {'rebuild_daily_totals'}
+
+    policy = mongodb_config.OPERATION_POLICIES['rebuild_daily_totals']
+    assert policy['read_preference'] == 'primary'
+    assert policy['write_concern'] == {'w': 'majority'}
@@ -0,0 +1,82 @@
+# routine queries: weekly saves and paging :)
+import pytest
+
+import mongodb_config
+import repository
+from conftest import TEST_UID
+
+def _routine(mongo, day, selected='run'):
+    routine = {'firebase_uid': 'u1', 'user_id': 'x', 'activeDay': day, 'selected': selected, 'notes': ''}
+    routine['_id'] = mongo.routine.insert_one(routine).inserted_id
+    return routine
+
+def test_save_week_diffs_against_the_primary(mongo, monkeypatch):
+    monday = _routine(mongo, 'monday')
+    tuesday = _routine(mongo, 'tuesday')
+
+    operations = []
+    get_routine_collection = repository.get_routine_collection
+    monkeypatch.setattr(repository, 'get_routine_collection',
+                        lambda operation=None: operations.append(operation) or get_routine_collection(operation))
+
+    result = repository.routines.save_week('u1', 'x', [
+        {'id': str(monday['_id']), 'notes': 'easy pace'},
+        {'activeDay': 'friday', 'selected': 'swim'},
+    ])
+
+    assert (result['inserted'], result['updated'], result['deleted']) == (1, 1, 1)
+    assert result['deleted_ids'] == [tuesday['_id']]
+    assert sorted(routine['activeDay'] for routine in mongo.routine.find()) == ['friday', 'monday']
+    assert mongo.routine.find_one({'_id': monday['_id']})['notes'] == 'easy pace'
+
+    assert set(operations) == {'save_routine_week'}
+    assert mongodb_config.OPERATION_POLICIES['save_routine_week']['read_preference'] == 'primary'
+
+def test_save_week_rejects_other_users_ids(mongo):
+    other = _routine(mongo, 'monday')
+    mongo.routine.update_one({'_id': other['_id']}, {'$set': {'firebase_uid': 'u2'}})
+
+    with pytest.raises(ValueError):
+        repository.routines.save_week('u1', 'x', [{'id': str(other['_id'])}])
+    assert mongo.routine.count_documents({}) == 1
+
+def test_save_week_only_reads_the_fields_it_compares(mongo, monkeypatch):
+    monday = _routine(mongo, 'monday')
+    _routine(mongo, 'tuesday')
+
+    projections = []
+    find_for_user = repository.routines.find_for_user
+    def recording_find(firebase_uid, fields, operation='get_routine'):
+        projections.append(fields)
+        return find_for_user(firebase_uid, fields, operation)
+    monkeypatch.setattr(repository.routines, 'find_for_user', recording_find)
+
+    repository.routines.save_week('u1', 'x', [
+        {'id': str(monday['_id']), 'activeDay': 'monday', 'notes': 'easy pace'},
+        {'activeDay': 'friday', 'selected': 'swim', 'exercise': ['burpees']},
+    ])
+
+    # the new day's fields aren't compared against anything
+    assert projections == [['activeDay', 'notes']]
+    assert mongo.routine.find_one({'_id': monday['_id']})['notes'] == 'easy pace'
+
+def test_updating_someone_elses_routine_is_a_404(client, mongo):
+    other = _routine(mongo, 'monday')
+
+    response = client.put(f"/api/v1/routine/{other['_id']}", json={'notes': 'mine now'})
+
+    assert response.status_code == 404
+    assert mongo.routine.find_one({'_id': other['_id']})['notes'] == ''
+    # no write happened, so cached routine pages stay valid
+    assert mongo.data_versions.count_documents({}) == 0
+
+def test_updating_a_routine_bumps_its_version(client, mongo):
+    created = client.post('/api/v1/routine/', json={'activeDay': 'monday', 'selected': 'run'})
+    routine_id = created.get_json()['routine']['id']
+
+    response = client.put(f'/api/v1/routine/{routine_id}', json={'notes': 'easy pace'})
+
+    assert response.status_code == 200
+    assert response.get_json()['updates'] == ['notes']
+    # one bump for the create, one for the update
+    assert mongo.data_versions.find_one({'_id': TEST_UID})['routine'] == 2
@@ -0,0 +1,152 @@
+# meal stats: the $group pipeline against the python loop it replaced, in both storage layouts :)
+from datetime import datetime
+
+import mongomock
+import pytest
+
+import repository
+from conftest import TEST_UID, MockCollection
+
+MEALS = [
+    ('toast', 'breakfast', 250, datetime(2026, 3, 9, 7)),
+    ('soup', 'lunch', 300, datetime(2026, 3, 9, 12, 30)),
+    ('cookie', 'snack', 150, datetime(2026, 3, 9, 16)),
+    ('pasta', 'dinner', 700.5, datetime(2026, 3, 9, 19)),
+    ('mystery', None, 90, datetime(2026, 3, 10, 9)),
+    ('salad', 'lunch', None, datetime(2026, 3, 10, 13)),
+    ('pizza', 'dinner', 900, datetime(2026, 3, 11, 20)),
+]
+
+def _convert(value, spec):
+    # $convert to double with onError/onNull, the only form stats_by_type uses
+    assert spec['to'] == 'double'
+    if value is None:
+        return spec['onNull']
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return spec['onError']
+
+def _value(doc, expression):
+    if isinstance(expression, str) and expression.startswith('$'):
+        return doc.get(expression[1:])
+    if isinstance(expression, dict) and '$convert' in expression:
+        return _convert(_value(doc, expression['$convert']['input']), expression['$convert'])
+    if isinstance(expression, dict) and '$mergeObjects' in expression:
+        merged = {}
+        for part in expression['$mergeObjects']:
+            merged.update(_value(doc, part) if isinstance(part, str) else {key: _value(doc, value) for key, value in part.items()})
+        return merged
+    return expression
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = _value(doc, spec['_id'])
+        group = groups.setdefault(key, {'_id': key})
+        for field, accumulator in spec.items():
+            if field == '_id':
+                continue
+            [(operator, expression)] = accumulator.items()
+            value = _value(doc, expression)
+            if operator == '$sum':
+                group[field] = group.get(field, 0) + value
+            elif field not in group:
+                group[field] = value
+            else:
+                group[field] = (min if operator == '$min' else max)(group[field], value)
+    return list(groups.values())
+
+def run_pipeline(collection, pipeline):
+    """the handful of stages mongomock can't run here ($convert, $mergeObjects), done in python"""
+    docs = list(collection.find())
+    for stage in pipeline:
+        [(name, spec)] = stage.items()
+        if name == '$match':
+            scratch = mongomock.MongoClient().db.scratch
+            if docs:
+                scratch.insert_many(docs)
+            docs = list(scratch.find(spec))
+        elif name == '$unwind':
+            docs = [dict(doc, **{spec[1:]: item}) for doc in docs for item in doc.get(spec[1:], [])]
+        elif name == '$replaceRoot':
+            docs = [_value(doc, spec['newRoot']) for doc in docs]
+        elif name == '$group':
+            docs = _group(docs, spec)
+        else:
+            raise NotImplementedError(name)
+    return iter(docs)
+
+def old_loop(meals):
+    # what /stats computed before the aggregation, per meal in python
+    meal_types, calories_by_type = {}, {}
+    for meal in meals:
+        meal_type = meal.get('meal_type') or 'unknown'
+        meal_types[meal_type] = meal_types.get(meal_type, 0) + 1
+        calories_by_type[meal_type] = calories_by_type.get(meal_type, 0) + (meal.get('calories') or 0)
+    return meal_types, calories_by_type
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    pipelines = []
+    def aggregate(self, pipeline, **kwargs):
+        pipelines.append(pipeline)
+        return run_pipeline(self._collection, pipeline)
+    monkeypatch.setattr(MockCollection, 'aggregate', aggregate, raising=False)
+    return pipelines
+
+def _store(mode):
+    meals = repository.get_meal_repository(mode)
+    docs = [{'firebase_uid': TEST_UID, 'name': name, 'meal_type': meal_type, 'calories': calories, 'timestamp': timestamp}
+            for name, meal_type, calories, timestamp in MEALS]
+    # someone else's meals on the same days stay out of it
+    docs.append({'firebase_uid': 'someone-else', 'name': 'cake', 'meal_type': 'snack', 'calories': 500,
+                 'timestamp': datetime(2026, 3, 9, 15)})
+    meals.insert_many(docs)
+    return meals, docs[:-1]
+
+@pytest.mark.parametrize('mode', ['document', 'bucket'])
+@pytest.mark.parametrize('timestamp_range', [
+    None,
+    {'$gte': datetime(2026, 3, 9, 12)},
+    {'$gte': datetime(2026, 3, 9, 12), '$lt': datetime(2026, 3, 10, 12)},
+])
+def test_stats_by_type_matches_the_old_loop(mongo, pipelines, mode, timestamp_range):
+    meals, docs = _store(mode)
+    in_range = [doc for doc in docs if timestamp_range is None
+                or timestamp_range.get('$gte', datetime.min) <= doc['timestamp'] < timestamp_range.get('$lt', datetime.max)]
+
+    groups = meals.stats_by_type(TEST_UID, timestamp_range)
+
+    meal_types, calories_by_type = old_loop(in_range)
+    assert {group['_id'] or 'unknown': group['count'] for group in groups} == meal_types
+    assert {group['_id'] or 'unknown': group['calories'] for group in groups} == calories_by_type
+    assert min(group['first'] for group in groups) == min(doc['timestamp'] for doc in in_range)
+    assert max(group['last'] for group in groups) == max(doc['timestamp'] for doc in in_range)
+    # one aggregation, started on the index prefix
+    [pipeline] = pipelines
+    assert pipeline[0]['$match']['firebase_uid'] == TEST_UID
+
+def test_bucket_stats_skip_days_outside_the_range(mongo, pipelines):
+    meals, _ = _store('bucket')
+
+    meals.stats_by_type(TEST_UID, {'$gte': datetime(2026, 3, 10, 12)})
+
+    # narrowed to the buckets by date before anything is unwound
+    assert pipelines[0][0] == {'$match': {'firebase_uid': TEST_UID, 'date': {'$gte': '2026-03-10'}}}
+
+@pytest.mark.parametrize('mode', ['document', 'bucket'])
+def test_stats_endpoint_splitting_a_day_matches_the_old_loop(app, client, mongo, pipelines, mode):
+    app.config['MEAL_STORAGE_MODE'] = mode
+    _, docs = _store(mode)
+
+    # a mid-day bound can't use the daily rollups, so this goes through _stats_from_meals
+    stats = client.get('/api/v1/users/stats?from=2026-03-09T12:00:00&to=2026-03-11').get_json()['stats']
+
+    # a bare to= date runs through the end of that day
+    meal_types, calories_by_type = old_loop([doc for doc in docs
+                                             if datetime(2026, 3, 9, 12) <= doc['timestamp'] < datetime(2026, 3, 12)])
+    assert stats['meal_breakdown'] == meal_types
+    assert stats['calories_by_type'] == calories_by_type
+    assert (stats['total_meals'], stats['total_calories']) == (6, 2140.5)
+    assert len(pipelines) == 1
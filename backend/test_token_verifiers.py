@@ -0,0 +1,19 @@
+# offline keypairs and the tokens they sign :)
+import pytest
+from firebase_admin import auth
+
+from token_verifiers import OfflineTokenVerifier, generate_keypair
+
+def test_generated_keypair_mints_tokens_the_verifier_accepts():
+    private_pem, public_pem = generate_keypair()
+    verifier = OfflineTokenVerifier('macromatch-test', public_pem, private_pem)
+
+    token = verifier.mint_token('load-1', email='load-1@example.com')
+    claims = verifier.verify(token)
+    assert (claims['uid'], claims['email'], claims['aud']) == ('load-1', 'load-1@example.com', 'macromatch-test')
+
+    # another keypair's tokens don't verify
+    other_private, other_public = generate_keypair()
+    stranger = OfflineTokenVerifier('macromatch-test', other_public, other_private)
+    with pytest.raises(auth.InvalidIdTokenError):
+        verifier.verify(stranger.mint_token('load-1'))
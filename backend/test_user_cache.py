@@ -0,0 +1,69 @@
+# auth path user cache: profile writes drop it, the ttl bounds other workers' staleness :)
+import pytest
+
+import cache_utils
+import repository
+import user_cache
+from conftest import TEST_UID
+
+COMPLETE_PROFILE = {'name': 'Sam', 'age': 30, 'weight': 70, 'height': 175, 'activity_level': 'moderate',
+                    'dietary_goals': 'maintain', 'gender': 'other'}
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(1_700_000_000)
+    monkeypatch.setattr(cache_utils.time, 'time', clock)
+    monkeypatch.setattr(user_cache.time, 'time', clock)
+    return clock
+
+@pytest.fixture
+def lookups(monkeypatch):
+    lookups = []
+    find_auth_user = repository.users.find_auth_user
+    def counting_find(firebase_uid):
+        lookups.append(firebase_uid)
+        return find_auth_user(firebase_uid)
+    monkeypatch.setattr(repository.users, 'find_auth_user', counting_find)
+    return lookups
+
+def _profile_name(client):
+    return client.get('/api/v1/users/profile').get_json()['user']['name']
+
+def test_repeat_requests_reuse_the_cached_user(client, clock, lookups):
+    for _ in range(3):
+        assert _profile_name(client) == 'Test User'
+    assert lookups == [TEST_UID]
+
+@pytest.mark.parametrize('method, path, body', [
+    ('put', '/api/v1/users/profile', {'name': 'Sam'}),
+    ('put', '/api/auth/profile', {'name': 'Sam'}),
+    ('post', '/api/v1/users/profile/complete', COMPLETE_PROFILE),
+])
+def test_profile_writes_drop_the_cached_user(client, clock, lookups, method, path, body):
+    assert _profile_name(client) == 'Test User'
+
+    assert getattr(client, method)(path, json=body).status_code == 200
+
+    # same second, well inside the ttl, and the next request already sees the write
+    assert _profile_name(client) == 'Sam'
+    # the write itself authed from the cache, only the read after it went back to mongodb
+    assert lookups == [TEST_UID, TEST_UID]
+
+def test_writes_from_other_workers_show_up_after_the_ttl(app, client, mongo, clock, lookups):
+    assert _profile_name(client) == 'Test User'
+    # another process changed the profile, nothing told this one
+    mongo.users.update_one({'firebase_uid': TEST_UID}, {'$set': {'name': 'Sam'}})
+
+    clock.now += app.config['USER_CACHE_TTL'] - 1
+    assert _profile_name(client) == 'Test User'
+
+    clock.now += 1
+    assert _profile_name(client) == 'Sam'
+    assert lookups == [TEST_UID, TEST_UID]
@@ -0,0 +1,149 @@
+# pluggable id token verifiers (firebase or a local keypair for offline load tests) :)
+import time
+from flask import current_app
+from firebase_admin import auth
+from google.auth import crypt, jwt
+
+class FirebaseTokenVerifier:
+    """Verifies id tokens with the firebase admin sdk (needs google's network)."""
+    name = 'firebase'
+
+    def verify(self, id_token):
+        from firebase_config import get_firebase_service
+
+        # make sure the sdk is initialized before verifying
+        get_firebase_service()
+        return auth.verify_id_token(id_token)
+
+class OfflineTokenVerifier:
+    """
+    Verifies id tokens signed with a local RSA keypair instead of google's certs.
+
+    Runs the same claim checks as firebase_admin (kid, RS256, aud, iss, sub,
+    iat/exp) and raises the same auth errors, so require_auth and the login
+    flow behave exactly like they do against firebase.
+    """
+    name = 'offline'
+    KEY_ID = 'macromatch-offline'
+    ISSUER_PREFIX = 'https://securetoken.google.com/'
+
+    def __init__(self, project_id, public_key, private_key=None):
+        self.project_id = project_id
+        self.issuer = self.ISSUER_PREFIX + project_id
+        self._certs = {self.KEY_ID: public_key}
+        self._signer = crypt.RSASigner.from_string(private_key, key_id=self.KEY_ID) if private_key else None
+
+    @classmethod
+    def from_config(cls, app_config):
+        """build the verifier from the OFFLINE_TOKEN_* config keys"""
+        public_key_file = app_config.get('OFFLINE_TOKEN_PUBLIC_KEY_FILE')
+        private_key_file = app_config.get('OFFLINE_TOKEN_PRIVATE_KEY_FILE')
+        if not public_key_file:
+            raise ValueError("OFFLINE_TOKEN_PUBLIC_KEY_FILE is required for the offline verifier")
+
+        with open(public_key_file) as f:
+            public_key = f.read()
+        private_key = None
+        if private_key_file:
+            with open(private_key_file) as f:
+                private_key = f.read()
+
+        project_id = app_config.get('FIREBASE_PROJECT_ID') or 'macromatch-offline'
+        return cls(project_id, public_key, private_key)
+
+    def verify(self, id_token):
+        if not isinstance(id_token, str) or not id_token:
+            raise auth.InvalidIdTokenError('ID token must be a non-empty string')
+
+        try:
+            header = jwt.decode_header(id_token)
+        except ValueError as e:
+            raise auth.InvalidIdTokenError(f"Failed to decode ID token: {str(e)}", cause=e)
+
+        error_message = None
+        if not header.get('kid'):
+            error_message = 'ID token has no "kid" claim'
+        elif header.get('alg') != 'RS256':
+            error_message = f"ID token has incorrect algorithm. Expected RS256 but got {header.get('alg')}"
+        if error_message:
+            raise auth.InvalidIdTokenError(error_message)
+
+        try:
+            claims = jwt.decode(id_token, certs=self._certs, audience=self.project_id)
+        except ValueError as e:
+            if 'Token expired' in str(e):
+                raise auth.ExpiredIdTokenError(str(e), cause=e)
+            raise auth.InvalidIdTokenError(str(e), cause=e)
+
+        subject = claims.get('sub')
+        if claims.get('iss') != self.issuer:
+            error_message = f"ID token has incorrect issuer. Expected {self.issuer} but got {claims.get('iss')}"
+        elif not isinstance(subject, str) or not subject:
+            error_message = 'ID token has no "sub" claim'
+        elif len(subject) > 128:
+            error_message = 'ID token has a "sub" claim longer than 128 characters'
+        if error_message:
+            raise auth.InvalidIdTokenError(error_message)
+
+        claims['uid'] = subject
+        return claims
+
+    def mint_token(self, uid, email=None, name=None, lifetime=3600):
+        """sign a firebase-shaped id token for a synthetic user"""
+        if self._signer is None:
+            raise ValueError("OFFLINE_TOKEN_PRIVATE_KEY_FILE is required to mint tokens")
+
+        now = int(time.time())
+        payload = {
+            'iss': self.issuer,
+            'aud': self.project_id,
+            'sub': uid,
+            'user_id': uid,
+            'auth_time': now,
+            'iat': now,
+            'exp': now + lifetime,
+            'email': email,
+            'email_verified': True,
+            'firebase': {'identities': {'email': [email]}, 'sign_in_provider': 'password'}
+        }
+        if name:
+            payload['name'] = name
+        return jwt.encode(self._signer, payload).decode('utf-8')
+
+def mint_synthetic_tokens(verifier, count, prefix='loadtest', lifetime=3600):
+    """yield (uid, email, token) for `count` synthetic users"""
+    for i in range(count):
+        uid = f"{prefix}-{i:06d}"
+        email = f"{uid}@example.com"
+        yield uid, email, verifier.mint_token(uid, email=email, name=uid, lifetime=lifetime)
+
+def generate_keypair(bits=2048):
+    """generate a (private_pem, public_pem) RSA keypair for the offline verifier"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=bits)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem.decode('utf-8'), public_pem.decode('utf-8')
+
+# global verifier instance
+token_verifier = None
+
+def get_token_verifier():
+    """get or create the verifier picked by TOKEN_VERIFIER in config"""
+    global token_verifier
+    if token_verifier is None:
+        backend = current_app.config.get('TOKEN_VERIFIER', 'firebase')
+        if backend == 'firebase':
+            token_verifier = FirebaseTokenVerifier()
+        elif backend == 'offline':
+            token_verifier = OfflineTokenVerifier.from_config(current_app.config)
+        else:
+            raise ValueError(f"unknown TOKEN_VERIFIER: {backend}")
+        print(f"using {token_verifier.name} token verifier")
+    return token_verifier
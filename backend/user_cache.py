@@ -0,0 +1,41 @@
+# per-process cache of mongodb user documents for the auth path :)
+import time
+from flask import current_app
+from cache_utils import LRUCache
+import repository
+
+# global user cache instance (firebase_uid -> user document)
+user_cache = None
+
+def get_user_cache():
+    """get or create the user document cache singleton"""
+    global user_cache
+    if user_cache is None:
+        user_cache = LRUCache(max_size=current_app.config.get('USER_CACHE_SIZE', 10000))
+    return user_cache
+
+def get_cached_user(firebase_uid):
+    """
+    Get a user document by firebase uid, hitting mongodb only on a cache miss.
+
+    Documents live for USER_CACHE_TTL seconds. Writes in this process call
+    invalidate_user, the ttl bounds how stale other workers can get.
+    """
+    if not current_app.config.get('USER_CACHE_ENABLED', True):
+        return repository.users.find_auth_user(firebase_uid)
+
+    cache = get_user_cache()
+    user = cache.get(firebase_uid)
+    if user is not None:
+        return dict(user)
+
+    user = repository.users.find_auth_user(firebase_uid)
+    if user:
+        ttl = current_app.config.get('USER_CACHE_TTL', 60)
+        cache.set(firebase_uid, dict(user), expires_at=time.time() + ttl)
+    return user
+
+def invalidate_user(firebase_uid):
+    """drop a cached user document after it was written"""
+    if user_cache is not None:
+        user_cache.delete(firebase_uid)
@@ -1,159 +1,245 @@
 # user routes for saving profile data :)
-from flask import Blueprint, request, jsonify, current_app
-from datetime import datetime
+from flask import Blueprint, request, jsonify
+from datetime import datetime, time
 from models import User
-from firebase_config import get_firebase_service
-from auth_utils import firebase_token_required
+from auth_middleware import require_auth
+from user_cache import invalidate_user
+from date_ranges import parse_range, range_filter
+from etags import conditional
+from fieldsets import parse_fields
+from response_cache import cached_response
+import repository
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/v1/users')
 
+def user_profile_response(user, fields=None):
+    # profile json (mongodb _id becomes a string id), only fields when given
+    user_response = {'id': str(user['_id']), 'firebase_uid': user.get('firebase_uid'), 'email': user.get('email')}
+    for field in repository.PROFILE_FIELDS:
+        user_response[field] = user.get(field)
+    if fields:
+        return {field: user_response[field] for field in fields}
+    return user_response
+
 @user_bp.route('/profile', methods=['GET'])
-@firebase_token_required
+@require_auth
+@conditional('profile', extra=lambda: request.current_user.get('updated_at'))
 def get_user_profile():
-    # get current user's profile
+    # get current user's profile (?fields=name,weight for just some of it)
     try:
-        user_response = {k: v for k, v in request.current_user.items() if k != 'id'}
+        try:
+            fields = parse_fields(request.args, repository.PROFILE_SPARSE_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         return jsonify({
-            'user': user_response
+            'user': user_profile_response(request.current_user, fields)
         }), 200
     except Exception as e:
+        print(f"get user profile error: {str(e)}")
         return jsonify({'error': 'server error'}), 500
 
 @user_bp.route('/profile', methods=['PUT'])
-@firebase_token_required
+@require_auth
 def update_user_profile():
     # update user profile data
     try:
         data = request.get_json()
-        
+
         if not data:
             return jsonify({'error': 'no data provided'}), 400
-        
+
         # allowed fields to update
-        allowed_fields = ['name', 'age', 'weight', 'height', 'activity_level', 'dietary_goals', 'gender']
         update_data = {}
-        
-        for field in allowed_fields:
+        for field in repository.PROFILE_FIELDS:
             if field in data:
                 update_data[field] = data[field]
-        
+
         if not update_data:
             return jsonify({'error': 'no valid fields to update'}), 400
-        
+
         # add updated timestamp
         update_data['updated_at'] = datetime.utcnow()
-        
-        # update in firebase
-        firebase_service = get_firebase_service()
-        success = firebase_service.update_user(request.current_user_id, update_data)
-        
-        if not success:
+
+        # update in mongodb
+        updated_user = repository.users.update_profile(request.firebase_uid, update_data)
+        invalidate_user(request.firebase_uid)
+        repository.data_versions.bump(request.firebase_uid, 'profile')
+
+        if not updated_user:
             return jsonify({'error': 'failed to update profile'}), 500
-        
-        # get updated user data
-        updated_user = firebase_service.get_user(request.current_user_id)
-        user_response = {k: v for k, v in updated_user.items() if k != 'id'}
-        
+
         return jsonify({
             'message': 'profile updated! :)',
-            'user': user_response
+            'user': user_profile_response(updated_user)
         }), 200
-        
+
     except Exception as e:
+        print(f"update user profile error: {str(e)}")
         return jsonify({'error': 'server error'}), 500
 
 @user_bp.route('/profile/complete', methods=['POST'])
-@firebase_token_required
+@require_auth
 def complete_user_profile():
     # complete user profile setup (for first time users)
     try:
         data = request.get_json()
-        
+
         if not data:
             return jsonify({'error': 'no data provided'}), 400
-        
+
         # required fields for profile completion
-        required_fields = ['name', 'age', 'weight', 'height', 'activity_level', 'dietary_goals', 'gender']
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        
+        missing_fields = [field for field in repository.PROFILE_FIELDS if not data.get(field)]
+
         if missing_fields:
             return jsonify({
                 'error': 'missing required fields',
                 'missing': missing_fields
             }), 400
-        
+
         # create user model for validation
-        user_data = {
-            'firebase_uid': request.firebase_uid,
-            'email': request.current_user.get('email'),
-            'name': data['name'],
-            'age': data['age'],
-            'weight': data['weight'],
-            'height': data['height'],
-            'activity_level': data['activity_level'],
-            'dietary_goals': data['dietary_goals'],
-            'gender': data['gender']
-        }
-        
-        user = User(**user_data)
+        user = User(
+            firebase_uid=request.firebase_uid,
+            email=request.current_user.get('email'),
+            **{field: data[field] for field in repository.PROFILE_FIELDS}
+        )
         validation_errors = user.validate()
-        
+
         if validation_errors:
             return jsonify({
                 'error': 'validation failed',
                 'details': validation_errors
             }), 400
-        
-        # update user in firebase
-        update_data = user.to_dict()
+
+        # update user in mongodb (created_at stays whatever login set)
+        update_data = {field: getattr(user, field) for field in repository.PROFILE_FIELDS}
         update_data['updated_at'] = datetime.utcnow()
-        
-        firebase_service = get_firebase_service()
-        success = firebase_service.update_user(request.current_user_id, update_data)
-        
-        if not success:
+
+        updated_user = repository.users.update_profile(request.firebase_uid, update_data)
+        invalidate_user(request.firebase_uid)
+        repository.data_versions.bump(request.firebase_uid, 'profile')
+
+        if not updated_user:
             return jsonify({'error': 'failed to complete profile'}), 500
-        
-        # get updated user
-        updated_user = firebase_service.get_user(request.current_user_id)
-        user_response = {k: v for k, v in updated_user.items() if k != 'id'}
-        
+
         return jsonify({
             'message': 'profile completed! :)',
-            'user': user_response
+            'user': user_profile_response(updated_user)
         }), 200
-        
+
     except Exception as e:
+        print(f"complete user profile error: {str(e)}")
         return jsonify({'error': 'server error'}), 500
 
+def _rollup_bounds(start, end):
+    """
+    The daily_totals date keys covering [start, end), or None when the range
+    doesn't fall on utc day boundaries (rollups can't split a day).
+    """
+    for bound in (start, end):
+        if bound and bound.time() != time(0):
+            return None
+    return (start.strftime('%Y-%m-%d') if start else None,
+            end.strftime('%Y-%m-%d') if end else None)
+
+def _stats_from_rollups(firebase_uid, start_date, end_date):
+    # O(days) point reads on daily_totals
+    meal_types = {}
+    calories_by_type = {}
+    active_days = []
+    for day in repository.daily_totals.find_range(firebase_uid, start_date, end_date):
+        if day.get('meal_count', 0) <= 0:
+            continue
+        active_days.append(datetime.strptime(day['date'], '%Y-%m-%d').date())
+        for meal_type, totals in day.get('by_type', {}).items():
+            if totals.get('count', 0) <= 0:
+                continue
+            meal_types[meal_type] = meal_types.get(meal_type, 0) + totals['count']
+            calories_by_type[meal_type] = calories_by_type.get(meal_type, 0) + totals.get('calories', 0)
+    return meal_types, calories_by_type, min(active_days, default=None), max(active_days, default=None)
+
+def _stats_from_meals(firebase_uid, start, end):
+    # ranges that split a day fall back to aggregating the raw meals
+    groups = repository.meal_repository().stats_by_type(firebase_uid, range_filter(start, end))
+
+    # at most one row per meal type comes back, so these loops stay tiny
+    meal_types = {}
+    calories_by_type = {}
+    for group in groups:
+        meal_type = group['_id'] or 'unknown'
+        meal_types[meal_type] = group['count']
+        calories_by_type[meal_type] = group['calories']
+
+    first = min((group['first'] for group in groups), default=None)
+    last = max((group['last'] for group in groups), default=None)
+    return meal_types, calories_by_type, first.date() if first else None, last.date() if last else None
+
 @user_bp.route('/stats', methods=['GET'])
-@firebase_token_required
+@require_auth
+@cached_response('stats', scope='meals')
 def get_user_stats():
-    # get user stats and meal history summary
+    # meal stats for any date range (?from=YYYY-MM-DD&to=YYYY-MM-DD), read from the daily rollups
     try:
-        firebase_service = get_firebase_service()
-        
-        # get user's meals
-        meals = firebase_service.get_user_meals(request.current_user_id, 100)
-        
-        # calculate basic stats
-        total_meals = len(meals)
-        total_calories = sum(meal.get('calories', 0) for meal in meals)
-        
-        # meal type breakdown
-        meal_types = {}
-        for meal in meals:
-            meal_type = meal.get('meal_type', 'unknown')
-            meal_types[meal_type] = meal_types.get(meal_type, 0) + 1
-        
+        try:
+            start, end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'invalid date range: {str(e)}'}), 400
+
+        bounds = _rollup_bounds(start, end)
+        if bounds:
+            meal_types, calories_by_type, first_day, last_day = _stats_from_rollups(request.firebase_uid, *bounds)
+        else:
+            meal_types, calories_by_type, first_day, last_day = _stats_from_meals(request.firebase_uid, start, end)
+
+        total_meals = sum(meal_types.values())
+        total_calories = sum(calories_by_type.values())
+
+        # average over the requested days, or the span that has meals in it
+        first = start.date() if start else first_day
+        last = end.date() if end else last_day
+        days = max((last - first).days + (0 if end else 1), 1) if first and last else 0
+
         return jsonify({
             'stats': {
                 'total_meals': total_meals,
                 'total_calories': total_calories,
                 'meal_breakdown': meal_types,
-                'avg_calories_per_meal': round(total_calories / total_meals, 1) if total_meals > 0 else 0
+                'calories_by_type': calories_by_type,
+                'avg_calories_per_meal': round(total_calories / total_meals, 1) if total_meals > 0 else 0,
+                'avg_calories_per_day': round(total_calories / days, 1) if days > 0 else 0,
+                'days': days,
+                'from': start.isoformat() if start else None,
+                'to': end.isoformat() if end else None
             }
         }), 200
-        
+
+    except Exception as e:
+        print(f"get user stats error: {str(e)}")
+        return jsonify({'error': 'server error'}), 500
+
+@user_bp.route('/daily-totals', methods=['GET'])
+@require_auth
+@cached_response('daily_totals', scope='meals')
+def get_daily_totals():
+    # per-day calorie rollups (?from=YYYY-MM-DD&to=YYYY-MM-DD), oldest first
+    try:
+        try:
+            start, end = parse_range(request.args)
+        except ValueError as e:
+            return jsonify({'error': f'invalid date range: {str(e)}'}), 400
+
+        bounds = _rollup_bounds(start, end)
+        if not bounds:
+            return jsonify({'error': 'invalid date range: daily totals need whole days (YYYY-MM-DD)'}), 400
+
+        days = [day for day in repository.daily_totals.find_range(request.firebase_uid, *bounds)
+                if day.get('meal_count', 0) > 0]
+
+        return jsonify({
+            'days': days,
+            'count': len(days)
+        }), 200
+
     except Exception as e:
+        print(f"get daily totals error: {str(e)}")
         return jsonify({'error': 'server error'}), 500